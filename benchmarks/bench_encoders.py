@@ -0,0 +1,126 @@
+"""Бенчмарк форматов снимков
+
+Для каждого формата и качества кодирует кадр CAMERA_WIDTHxCAMERA_HEIGHT
+в память и отдельно записывает результат на диск. Выводит время
+кодирования и записи на кадр и размер файла.
+
+Шум сжимается плохо и искажает размеры, поэтому по умолчанию кадр -
+синтетическая сцена из градиентов и фигур; для точных цифр передайте
+снимок с камеры через --image.
+
+Запуск: python benchmarks/bench_encoders.py [--frames N] [--image PATH]
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.config import CAMERA_HEIGHT, CAMERA_WIDTH  # noqa: E402
+from src.encoders import ImageEncoder  # noqa: E402
+from src.file_manager import FileManager  # noqa: E402
+
+ENCODERS = [
+    ImageEncoder('jpeg', 50),
+    ImageEncoder('jpeg', 75),
+    ImageEncoder('jpeg', 90),
+    ImageEncoder('jpeg', 95),
+    ImageEncoder('jpeg', 90, progressive=True),
+    ImageEncoder('jpeg', 90, optimize=True),
+    ImageEncoder('png', compression=0),
+    ImageEncoder('png', compression=1),
+    ImageEncoder('png', compression=3),
+    ImageEncoder('png', compression=6),
+    ImageEncoder('png', compression=9),
+    ImageEncoder('webp', 50),
+    ImageEncoder('webp', 75),
+    ImageEncoder('webp', 90),
+    ImageEncoder('webp', 101),  # без потерь
+    ImageEncoder('npy'),
+]
+
+
+def scene_frame(width: int, height: int) -> np.ndarray:
+    """Кадр, похожий на снимок: плавный фон, фигуры, слабый шум"""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 3), np.uint8)
+    frame[..., 0] = x
+    frame[..., 1] = y
+    frame[..., 2] = (x + y) / 2
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        center = (int(rng.integers(width)), int(rng.integers(height)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        radius = int(rng.integers(10, height // 4))
+        cv2.circle(frame, center, radius, color, -1)
+    noise = rng.integers(-6, 7, frame.shape, np.int16)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+
+def measure(encoder: ImageEncoder, frame, frames: int, folder: str) -> dict:
+    """Время кодирования и записи на кадр, размер файла"""
+    encoder.encode(frame)  # прогрев
+
+    encode_times = []
+    write_times = []
+    path = os.path.join(folder, f'bench{encoder.extension}')
+    for _ in range(frames):
+        start = time.perf_counter()
+        data = encoder.encode(frame)
+        encode_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        FileManager.write_atomic(path, data)
+        write_times.append(time.perf_counter() - start)
+
+    encode_times.sort()
+    return {
+        'encode_ms': statistics.mean(encode_times) * 1000,
+        'p99_ms': encode_times[math.ceil(len(encode_times) * 0.99) - 1] * 1000,
+        'write_ms': statistics.mean(write_times) * 1000,
+        'size_kib': data.nbytes / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--image', help='снимок вместо синтетической сцены')
+    args = parser.parse_args()
+
+    if args.image:
+        frame = cv2.imread(args.image)
+        if frame is None:
+            print(f'Не удалось прочитать {args.image}')
+            return
+        frame = cv2.resize(frame, (CAMERA_WIDTH, CAMERA_HEIGHT))
+    else:
+        frame = scene_frame(CAMERA_WIDTH, CAMERA_HEIGHT)
+
+    print(f'{CAMERA_WIDTH}x{CAMERA_HEIGHT}, {args.frames} кадров')
+    print(
+        f'{"формат":<26}{"код., мс":>10}{"p99, мс":>10}'
+        f'{"запись, мс":>12}{"КиБ":>10}'
+    )
+    with tempfile.TemporaryDirectory() as folder:
+        for encoder in ENCODERS:
+            result = measure(encoder, frame, args.frames, folder)
+            print(
+                f'{encoder.describe():<26}{result["encode_ms"]:>10.2f}'
+                f'{result["p99_ms"]:>10.2f}{result["write_ms"]:>12.2f}'
+                f'{result["size_kib"]:>10.0f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
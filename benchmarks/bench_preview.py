@@ -0,0 +1,119 @@
+"""Микробенчмарк подготовки кадров предпросмотра
+
+Сравнивает прежнюю обработку кадра (отражение, RGB, Lanczos, новый холст
+PIL) с PreviewRenderer. Выводит время на кадр и пиковый прирост памяти за
+вызов по tracemalloc. NumPy сообщает tracemalloc о своих массивах, в том
+числе о результатах функций OpenCV, поэтому новые массивы кадра в замер
+попадают. Внутренние временные буферы OpenCV и память изображений PIL не
+отслеживаются: ноль означает, что за вызов не понадобилось новых
+массивов NumPy и объектов Python, а не отсутствие выделений вообще.
+
+Запуск: python benchmarks/bench_preview.py [--frames N]
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.config import CAMERA_HEIGHT, CAMERA_WIDTH, VIDEO_SIZE  # noqa: E402
+from src.image_processor import PreviewRenderer  # noqa: E402
+
+
+def legacy_process_frame(frame, size: int = 640):
+    """Прежняя реализация ImageProcessor.process_frame"""
+    frame = cv2.flip(frame, 1)
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    h, w = frame_rgb.shape[:2]
+    aspect_ratio = w / h
+    if aspect_ratio > 1:
+        new_width = size
+        new_height = int(size / aspect_ratio)
+    else:
+        new_height = size
+        new_width = int(size * aspect_ratio)
+
+    resized_frame = cv2.resize(
+        frame_rgb, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4
+    )
+    final_image = Image.new('RGB', (size, size), (0, 0, 0))
+    pil_frame = Image.fromarray(resized_frame)
+    x = (size - new_width) // 2
+    y = (size - new_height) // 2
+    final_image.paste(pil_frame, (x, y))
+    return final_image
+
+
+def measure(render, frames: list) -> dict:
+    """Время на кадр и пиковый прирост отслеживаемой памяти за вызов"""
+    # Прогрев: первый кадр строит кэш геометрии
+    render(frames[0])
+
+    times = []
+    for frame in frames:
+        start = time.perf_counter()
+        render(frame)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    allocated = []
+    for frame in frames:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        render(frame)
+        allocated.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    times.sort()
+    return {
+        'mean_ms': statistics.mean(times) * 1000,
+        'p99_ms': times[math.ceil(len(times) * 0.99) - 1] * 1000,
+        'peak_kib_per_frame': statistics.mean(allocated) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [
+        rng.integers(0, 256, (CAMERA_HEIGHT, CAMERA_WIDTH, 3), np.uint8)
+        for _ in range(8)
+    ]
+    frames = [frames[i % len(frames)] for i in range(args.frames)]
+
+    cases = {
+        'legacy (lanczos)': lambda f: legacy_process_frame(f, VIDEO_SIZE),
+    }
+    for mode in ('area', 'linear', 'lanczos'):
+        renderer = PreviewRenderer(VIDEO_SIZE, mode)
+        cases[f'renderer ({mode})'] = renderer.render
+
+    print(
+        f'{CAMERA_WIDTH}x{CAMERA_HEIGHT} -> {VIDEO_SIZE}, '
+        f'{args.frames} кадров'
+    )
+    print(f'{"вариант":<20}{"ср., мс":>10}{"p99, мс":>10}{"пик, КиБ":>12}')
+    for name, render in cases.items():
+        result = measure(render, frames)
+        print(
+            f'{name:<20}{result["mean_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+            f'{result["peak_kib_per_frame"]:>12.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Бенчмарк запуска оконного приложения
+
+Каждый прогон - отдельный процесс, как при холодном старте. В нем
+создается DualCameraApp, после загрузки модулей подключается
+синтетическая камера и запускается трансляция. Процесс сообщает время
+от старта интерпретатора и от начала импорта до показа окна, загрузки
+модулей и первого кадра на экране.
+
+Нужен дисплей (в Linux без него - xvfb-run).
+
+Запуск: python benchmarks/bench_startup.py [--runs 5] [--output result.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ('window', 'backend', 'first_frame')
+
+
+def child(launched_at: float, source: str, timeout: float):
+    """Один запуск приложения; результат - JSON в stdout"""
+    started_at = time.perf_counter()
+    interpreter = time.time() - launched_at
+
+    sys.path.insert(0, ROOT)
+    from src.dual_camera_app import DualCameraApp
+
+    app = DualCameraApp(started_at=started_at)
+    state = {'streaming': False}
+
+    def poll():
+        times = app.startup_times
+        if app.backend_ready and not state['streaming']:
+            state['streaming'] = True
+            app.camera_manager.connect_camera(1, source)
+            app.start_streaming()
+        elapsed = time.perf_counter() - started_at
+        if 'first_frame' in times or elapsed > timeout:
+            result = {'interpreter_s': interpreter}
+            result.update({f'{k}_s': v for k, v in times.items()})
+            print(json.dumps(result))
+            app.close_app()
+            return
+        app.window.after(5, poll)
+
+    app.window.after(5, poll)
+    app.run()
+
+
+def run_once(source: str, timeout: float) -> dict:
+    """Запуск дочернего процесса и разбор его отчета"""
+    output = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            '--child',
+            repr(time.time()),
+            '--source',
+            source,
+            '--timeout',
+            str(timeout),
+        ],
+        capture_output=True,
+        text=True,
+        timeout=timeout + 30,
+        cwd=ROOT,
+    )
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(output.stderr.strip() or 'нет результата')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--source', default='synthetic:1280x720@30')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--output', help='файл для JSON, иначе stdout')
+    parser.add_argument('--child', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child, args.source, args.timeout)
+        return
+
+    runs = []
+    for i in range(args.runs):
+        result = run_once(args.source, args.timeout)
+        runs.append(result)
+        print(
+            f'Прогон {i + 1}: '
+            + ', '.join(
+                f'{stage} {result.get(f"{stage}_s", float("nan")):.3f} с'
+                for stage in STAGES
+            ),
+            file=sys.stderr,
+        )
+
+    summary = {}
+    for key in ('interpreter_s',) + tuple(f'{s}_s' for s in STAGES):
+        values = [r[key] for r in runs if key in r]
+        if values:
+            summary[key] = {
+                'median': statistics.median(values),
+                'min': min(values),
+                'max': max(values),
+            }
+
+    text = json.dumps(
+        {'source': args.source, 'runs': runs, 'summary': summary},
+        ensure_ascii=False,
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""Набор бенчмарков горячих путей без камер и дисплея
+
+Прогоняет PreviewRenderer.render, ImageProcessor.prepare_for_save,
+FileManager.save_images и цикл PreviewLoop (update_frames) на
+синтетических кадрах и на видеофайлах нескольких разрешений. Результат -
+JSON с fps, задержками p50/p99 по этапам, загрузкой CPU и пиковой
+памятью.
+
+Запуск: python benchmarks/run_benchmarks.py [--output result.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.camera_manager import CameraManager  # noqa: E402
+from src.config import VIDEO_SIZE  # noqa: E402
+from src.file_manager import FileManager  # noqa: E402
+from src.frame_sources import SyntheticSource, VideoFileSource  # noqa: E402
+from src.image_processor import ImageProcessor, PreviewRenderer  # noqa: E402
+from src.preview_loop import PreviewLoop  # noqa: E402
+
+RESOLUTIONS = {
+    '480p': (640, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+}
+
+
+def percentile(values: list, q: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    values = sorted(values)
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def summarize(latencies: list, wall: float, cpu: float) -> dict:
+    """Сводка по замеру в миллисекундах"""
+    return {
+        'iterations': len(latencies),
+        'fps': len(latencies) / wall if wall else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'cpu_percent': cpu / wall * 100 if wall else 0.0,
+    }
+
+
+def measure(func, frames: list, iterations: int) -> dict:
+    """Замер функции одного кадра"""
+    func(frames[0])  # прогрев
+
+    tracemalloc.start()
+    latencies = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(frames[i % len(frames)])
+        latencies.append(time.perf_counter() - start)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = summarize(latencies, wall, cpu)
+    result['peak_traced_mib'] = peak / 2**20
+    return result
+
+
+def read_frames(source, count: int) -> list:
+    """Первые кадры источника"""
+    frames = []
+    for _ in range(count):
+        ret, frame = source.read()
+        if ret:
+            frames.append(frame)
+    source.release()
+    return frames
+
+
+def make_video(path: str, width: int, height: int, frames: int = 60):
+    """Запись синтетического видео для файлового источника"""
+    writer = cv2.VideoWriter(
+        path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (width, height)
+    )
+    source = SyntheticSource(width, height)
+    for _ in range(frames):
+        writer.write(source.read()[1])
+    writer.release()
+
+
+def bench_loop(sources: list, duration: float) -> dict:
+    """Цикл предпросмотра с потоками захвата на заданных источниках"""
+    manager = CameraManager()
+    for camera_number, source in enumerate(sources, start=1):
+        manager.connect_source(camera_number, source)
+
+    renderers = {n: PreviewRenderer(VIDEO_SIZE) for n in manager.workers}
+    latencies = []
+    errors = []
+    for renderer in renderers.values():
+        render = renderer.render
+
+        def timed(frame, camera_number=None, _render=render):
+            start = time.perf_counter()
+            try:
+                result = _render(frame, camera_number)
+            except Exception as e:
+                # Цикл только печатает ошибки; без учета замер покажет
+                # 0 fps и завершится успешно
+                errors.append(repr(e))
+                raise
+            latencies.append(time.perf_counter() - start)
+            return result
+
+        renderer.render = timed
+
+    loop = PreviewLoop(manager, renderers)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    loop.start()
+    time.sleep(duration)
+    loop.stop()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    dropped = {n: manager.get_dropped_frames(n) for n in renderers}
+    captured = {n: w.slot.latest().seq for n, w in manager.workers.items()}
+    manager.release_all()
+
+    result = summarize(latencies or [0.0], wall, cpu)
+    result['fps'] = len(latencies) / wall / max(1, len(renderers))
+    result['captured_fps'] = {n: c / wall for n, c in captured.items()}
+    result['dropped'] = dropped
+    result['errors'] = len(errors)
+    if errors:
+        result['first_error'] = errors[0]
+    return result
+
+
+def run(args) -> dict:
+    """Прогон всех замеров"""
+    results = {
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'machine': platform.machine(),
+        'cases': [],
+    }
+    temp_dir = tempfile.mkdtemp(prefix='imagecapture_bench_')
+
+    for name, (width, height) in RESOLUTIONS.items():
+        if args.resolutions and name not in args.resolutions:
+            continue
+
+        video_path = os.path.join(temp_dir, f'{name}.avi')
+        make_video(video_path, width, height)
+        sources = {
+            'synthetic': lambda fps=0: SyntheticSource(width, height, fps),
+            'file': lambda fps=0: VideoFileSource(video_path, fps),
+        }
+
+        for source_name, make_source in sources.items():
+            frames = read_frames(make_source(), 8)
+            renderer = PreviewRenderer(VIDEO_SIZE)
+            save_dir = os.path.join(temp_dir, f'{name}_{source_name}')
+            stages = {
+                'preview_render': renderer.render,
+                'prepare_for_save': ImageProcessor.prepare_for_save,
+                'save_images': lambda f: FileManager.save_images(
+                    [f] * args.cameras, save_dir
+                ),
+            }
+            for stage, func in stages.items():
+                iterations = args.iterations
+                if stage == 'save_images':
+                    iterations = args.save_iterations
+                result = measure(func, frames, iterations)
+                result.update(
+                    stage=stage, resolution=name, source=source_name
+                )
+                results['cases'].append(result)
+                print(
+                    f'{name:>6} {source_name:<10} {stage:<17}'
+                    f'{result["fps"]:>9.1f} fps'
+                    f'{result["p50_ms"]:>9.2f} / {result["p99_ms"]:.2f} мс',
+                    file=sys.stderr,
+                )
+
+            # В цикле источники отдают кадры с частотой камеры
+            loop_sources = [
+                make_source(args.source_fps) for _ in range(args.cameras)
+            ]
+            result = bench_loop(loop_sources, args.duration)
+            result.update(
+                stage='update_frames', resolution=name, source=source_name
+            )
+            results['cases'].append(result)
+            print(
+                f'{name:>6} {source_name:<10} {"update_frames":<17}'
+                f'{result["fps"]:>9.1f} fps на камеру',
+                file=sys.stderr,
+            )
+
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    if resource:
+        # ru_maxrss в Linux - КиБ
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results['peak_rss_mib'] = peak / 1024
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--save-iterations', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--cameras', type=int, default=2)
+    parser.add_argument('--source-fps', type=float, default=30.0)
+    parser.add_argument(
+        '--resolutions', nargs='*', choices=sorted(RESOLUTIONS)
+    )
+    parser.add_argument('--output', help='файл для JSON, иначе stdout')
+    args = parser.parse_args()
+
+    results = run(args)
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    failed = [c for c in results['cases'] if c.get('errors')]
+    for case in failed:
+        print(
+            f'Ошибки в {case["stage"]} ({case["resolution"]}, '
+            f'{case["source"]}): {case["errors"]}, {case["first_error"]}',
+            file=sys.stderr,
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,122 @@
 """
 Точка входа в приложение двойной камеры
 Структурированная версия с разделением по модулям
+
+Без аргументов запускается окно приложения. Команда capture снимает
+без окна: python main.py capture --cameras 0,2 --count 10 --interval 5
+Команда catalog ищет снимки в каталоге папки: python main.py catalog
+--folder D:\\Photo --camera 1 --since 2024-05-01T10:00
+Команда spool пишет несжатые кадры на диск без кодирования, а
+spool-convert потом превращает запись в снимки или видео.
+Команда batch обрабатывает папку снимков: python main.py batch
+D:\\Photo --flip --resize 1280x0 --format webp
+Команда serve транслирует камеры по HTTP (MJPEG) для других экранов:
+python main.py serve --cameras 0,2 --host 0.0.0.0
+Команда timelapse снимает по расписанию: python main.py timelapse
+--interval 300 --start 2024-05-01T06:00 --end 2024-05-01T20:00
 """
 
-from src.dual_camera_app import DualCameraApp
+import time
+
+# Отсчет времени запуска - до всех остальных импортов
+STARTED_AT = time.perf_counter()
+
+import argparse  # noqa: E402
+import multiprocessing  # noqa: E402
+import sys  # noqa: E402
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Разбор аргументов командной строки"""
+    from src.batch import add_batch_arguments
+    from src.catalog import add_catalog_arguments
+    from src.headless import (
+        add_capture_arguments,
+        add_serve_arguments,
+        add_spool_arguments,
+        add_timelapse_arguments,
+    )
+    from src.spool import add_convert_arguments
+
+    parser = argparse.ArgumentParser(description='Двойная веб-камера')
+    commands = parser.add_subparsers(dest='command')
+
+    capture = commands.add_parser('capture', help='съемка без окна')
+    add_capture_arguments(capture)
+
+    catalog = commands.add_parser('catalog', help='поиск по каталогу снимков')
+    add_catalog_arguments(catalog)
+
+    spool = commands.add_parser('spool', help='запись несжатых кадров')
+    add_spool_arguments(spool)
+
+    convert = commands.add_parser(
+        'spool-convert', help='конвертация записи в снимки или видео'
+    )
+    add_convert_arguments(convert)
+
+    batch = commands.add_parser(
+        'batch', help='пакетная обработка сохраненных снимков'
+    )
+    add_batch_arguments(batch)
+
+    serve = commands.add_parser('serve', help='трансляция камер по HTTP')
+    add_serve_arguments(serve)
+
+    timelapse = commands.add_parser(
+        'timelapse', help='интервальная съемка по расписанию'
+    )
+    add_timelapse_arguments(timelapse)
+    return parser
+
+
+def run_gui():
+    """Запуск оконного приложения"""
+    # tkinter загружается только для окна, OpenCV и PIL - после его показа
+    from src.dual_camera_app import DualCameraApp
+
+    app = DualCameraApp(started_at=STARTED_AT)
+    app.run()
 
 
 def main():
     """Главная функция запуска приложения"""
+    if len(sys.argv) == 1:
+        # Разбор команд импортирует OpenCV; окну он нужен только после
+        # показа, поэтому без аргументов разбор пропускается
+        args = argparse.Namespace(command=None)
+    else:
+        args = build_parser().parse_args()
     try:
-        app = DualCameraApp()
-        app.run()
+        if args.command == 'capture':
+            from src.headless import run_capture
+
+            sys.exit(run_capture(args))
+        if args.command == 'catalog':
+            from src.catalog import run_catalog
+
+            sys.exit(run_catalog(args))
+        if args.command == 'spool':
+            from src.headless import run_spool
+
+            sys.exit(run_spool(args))
+        if args.command == 'spool-convert':
+            from src.spool import run_convert
+
+            sys.exit(run_convert(args))
+        if args.command == 'batch':
+            from src.batch import run_batch
+
+            sys.exit(run_batch(args))
+        if args.command == 'serve':
+            from src.headless import run_serve
+
+            sys.exit(run_serve(args))
+        if args.command == 'timelapse':
+            from src.headless import run_timelapse
+
+            sys.exit(run_timelapse(args))
+        run_gui()
     except KeyboardInterrupt:
         print('Приложение закрыто пользователем')
     except Exception as e:
@@ -18,4 +124,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # Нужно для процессов записи видео в сборке PyInstaller
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,314 @@
+"""Пакетная обработка сохраненных снимков
+
+Команда batch проходит папку со снимками, вырезает, отражает и
+масштабирует каждый файл и кодирует его заново. Чтение, обработка и
+кодирование идут в пуле процессов; главный процесс только перечисляет
+файлы и держит в работе ограниченное число заданий, поэтому память
+не зависит от размера папки.
+
+Манифест в папке результата хранит для каждого исходного файла время
+изменения, размер, хэш и отпечаток параметров. Неизменившиеся файлы
+при повторном запуске пропускаются: сначала по времени и размеру, а
+если они разошлись (файл скопировали или коснулись) - по хэшу.
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import BATCH_MANIFEST, BATCH_PATTERN, BATCH_WORKERS
+from .encoders import (
+    EXTENSIONS,
+    ImageEncoder,
+    add_encoder_arguments,
+    encoder_from_args,
+)
+from .file_manager import FileManager
+from .transforms import Crop, Mirror, Pipeline, Resize
+
+# Область (x, y, ширина, высота) в точках
+Box = Tuple[int, int, int, int]
+
+READABLE_EXTENSIONS = set(EXTENSIONS.values()) | {'.jpeg'}
+MANIFEST_SAVE_EVERY = 200  # результатов между записями манифеста
+
+
+@dataclass(frozen=True)
+class BatchSettings:
+    """Параметры обработки; порядок: вырезка, отражение, масштаб
+
+    size - (ширина, высота), нулевая сторона - по пропорциям.
+    """
+
+    crop: Optional[Box] = None
+    flip: bool = False
+    size: Optional[Tuple[int, int]] = None
+    encoder: ImageEncoder = ImageEncoder()
+
+    def key(self) -> str:
+        """Отпечаток параметров для манифеста"""
+        return hashlib.blake2b(
+            repr(self).encode('utf-8'), digest_size=8
+        ).hexdigest()
+
+    def pipeline(self) -> Pipeline:
+        """Конвейер преобразований; выполняется одной операцией"""
+        stages = []
+        if self.crop:
+            stages.append(Crop(*self.crop, pixels=True))
+        if self.flip:
+            stages.append(Mirror())
+        if self.size:
+            stages.append(Resize(*self.size))
+        return Pipeline(stages, name='batch')
+
+
+def iter_images(folder: str, pattern: str = BATCH_PATTERN) -> Iterator:
+    """Файлы снимков папки по одному (os.DirEntry), без полного списка"""
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not fnmatch.fnmatch(entry.name, pattern):
+                continue
+            extension = os.path.splitext(entry.name)[1].lower()
+            if extension in READABLE_EXTENSIONS and entry.is_file():
+                yield entry
+
+
+def _decode(data: bytes, extension: str):
+    """Декодирование файла из памяти; None при ошибке"""
+    if extension == '.npy':
+        return np.load(io.BytesIO(data), allow_pickle=False)
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def process_file(
+    source: str,
+    target: str,
+    settings: BatchSettings,
+    known_hash: Optional[str] = None,
+) -> Tuple[str, str]:
+    """Обработка одного файла, выполняется в процессе пула
+
+    Возвращает состояние ('done', 'unchanged' или 'failed') и хэш
+    исходного файла. Если хэш совпал с known_hash и результат на
+    месте, файл не декодируется.
+    """
+    try:
+        with open(source, 'rb') as f:
+            data = f.read()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if digest == known_hash and os.path.exists(target):
+            return 'unchanged', digest
+
+        frame = _decode(data, os.path.splitext(source)[1].lower())
+        if frame is None:
+            print(f'Не удалось прочитать {source}')
+            return 'failed', digest
+        frame = settings.pipeline().apply(frame)
+        encoded = settings.encoder.encode(frame) if frame.size else None
+        if encoded is None:
+            print(f'Не удалось закодировать {source}')
+            return 'failed', digest
+
+        FileManager.write_atomic(target, encoded)
+        return 'done', digest
+    except Exception as e:
+        print(f'Ошибка обработки {source}: {e}')
+        return 'failed', ''
+
+
+def _load_manifest(path: str) -> Dict[str, dict]:
+    """Манифест прошлых запусков; пустой, если его нет или он испорчен"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f'Манифест {path} не прочитан, обработка заново: {e}')
+        return {}
+
+
+def _save_manifest(path: str, manifest: Dict[str, dict]):
+    """Запись манифеста через временный файл"""
+    FileManager.write_atomic(
+        path, json.dumps(manifest, ensure_ascii=False).encode('utf-8')
+    )
+
+
+def process_folder(
+    folder: str,
+    output: Optional[str] = None,
+    settings: BatchSettings = BatchSettings(),
+    workers: int = BATCH_WORKERS,
+    pattern: str = BATCH_PATTERN,
+    force: bool = False,
+) -> Optional[Dict[str, int]]:
+    """Обработка всех подходящих файлов папки
+
+    Результаты с теми же именами (и расширением формата) кладутся в
+    output, по умолчанию - в подпапку processed. Возвращает число
+    обработанных, неизменившихся и ошибочных файлов или None, если
+    обработку нельзя начать. force - обработать все файлы заново.
+    """
+    output = output or os.path.join(folder, 'processed')
+    if os.path.abspath(output) == os.path.abspath(folder):
+        print('Папка результата должна отличаться от исходной')
+        return None
+    if not FileManager.ensure_directory_exists(output):
+        return None
+
+    manifest_path = os.path.join(output, BATCH_MANIFEST)
+    manifest = {} if force else _load_manifest(manifest_path)
+    settings_key = settings.key()
+    counts = {'done': 0, 'unchanged': 0, 'failed': 0}
+    pending = {}
+    unsaved = 0
+    workers = max(1, workers)
+    started = time.perf_counter()
+
+    def collect(futures):
+        """Учет завершенных заданий"""
+        nonlocal unsaved
+        for future in futures:
+            name, mtime_ns, size = pending.pop(future)
+            status, digest = future.result()
+            counts[status] += 1
+            if status == 'failed':
+                manifest.pop(name, None)
+                continue
+            manifest[name] = {
+                'mtime_ns': mtime_ns,
+                'size': size,
+                'hash': digest,
+                'settings': settings_key,
+            }
+            unsaved += 1
+        if unsaved >= MANIFEST_SAVE_EVERY:
+            # Прерванный запуск продолжится с этого места
+            _save_manifest(manifest_path, manifest)
+            unsaved = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for entry in iter_images(folder, pattern):
+            stat = entry.stat()
+            stem = os.path.splitext(entry.name)[0]
+            target = os.path.join(output, stem + settings.encoder.extension)
+
+            known_hash = None
+            record = manifest.get(entry.name)
+            if record and record['settings'] == settings_key:
+                same_file = (record['mtime_ns'], record['size']) == (
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                )
+                if same_file and os.path.exists(target):
+                    counts['unchanged'] += 1
+                    continue
+                known_hash = record['hash']
+
+            future = pool.submit(
+                process_file, entry.path, target, settings, known_hash
+            )
+            pending[future] = (entry.name, stat.st_mtime_ns, stat.st_size)
+            # В работе не больше двух заданий на процесс
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(list(pending))
+
+    _save_manifest(manifest_path, manifest)
+    elapsed = time.perf_counter() - started
+    rate = counts['done'] / elapsed if elapsed else 0.0
+    print(
+        f'Обработано {counts["done"]}, без изменений '
+        f'{counts["unchanged"]}, ошибок {counts["failed"]} за '
+        f'{elapsed:.1f} с ({rate:.1f} изобр./с)'
+    )
+    return counts
+
+
+def parse_box(value: str) -> Box:
+    """Область в виде x,y,ширина,высота"""
+    parts = [int(part) for part in value.split(',')]
+    if len(parts) != 4 or min(parts) < 0 or not parts[2] or not parts[3]:
+        raise argparse.ArgumentTypeError('ожидается x,y,ширина,высота')
+    return tuple(parts)
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    """Размер в виде ШИРИНАxВЫСОТА, 0 - по пропорциям"""
+    try:
+        width, height = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('ожидается ШИРИНАxВЫСОТА')
+    if width < 0 or height < 0 or not (width or height):
+        raise argparse.ArgumentTypeError('ожидается ШИРИНАxВЫСОТА')
+    return width, height
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser):
+    """Аргументы команды batch"""
+    parser.add_argument('folder', help='папка со снимками')
+    parser.add_argument(
+        '--output',
+        default=None,
+        help='папка результата (по умолчанию - folder/processed)',
+    )
+    parser.add_argument(
+        '--pattern', default=BATCH_PATTERN, help='маска имен файлов'
+    )
+    parser.add_argument(
+        '--crop', type=parse_box, help='вырезка x,y,ширина,высота'
+    )
+    parser.add_argument(
+        '--flip', action='store_true', help='отражение по горизонтали'
+    )
+    parser.add_argument(
+        '--resize',
+        type=parse_size,
+        help='размер ШИРИНАxВЫСОТА, например 1280x0',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=BATCH_WORKERS,
+        help='число процессов обработки',
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='обработать заново, не глядя в манифест',
+    )
+    add_encoder_arguments(parser)
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """Пакетная обработка, возвращает код завершения"""
+    if not os.path.isdir(args.folder):
+        print(f'Папка {args.folder} не найдена')
+        return 1
+    settings = BatchSettings(
+        args.crop, args.flip, args.resize, encoder_from_args(args)
+    )
+    counts = process_folder(
+        args.folder,
+        args.output,
+        settings,
+        args.workers,
+        args.pattern,
+        args.force,
+    )
+    if counts is None:
+        return 1
+    return 1 if counts['failed'] else 0
@@ -0,0 +1,312 @@
+"""Серийная съемка в заранее выделенный кольцевой буфер"""
+
+import threading
+from concurrent.futures import wait
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .camera_manager import CameraManager
+from .capture_worker import FramePacket
+from .config import BURST_MAX_MEMORY_MB, CAMERA_HEIGHT, CAMERA_WIDTH, FPS
+from .file_manager import SESSION_ID
+from .save_queue import SaveQueue
+
+
+def frames_for_duration(seconds: float, fps: float = FPS) -> int:
+    """Число кадров за заданное время"""
+    return max(0, round(seconds * fps))
+
+
+def burst_frames(
+    frames: int, seconds: Optional[float] = None, fps: float = FPS
+) -> int:
+    """Число кадров серии: по длительности, если она задана"""
+    if seconds is None:
+        return frames
+    return frames_for_duration(seconds, fps)
+
+
+def burst_capacity(
+    requested: int, cameras: int, frame_bytes: Optional[int] = None
+) -> int:
+    """Размер кольца на камеру с учетом ограничения памяти"""
+    if frame_bytes is None:
+        frame_bytes = CAMERA_WIDTH * CAMERA_HEIGHT * 3
+    budget = BURST_MAX_MEMORY_MB * 1024 * 1024
+    limit = budget // (frame_bytes * max(1, cameras))
+    return max(1, min(requested, limit))
+
+
+class FrameRing:
+    """Кольцевой буфер кадров одной камеры
+
+    Память выделяется один раз, кадры копируются в готовые ячейки.
+    """
+
+    def __init__(self, capacity: int, shape: tuple):
+        self.frames = np.empty((capacity,) + shape, np.uint8)
+        self.timestamps = np.zeros(capacity)
+        self.capacity = capacity
+        self.shape = shape
+        self._head = 0
+        self.count = 0
+
+    def push(self, frame, timestamp: float):
+        """Копирование кадра на место самого старого"""
+        np.copyto(self.frames[self._head], frame)
+        self.timestamps[self._head] = timestamp
+        self._head = (self._head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def clear(self):
+        """Сброс без освобождения памяти"""
+        self._head = 0
+        self.count = 0
+
+    def ordered(self) -> List[int]:
+        """Индексы ячеек от старого кадра к новому"""
+        start = (self._head - self.count) % self.capacity
+        return [(start + i) % self.capacity for i in range(self.count)]
+
+
+class BurstCapture:
+    """Серийная съемка с предзаписью
+
+    Пока серия взведена, последние pre_frames кадров каждой камеры
+    хранятся в кольце. После нажатия дописывается еще post_frames кадров,
+    кольцо замораживается и кадры уходят в очередь сохранения.
+    """
+
+    def __init__(
+        self,
+        camera_manager: CameraManager,
+        save_queue: SaveQueue,
+        pre_frames: int,
+        post_frames: int,
+    ):
+        self.camera_manager = camera_manager
+        self.save_queue = save_queue
+        self.pre_frames = pre_frames
+        self.post_frames = post_frames
+
+        self.state = 'idle'  # idle, armed, triggered, saving
+        self._listening = False
+        self._attached = False  # подписаны ли на кадры камер серии
+        self._lock = threading.Lock()
+        self._rings: Dict[int, FrameRing] = {}
+        self._resizing = set()
+        self._remaining: Dict[int, int] = {}
+        self._camera_numbers: Sequence[int] = ()
+        self._burst_id = 0
+        self._folder = ''
+        self._on_done: Optional[Callable[[List[str]], None]] = None
+
+    def arm(self, camera_numbers: Sequence[int]):
+        """Начало записи в кольцо
+
+        Кольца выделяются здесь, а не в потоке захвата. Если предыдущая
+        серия еще сохраняется, набор камер запоминается, а запись в
+        кольцо начнется по окончании сохранения.
+        """
+        with self._lock:
+            if self._listening:
+                return
+            self._camera_numbers = tuple(camera_numbers)
+            self._listening = True
+            if self.state == 'saving':
+                return
+        rings = self._prepare_rings(self._camera_numbers)
+        with self._lock:
+            if not self._listening:
+                return
+            self._rings = rings
+            self.state = 'armed'
+        self._attach()
+
+    def disarm(self):
+        """Остановка записи в кольцо"""
+        with self._lock:
+            self._listening = False
+            attached, self._attached = self._attached, False
+            camera_numbers = self._camera_numbers
+            if self.state == 'triggered' and self._rings:
+                # Сохраняем то, что успели записать
+                self._start_saving()
+            elif self.state != 'saving':
+                self.state = 'idle'
+        if attached:
+            for camera_number in camera_numbers:
+                self.camera_manager.remove_frame_listener(
+                    camera_number, self._on_frame
+                )
+
+    def _attach(self):
+        """Подписка на кадры камер серии, если ее еще нет"""
+        with self._lock:
+            if not self._listening or self._attached:
+                return
+            self._attached = True
+            camera_numbers = self._camera_numbers
+        for camera_number in camera_numbers:
+            self.camera_manager.add_frame_listener(
+                camera_number, self._on_frame
+            )
+
+    def trigger(
+        self,
+        folder: str,
+        on_done: Optional[Callable[[List[str]], None]] = None,
+    ) -> bool:
+        """Запуск серии, on_done получает список сохраненных файлов"""
+        with self._lock:
+            if self.state != 'armed':
+                return False
+            self._burst_id += 1
+            self._folder = folder
+            self._on_done = on_done
+            self._remaining = {n: self.post_frames for n in self._rings}
+            self.state = 'triggered'
+            if not self.post_frames:
+                self._start_saving()
+                return True
+
+        # Зависшая камера не должна задерживать серию бесконечно
+        timer = threading.Timer(
+            self.post_frames / FPS * 2 + 1.0, self._finish_trigger
+        )
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _finish_trigger(self):
+        """Принудительное завершение дозаписи после тайм-аута"""
+        with self._lock:
+            if self.state == 'triggered':
+                self._start_saving()
+
+    def _frame_shape(self, camera_number: int) -> tuple:
+        """Размер кадров камеры: по последнему кадру или по настройкам"""
+        packet = self.camera_manager.read_latest(camera_number)
+        if packet is not None:
+            return packet.frame.shape
+        return (CAMERA_HEIGHT, CAMERA_WIDTH, 3)
+
+    def _make_ring(self, shape: tuple, cameras: int) -> FrameRing:
+        """Новое кольцо под кадры заданного размера"""
+        capacity = burst_capacity(
+            self.pre_frames + self.post_frames,
+            cameras,
+            max(int(np.prod(shape)), CAMERA_WIDTH * CAMERA_HEIGHT * 3),
+        )
+        return FrameRing(capacity, shape)
+
+    def _prepare_rings(
+        self, camera_numbers: Sequence[int]
+    ) -> Dict[int, FrameRing]:
+        """Пустые кольца камер серии; подходящие по размеру - повторно"""
+        rings = {}
+        for camera_number in camera_numbers:
+            shape = self._frame_shape(camera_number)
+            ring = self._make_ring(shape, len(camera_numbers))
+            old = self._rings.get(camera_number)
+            if old and (old.shape, old.capacity) == (shape, ring.capacity):
+                old.clear()
+                ring = old
+            rings[camera_number] = ring
+        return rings
+
+    def _resize_ring(self, camera_number: int, shape: tuple):
+        """Замена кольца под новый размер кадра в фоновом потоке
+
+        Вызывается под self._lock из потока захвата, который не должен
+        ждать выделения памяти; кадры камеры до замены пропускаются.
+        """
+        if camera_number in self._resizing:
+            return
+        self._resizing.add(camera_number)
+        threading.Thread(
+            target=self._replace_ring,
+            args=(camera_number, shape, len(self._camera_numbers)),
+            name='burst-ring',
+            daemon=True,
+        ).start()
+
+    def _replace_ring(self, camera_number: int, shape: tuple, cameras: int):
+        """Выделение кольца и подстановка его, если серия еще пишется"""
+        ring = self._make_ring(shape, cameras)
+        with self._lock:
+            self._resizing.discard(camera_number)
+            if self.state not in ('armed', 'triggered'):
+                return
+            self._rings[camera_number] = ring
+            if self.state == 'triggered':
+                self._remaining[camera_number] = self.post_frames
+
+    def _on_frame(self, camera_number: int, packet: FramePacket):
+        """Копирование кадра в кольцо, вызывается в потоке захвата"""
+        with self._lock:
+            if self.state not in ('armed', 'triggered'):
+                return
+            ring = self._rings.get(camera_number)
+            if ring is None or ring.shape != packet.frame.shape:
+                self._resize_ring(camera_number, packet.frame.shape)
+                return
+            if self.state == 'triggered':
+                if self._remaining.get(camera_number, 0) <= 0:
+                    return
+                self._remaining[camera_number] -= 1
+            ring.push(packet.frame, packet.timestamp)
+            if self.state == 'triggered' and not any(
+                self._remaining.values()
+            ):
+                self._start_saving()
+
+    def _start_saving(self):
+        """Заморозка колец и запуск фонового сохранения"""
+        self.state = 'saving'
+        threading.Thread(
+            target=self._save, name='burst-save', daemon=True
+        ).start()
+
+    def _save(self):
+        """Передача кадров в очередь сохранения и ожидание записи"""
+        futures = []
+        for camera_number, ring in self._rings.items():
+            for i, index in enumerate(ring.ordered()):
+                future = self.save_queue.submit(
+                    {camera_number: ring.frames[index]},
+                    self._folder,
+                    tag=f'burst{self._burst_id}_{i:04d}',
+                    group=f'{SESSION_ID}_burst{self._burst_id}',
+                    block=True,
+                    timestamps={camera_number: ring.timestamps[index]},
+                )
+                if future:
+                    futures.append(future)
+
+        # Кольца нельзя перезаписывать, пока кадры не закодированы
+        wait(futures)
+        saved_files = []
+        for future in futures:
+            saved_files.extend(future.result())
+        print(f'Серия {self._burst_id}: сохранено {len(saved_files)} кадров')
+
+        # Пока шло сохранение, съемку могли остановить и запустить
+        # снова, в том числе с другим набором камер
+        with self._lock:
+            listening = self._listening
+            camera_numbers = self._camera_numbers
+        if listening:
+            rings = self._prepare_rings(camera_numbers)
+        else:
+            rings = self._rings
+            for ring in rings.values():
+                ring.clear()
+        with self._lock:
+            self._rings = rings
+            self.state = 'armed' if self._listening else 'idle'
+            on_done = self._on_done
+        self._attach()
+        if on_done:
+            on_done(saved_files)
@@ -0,0 +1,166 @@
+"""Поиск доступных камер с кэшем результатов"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import cv2
+
+from .config import (
+    CAMERA_CACHE_FILE,
+    CAMERA_PROBE_MAX_INDEX,
+    CAMERA_PROBE_TIMEOUT,
+)
+
+
+def get_device_name(camera_index: int) -> str:
+    """Имя устройства по индексу или '', если система его не сообщает
+
+    Имя есть только в Linux (sysfs). В Windows OpenCV не связывает
+    индекс DirectShow/MSMF с устройством, поэтому там имени нет.
+    """
+    if not sys.platform.startswith('linux'):
+        return ''
+    sysfs_name = f'/sys/class/video4linux/video{camera_index}/name'
+    try:
+        with open(sysfs_name, encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def probe_camera(camera_index: int) -> Optional[dict]:
+    """Проверка камеры открытием устройства, без декодирования кадра
+
+    Возвращает запись для кэша (индекс, backend, имя) или None.
+    """
+    cap = cv2.VideoCapture(camera_index)
+    try:
+        if not cap.isOpened():
+            return None
+        return {
+            'index': camera_index,
+            'backend': cap.getBackendName(),
+            'name': get_device_name(camera_index),
+        }
+    except cv2.error:
+        return None
+    finally:
+        cap.release()
+
+
+class CameraDiscovery:
+    """Параллельный опрос индексов камер с кэшем между запусками"""
+
+    def __init__(self, cache_file: str = CAMERA_CACHE_FILE):
+        self.cache_file = cache_file
+
+    def load_cache(self) -> List[int]:
+        """Индексы камер из прошлого запуска
+
+        Если у записи есть имя устройства, оно сверяется с текущим, и
+        запись с другим устройством на том же индексе отбрасывается.
+        Без имени (Windows) проверить запись нельзя: индекс только
+        подсказка до окончания опроса.
+        """
+        try:
+            with open(self.cache_file, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return []
+
+        cameras = []
+        for entry in entries:
+            index = entry.get('index')
+            if not isinstance(index, int):
+                continue
+            name = entry.get('name', '')
+            if name and get_device_name(index) != name:
+                continue
+            cameras.append(index)
+        return sorted(cameras)
+
+    def save_cache(self, found: Dict[int, dict]):
+        """Сохранение результатов опроса"""
+        entries = [found[index] for index in sorted(found)]
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f'Ошибка сохранения кэша камер: {e}')
+
+    def discover(
+        self,
+        on_found: Optional[Callable[[int], None]] = None,
+        timeout: float = CAMERA_PROBE_TIMEOUT,
+    ) -> List[int]:
+        """Одновременный опрос всех индексов с общим ограничением времени
+
+        Если часть индексов не ответила за timeout, кэш не
+        перезаписывается, а камеры из кэша на этих индексах остаются
+        в результате: медленный запуск драйвера не теряет камеру.
+        """
+        results = queue.Queue()
+
+        def probe(index: int):
+            results.put((index, probe_camera(index)))
+
+        # Зависший драйвер не должен держать приложение при выходе,
+        # поэтому используем daemon-потоки, а не пул
+        for index in range(CAMERA_PROBE_MAX_INDEX):
+            threading.Thread(
+                target=probe, args=(index,), name=f'probe-{index}', daemon=True
+            ).start()
+
+        found: Dict[int, dict] = {}
+        pending = set(range(CAMERA_PROBE_MAX_INDEX))
+        deadline = time.monotonic() + timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                index, entry = results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.discard(index)
+            if entry is None:
+                continue
+            found[index] = entry
+            print(f'Найдена камера {index}')
+            if on_found:
+                on_found(index)
+
+        if not pending:
+            self.save_cache(found)
+            return sorted(found)
+
+        print(
+            f'Не ответили индексы камер {sorted(pending)}, '
+            f'кэш камер не обновлен'
+        )
+        cached = [i for i in self.load_cache() if i in pending]
+        return sorted(set(found) | set(cached))
+
+    def discover_async(
+        self,
+        on_found: Callable[[int], None],
+        on_done: Optional[Callable[[List[int]], None]] = None,
+    ) -> threading.Thread:
+        """Опрос камер в фоновом потоке"""
+
+        def run():
+            cameras = self.discover(on_found)
+            if on_done:
+                on_done(cameras)
+
+        thread = threading.Thread(
+            target=run, name='camera-discovery', daemon=True
+        )
+        thread.start()
+        return thread
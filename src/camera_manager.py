@@ -1,73 +1,383 @@
 """Менеджер камер для работы с видеопотоками"""
 
 import cv2
-import time
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .camera_discovery import CameraDiscovery
+from .capture_worker import CaptureWorker, FramePacket, FrameSubscription
+from .config import CAPTURE_BACKEND, CAPTURE_FPS, SYNC_MAX_AGE
+from .frame_sources import open_source
+
+
+@dataclass
+class SyncSnapshot:
+    """Синхронный снимок с нескольких камер"""
+
+    frames: Dict[int, object]
+    timestamps: Dict[int, float]
+    skew: float  # разброс времени захвата между камерами, с
+    seqs: Dict[int, int] = field(default_factory=dict)
+    # Пакеты со ссылками на буферы кадров, см. release()
+    packets: Dict[int, FramePacket] = field(default_factory=dict)
+
+    def release(self):
+        """Возврат буферов кадров в пулы камер
+
+        Вызывается, когда кадры снимка больше не нужны (например, после
+        сохранения). Без вызова буферы просто уходят сборщику мусора.
+        """
+        packets, self.packets = self.packets, {}
+        for packet in packets.values():
+            packet.release()
 
 
 class CameraManager:
     """Класс для управления камерами"""
 
-    def __init__(self):
-        self.cam1: Optional[cv2.VideoCapture] = None
-        self.cam2: Optional[cv2.VideoCapture] = None
+    def __init__(self, backend: str = CAPTURE_BACKEND):
+        # 'thread' или 'process', см. CAPTURE_BACKEND
+        self.backend = backend
+        # Поток захвата для каждой подключенной камеры; если несколько
+        # номеров выбрали одно устройство, у них общий поток
+        self.workers: Dict[int, CaptureWorker] = {}
+        # Открытые устройства по индексу: не больше одного на индекс
+        self.devices: Dict[Union[int, str], CaptureWorker] = {}
+        # Подписчики на кадры по номерам камер
+        self.listeners: Dict[int, List[Callable]] = {}
+        # Обертки подписчиков, подставляющие номер камеры
+        self._bound: Dict[Tuple[int, Callable], Callable] = {}
 
     @staticmethod
-    def find_available_cameras() -> List[int]:
+    def find_available_cameras(
+        on_found: Optional[Callable[[int], None]] = None,
+    ) -> List[int]:
         """Находит все доступные камеры в системе"""
-        available_cameras = []
         print('Поиск доступных камер...')
-
-        for i in range(10):
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret and frame is not None:
-                    available_cameras.append(i)
-                    print(f'Найдена камера {i}')
-                cap.release()
-            time.sleep(0.1)
-
+        available_cameras = CameraDiscovery().discover(on_found)
         print(f'Всего найдено камер: {len(available_cameras)}')
         return available_cameras
 
-    def connect_camera(self, camera_number: int, camera_index: int) -> bool:
-        """Подключение камеры"""
+    def connect_camera(
+        self,
+        camera_number: int,
+        camera_index: Union[int, str],
+        fps: Optional[float] = None,
+    ) -> bool:
+        """Подключение камеры
+
+        camera_index - индекс устройства или описание источника кадров
+        (см. frame_sources.open_source). fps ограничивает частоту захвата
+        вместо значения из CAPTURE_FPS. Если устройство уже открыто для
+        другого номера, повторно оно не открывается: кадры одного потока
+        захвата раздаются всем номерам, а fps задает первый из них.
+        """
         from .config import CAMERA_WIDTH, CAMERA_HEIGHT
 
         # Освобождаем предыдущую камеру
-        if camera_number == 1 and self.cam1:
-            self.cam1.release()
-        elif camera_number == 2 and self.cam2:
-            self.cam2.release()
-
-        # Подключаем новую камеру
-        cam = cv2.VideoCapture(camera_index)
-        cam.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
-        cam.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
-
-        if cam.isOpened():
-            if camera_number == 1:
-                self.cam1 = cam
-            else:
-                self.cam2 = cam
-            print(f'Камера {camera_number} подключена: индекс {camera_index}')
+        self.disconnect_camera(camera_number)
+
+        worker = self.devices.get(camera_index)
+        if worker is not None:
+            self._attach(camera_number, worker)
+            print(
+                f'Камера {camera_number} подключена: индекс {camera_index} '
+                f'(общий поток захвата)'
+            )
             return True
+
+        if self.backend == 'process':
+            # Камеру открывает сам процесс захвата
+            from .capture_process import ProcessCaptureWorker
+
+            if fps is None:
+                fps = CAPTURE_FPS.get(camera_number, 0)
+            connected = self._add_worker(
+                ProcessCaptureWorker(camera_index, camera_number, fps)
+            )
         else:
+            # Подключаем новую камеру
+            cam = open_source(camera_index)
+            cam.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+            cam.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+            connected = self.connect_source(camera_number, cam, fps)
+
+        if connected:
+            self.devices[camera_index] = self.workers[camera_number]
+            print(f'Камера {camera_number} подключена: индекс {camera_index}')
+        return connected
+
+    def connect_source(
+        self, camera_number: int, cam, fps: Optional[float] = None
+    ) -> bool:
+        """Подключение уже открытого источника кадров
+
+        Открытый источник нельзя передать в другой процесс, поэтому он
+        всегда читается потоком независимо от backend.
+        """
+        self.disconnect_camera(camera_number)
+        if not cam.isOpened():
             cam.release()
             return False
 
-    def read_frame(self, camera_number: int) -> tuple:
-        """Чтение кадра с камеры"""
-        cam = self.cam1 if camera_number == 1 else self.cam2
-        if cam and cam.isOpened():
-            return cam.read()
-        return False, None
+        if fps is None:
+            fps = CAPTURE_FPS.get(camera_number, 0)
+        return self._add_worker(CaptureWorker(cam, camera_number, fps))
+
+    def _add_worker(self, worker: CaptureWorker) -> bool:
+        """Запуск захвата и регистрация камеры"""
+        if not worker.start():
+            return False
+        self._attach(worker.camera_number, worker)
+        return True
+
+    def _attach(self, camera_number: int, worker: CaptureWorker):
+        """Привязка номера камеры к потоку захвата"""
+        for callback in self.listeners.get(camera_number, []):
+            worker.add_listener(self._bind(camera_number, callback))
+        self.workers[camera_number] = worker
+
+    def _bind(self, camera_number: int, callback: Callable) -> Callable:
+        """Подписчик, получающий свой номер камеры, а не номер потока"""
+        key = (camera_number, callback)
+        bound = self._bound.get(key)
+        if bound is None:
+            bound = self._bound[key] = lambda _, packet: callback(
+                camera_number, packet
+            )
+        return bound
+
+    def disconnect_camera(self, camera_number: int):
+        """Отвязка номера; поток и камера останавливаются с последним"""
+        worker = self.workers.pop(camera_number, None)
+        if not worker:
+            return
+        for callback in self.listeners.get(camera_number, []):
+            worker.remove_listener(self._bind(camera_number, callback))
+
+        # Устройство еще показывается под другим номером
+        if any(w is worker for w in self.workers.values()):
+            return
+        for index in [i for i, w in self.devices.items() if w is worker]:
+            del self.devices[index]
+        worker.stop()
+
+    def is_connected(self, camera_number: int) -> bool:
+        """Проверка, подключена ли камера"""
+        return camera_number in self.workers
+
+    def has_cameras(self) -> bool:
+        """Проверка, подключена ли хотя бы одна камера"""
+        return bool(self.workers)
+
+    def camera_numbers(self) -> List[int]:
+        """Номера подключенных камер по возрастанию"""
+        return sorted(self.workers)
+
+    def read_latest(
+        self, camera_number: int, retain: bool = False
+    ) -> Optional[FramePacket]:
+        """Последний кадр камеры с меткой времени, без ожидания
+
+        Буфер кадра переиспользуется, когда кадр выходит из истории.
+        Чтобы обработка не пересеклась с этим, кадр берется с
+        retain=True и отпускается через packet.release(). При backend
+        'process' кадр - ячейка общей памяти, которая будет перезаписана;
+        хранить его дольше обработки нужно в копии.
+        """
+        worker = self.workers.get(camera_number)
+        if worker:
+            return worker.slot.latest(retain)
+        return None
+
+    def wait_for_frame(
+        self, camera_number: int, after_seq: int = 0, timeout: float = 1.0
+    ) -> Optional[FramePacket]:
+        """Ожидание кадра новее after_seq"""
+        worker = self.workers.get(camera_number)
+        if worker:
+            return worker.slot.wait_newer(after_seq, timeout)
+        return None
+
+    def capture_synchronized(
+        self,
+        camera_numbers: Optional[Sequence[int]] = None,
+        after_seqs: Optional[Dict[int, int]] = None,
+        max_age: float = SYNC_MAX_AGE,
+    ) -> Optional[SyncSnapshot]:
+        """Снимок со всех камер с минимальным расхождением по времени
+
+        Из последних кадров каждой камеры выбирается набор с наименьшим
+        разбросом меток времени захвата, при равенстве - самый свежий.
+        Кроме последнего кадра камеры в подборе участвуют только кадры
+        не старше max_age от самого свежего кадра всех камер, поэтому
+        снимок не застревает на старой паре из истории. С after_seqs
+        берутся только кадры с seq больше after_seqs[номер]; если у
+        какой-то камеры таких нет, возвращается None, а не повтор
+        прошлого снимка. Без camera_numbers берутся все подключенные
+        камеры. Кадры снимка держат буферы пула до snapshot.release().
+        """
+        if camera_numbers is None:
+            camera_numbers = self.camera_numbers()
+        after_seqs = after_seqs or {}
+
+        histories = {}
+        zero_copy = set()
+        for camera_number in camera_numbers:
+            worker = self.workers.get(camera_number)
+            history = worker.slot.history(retain=True) if worker else []
+            if history:
+                histories[camera_number] = history
+                if worker.zero_copy:
+                    zero_copy.add(camera_number)
+
+        if not histories:
+            return None
+
+        # Кандидаты: новее прошлого снимка и не старше окна max_age
+        oldest = max(h[-1].timestamp for h in histories.values()) - max_age
+        candidates = {}
+        for camera_number, history in histories.items():
+            after = after_seqs.get(camera_number, 0)
+            candidates[camera_number] = [
+                packet
+                for packet in history
+                if packet.seq > after
+                and (packet is history[-1] or packet.timestamp >= oldest)
+            ]
+        if not all(candidates.values()):
+            for history in histories.values():
+                for packet in history:
+                    packet.release()
+            return None
+
+        # Кадры всех камер по времени; окно, в которое попала каждая
+        # камера, сдвигается слева направо - O(n log n) вместо перебора
+        # всех сочетаний, который растет как history ** камер
+        events = sorted(
+            (
+                (packet.timestamp, camera_number, packet)
+                for camera_number, packets in candidates.items()
+                for packet in packets
+            ),
+            key=lambda event: event[:2],
+        )
+        in_window: Dict[int, int] = {}
+        best = None
+        best_key = None
+        left = 0
+        for right, (newest, camera_number, _) in enumerate(events):
+            in_window[camera_number] = in_window.get(camera_number, 0) + 1
+            if len(in_window) < len(candidates):
+                continue
+
+            # Сужаем окно слева, пока в нем есть все камеры
+            while in_window[events[left][1]] > 1:
+                in_window[events[left][1]] -= 1
+                left += 1
+
+            key = (newest - events[left][0], -newest)
+            if best_key is None or key < best_key:
+                # Из окна берется самый свежий кадр каждой камеры
+                packets = {n: p for _, n, p in events[left:right + 1]}
+                best, best_key = packets, key
+
+        packets = {n: best[n] for n in histories}
+        # Ссылки остаются только у выбранных кадров
+        for camera_number, history in histories.items():
+            for packet in history:
+                if packet is not packets[camera_number]:
+                    packet.release()
+
+        timestamps = {n: p.timestamp for n, p in packets.items()}
+        frames = {}
+        for camera_number, packet in packets.items():
+            # Ячейки общей памяти перезаписываются, снимок копируется
+            if camera_number in zero_copy:
+                frames[camera_number] = packet.frame.copy()
+            else:
+                frames[camera_number] = packet.frame
+        return SyncSnapshot(
+            frames=frames,
+            timestamps=timestamps,
+            skew=max(timestamps.values()) - min(timestamps.values()),
+            seqs={n: p.seq for n, p in packets.items()},
+            packets=packets,
+        )
+
+    def add_frame_listener(
+        self,
+        camera_number: int,
+        callback: Callable[[int, FramePacket], None],
+    ):
+        """Подписка на все кадры камеры, сохраняется при переподключении"""
+        self.listeners.setdefault(camera_number, []).append(callback)
+        worker = self.workers.get(camera_number)
+        if worker:
+            worker.add_listener(self._bind(camera_number, callback))
+
+    def remove_frame_listener(
+        self,
+        camera_number: int,
+        callback: Callable[[int, FramePacket], None],
+    ):
+        """Отмена подписки на кадры камеры"""
+        callbacks = self.listeners.get(camera_number, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        worker = self.workers.get(camera_number)
+        if worker:
+            worker.remove_listener(self._bind(camera_number, callback))
+        if callback not in callbacks:
+            self._bound.pop((camera_number, callback), None)
+
+    def subscribe(
+        self, camera_number: int, maxlen: int = 1
+    ) -> FrameSubscription:
+        """Собственная очередь кадров камеры для одного потребителя
+
+        Медленный потребитель теряет только свои старые кадры и не
+        задерживает ни захват, ни других потребителей.
+        """
+        subscription = FrameSubscription(maxlen)
+        self.add_frame_listener(camera_number, subscription.push)
+        return subscription
+
+    def unsubscribe(
+        self, camera_number: int, subscription: FrameSubscription
+    ):
+        """Отмена подписки и освобождение накопленных кадров"""
+        self.remove_frame_listener(camera_number, subscription.push)
+        subscription.clear()
+
+    def get_capture_stats(self, camera_number: int) -> dict:
+        """Фактическая частота, пропуски сроков и потерянные кадры
+
+        stale - кадры, которые процесс захвата перезаписал раньше, чем
+        их успели опубликовать (CAPTURE_BACKEND = 'process').
+        """
+        worker = self.workers.get(camera_number)
+        if not worker:
+            return {}
+        return {
+            'fps': worker.pacer.achieved_fps,
+            'missed_deadlines': worker.pacer.missed,
+            'dropped': worker.slot.dropped,
+            'failed_reads': worker.failed_reads,
+            'stale': worker.stale_frames,
+        }
+
+    def get_dropped_frames(self, camera_number: int) -> int:
+        """Количество кадров камеры, которые никто не успел забрать"""
+        worker = self.workers.get(camera_number)
+        return worker.slot.dropped if worker else 0
 
     def release_all(self):
         """Освобождение всех камер"""
-        if self.cam1:
-            self.cam1.release()
-        if self.cam2:
-            self.cam2.release()
-        cv2.destroyAllWindows()
+        for camera_number in list(self.workers):
+            self.disconnect_camera(camera_number)
+        try:
+            cv2.destroyAllWindows()
+        except cv2.error:
+            # Сборки OpenCV без GUI (headless) не поддерживают окна
+            pass
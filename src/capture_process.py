@@ -0,0 +1,246 @@
+"""Захват кадров в отдельных процессах
+
+Каждая камера читается своим процессом, который не делит GIL с окном.
+Кадры попадают в кольцо ячеек общей памяти, а процессу окна по каналу
+уходит только номер кадра и метка времени. Процесс окна публикует в
+FrameSlot представление ячейки без копирования и без pickle массивов.
+
+Перед кольцом в общей памяти лежит заголовок: номер кадра в каждой
+ячейке, -1 на время записи. Если процесс окна отстал больше чем на
+кольцо, по заголовку видно, что ячейка уже занята другим кадром, и
+такой кадр не публикуется.
+"""
+
+import multiprocessing as mp
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Union
+
+import numpy as np
+
+from .capture_worker import CaptureWorker
+from .config import (
+    CAMERA_HEIGHT,
+    CAMERA_WIDTH,
+    CAPTURE_PROCESS_SLOTS,
+    CAPTURE_PROCESS_START_TIMEOUT,
+    CAPTURE_RETRY_DELAY,
+)
+from .pacing import FramePacer
+from .stats import STATS
+
+
+def _ring_views(buf, slots: int, shape: tuple):
+    """Заголовок (номера кадров по ячейкам) и кольцо ячеек общей памяти"""
+    header = np.ndarray((slots,), np.int64, buffer=buf)
+    frames = np.ndarray(
+        (slots,) + shape, np.uint8, buffer=buf, offset=header.nbytes
+    )
+    return header, frames
+
+
+def _capture_stream(source, fps: float, slots: int, conn, stop_event):
+    """Процесс захвата: читает камеру в кольцо общей памяти
+
+    Протокол канала: процесс отправляет форму кадра (или None, если
+    камера не открылась), получает имя общей памяти, затем на каждый
+    кадр отправляет (seq, timestamp, read_seconds, missed, failed_reads).
+    Кадр seq лежит в ячейке seq % slots, пока заголовок ячейки равен seq.
+    """
+    import cv2
+
+    from .frame_sources import open_source
+
+    cam = open_source(source)
+    cam.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+    cam.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+    ret, frame = cam.read() if cam.isOpened() else (False, None)
+    if not ret or frame is None:
+        conn.send(None)
+        cam.release()
+        return
+
+    shape = frame.shape
+    conn.send(shape)
+    shm_name = conn.recv()
+    if shm_name is None:
+        cam.release()
+        return
+
+    shm = SharedMemory(name=shm_name)
+    header, frames = _ring_views(shm.buf, slots, shape)
+    pacer = FramePacer(fps)
+    seq = 0
+    failed_reads = 0
+    target = image = None
+
+    try:
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            ret = cam.grab()
+            timestamp = time.monotonic()
+            if ret and not pacer.due(timestamp):
+                continue
+
+            # Декодируем сразу в ячейку кольца; пока идет запись,
+            # ячейка помечена как недействительная
+            index = seq % slots
+            header[index] = -1
+            target = frames[index]
+            if ret:
+                ret, image = cam.retrieve(target)
+                if ret and image is not None and image is not target:
+                    if image.shape == shape:
+                        np.copyto(target, image)
+                    else:
+                        ret = False
+            if not ret:
+                failed_reads += 1
+                stop_event.wait(CAPTURE_RETRY_DELAY)
+                continue
+
+            header[index] = seq
+            conn.send(
+                (
+                    seq,
+                    timestamp,
+                    time.perf_counter() - start,
+                    pacer.missed,
+                    failed_reads,
+                )
+            )
+            seq += 1
+    except (BrokenPipeError, EOFError):
+        # Процесс окна закрыл канал
+        pass
+    finally:
+        cam.release()
+        # Представления общей памяти должны исчезнуть до ее закрытия
+        header = frames = target = image = None
+        shm.close()
+
+
+class ProcessCaptureWorker(CaptureWorker):
+    """Захват одной камеры в отдельном процессе
+
+    Снаружи ведет себя как CaptureWorker: те же slot, pacer и подписчики.
+    Кадры в slot - представления ячеек общей памяти. Ячейка
+    перезаписывается через slots кадров, поэтому тот, кто хранит кадр
+    дольше (например, для сохранения), должен его скопировать.
+    """
+
+    zero_copy = True
+
+    def __init__(
+        self,
+        source: Union[int, str],
+        camera_number: int,
+        fps: float = 0,
+        slots: int = CAPTURE_PROCESS_SLOTS,
+    ):
+        super().__init__(None, camera_number, fps=0)
+        self.source = source
+        self.fps = fps
+        self.slots = slots
+        self._shm = None
+        self._header = None
+        self._frames = None
+
+        ctx = mp.get_context('spawn')
+        self._conn, child_conn = ctx.Pipe()
+        self._process_stop = ctx.Event()
+        self._process = ctx.Process(
+            target=_capture_stream,
+            args=(source, fps, slots, child_conn, self._process_stop),
+            name=f'capture-{camera_number}',
+            daemon=True,
+        )
+
+    def start(self, timeout: float = CAPTURE_PROCESS_START_TIMEOUT) -> bool:
+        """Запуск процесса и ожидание первого кадра"""
+        self._process.start()
+        if not self._conn.poll(timeout):
+            self.stop()
+            return False
+        try:
+            shape = self._conn.recv()
+        except EOFError:
+            shape = None
+        if shape is None:
+            self.stop()
+            return False
+
+        self._shm = SharedMemory(
+            create=True, size=(int(np.prod(shape)) + 8) * self.slots
+        )
+        self._header, self._frames = _ring_views(
+            self._shm.buf, self.slots, shape
+        )
+        self._header[:] = -1
+        self._conn.send(self._shm.name)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 1.0):
+        """Остановка процесса и освобождение общей памяти"""
+        self._stop_event.set()
+        self._process_stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        if self._process.is_alive():
+            self._process.join(timeout=timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._conn.close()
+
+        if self._shm:
+            self._header = self._frames = None
+            try:
+                self._shm.close()
+            except BufferError:
+                # Кадры еще у потребителей; отображение закроется
+                # вместе с ними, имя удаляем сразу
+                pass
+            self._shm.unlink()
+            self._shm = None
+
+    def _run(self):
+        """Прием номеров кадров от процесса захвата
+
+        Публикуется только последний из накопившихся в канале кадров:
+        более старые ячейки процесс захвата, возможно, уже перезаписал.
+        """
+        header, frames = self._header, self._frames
+        while not self._stop_event.is_set():
+            try:
+                if not self._conn.poll(0.1):
+                    if not self._process.is_alive():
+                        print(
+                            f'Процесс захвата камеры {self.camera_number} '
+                            f'завершился'
+                        )
+                        return
+                    continue
+                messages = [self._conn.recv()]
+                while self._conn.poll(0):
+                    messages.append(self._conn.recv())
+            except (EOFError, OSError):
+                return
+
+            for _, timestamp, read_seconds, _, _ in messages:
+                STATS.add(self.camera_number, 'read', read_seconds)
+                # Частоту считает pacer этого процесса
+                self.pacer.due(timestamp)
+            seq, timestamp, _, missed, failed_reads = messages[-1]
+            self.pacer.missed = missed
+            self.failed_reads = failed_reads
+            self.stale_frames += len(messages) - 1
+
+            index = seq % self.slots
+            if header[index] != seq:
+                # Процесс захвата обогнал нас на целое кольцо
+                self.stale_frames += 1
+                continue
+            packet = self.slot.publish(frames[index], timestamp)
+            if self._listeners:
+                self._notify(packet)
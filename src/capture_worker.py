@@ -0,0 +1,252 @@
+"""Потоки захвата кадров с камер"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import cv2
+
+from .config import CAPTURE_RETRY_DELAY, SYNC_HISTORY_SIZE
+from .frame_pool import FrameBuffer, FramePool
+from .pacing import FramePacer
+from .stats import STATS
+
+
+@dataclass
+class FramePacket:
+    """Кадр с камеры с меткой времени захвата и порядковым номером
+
+    Если кадр лежит в буфере пула, buffer - этот буфер. Получивший пакет
+    с retain=True должен вызвать release(), когда кадр больше не нужен.
+    """
+
+    frame: object
+    timestamp: float
+    seq: int
+    buffer: Optional[FrameBuffer] = None
+
+    def retain(self) -> 'FramePacket':
+        """Дополнительная ссылка на буфер кадра"""
+        if self.buffer:
+            self.buffer.retain()
+        return self
+
+    def release(self):
+        """Отпустить ссылку на буфер кадра"""
+        if self.buffer:
+            self.buffer.release()
+
+
+class FrameSlot:
+    """Потокобезопасная ячейка с последним кадром камеры
+
+    Опубликованный кадр не изменяется, поэтому потребители могут
+    использовать его без копирования. Кадр из пула остается в буфере,
+    пока он в истории ячейки; дольше - только со своей ссылкой
+    (retain=True в методах чтения).
+    """
+
+    def __init__(self, history_size: int = SYNC_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._packet: Optional[FramePacket] = None
+        # Несколько последних кадров для подбора синхронной пары
+        self._history_size = history_size
+        self._history = deque()
+        self._seq = 0
+        self._last_read_seq = 0
+        self.dropped = 0
+
+    def publish(
+        self, frame, timestamp: float, buffer: Optional[FrameBuffer] = None
+    ) -> FramePacket:
+        """Публикация нового кадра
+
+        Ссылка на buffer переходит к ячейке и отпускается, когда кадр
+        выходит из истории.
+        """
+        with self._lock:
+            # Предыдущий кадр никто не успел забрать
+            if self._packet and self._packet.seq > self._last_read_seq:
+                self.dropped += 1
+            self._seq += 1
+            self._packet = FramePacket(frame, timestamp, self._seq, buffer)
+            self._history.append(self._packet)
+            if len(self._history) > self._history_size:
+                self._history.popleft().release()
+            self._new_frame.notify_all()
+            return self._packet
+
+    def latest(self, retain: bool = False) -> Optional[FramePacket]:
+        """Последний кадр без ожидания"""
+        with self._lock:
+            if self._packet:
+                self._last_read_seq = self._packet.seq
+                if retain:
+                    self._packet.retain()
+            return self._packet
+
+    def wait_newer(
+        self,
+        seq: int,
+        timeout: Optional[float] = None,
+        retain: bool = False,
+    ) -> Optional[FramePacket]:
+        """Ожидание кадра новее seq; None по тайм-ауту"""
+        with self._new_frame:
+            ready = self._new_frame.wait_for(
+                lambda: self._packet and self._packet.seq > seq, timeout
+            )
+            if not ready:
+                return None
+            self._last_read_seq = self._packet.seq
+            if retain:
+                self._packet.retain()
+            return self._packet
+
+    def history(self, retain: bool = False) -> List[FramePacket]:
+        """Последние кадры, от старых к новым"""
+        with self._lock:
+            if self._packet:
+                self._last_read_seq = self._packet.seq
+            if retain:
+                for packet in self._history:
+                    packet.retain()
+            return list(self._history)
+
+
+class FrameSubscription:
+    """Очередь кадров одного потребителя с вытеснением старых
+
+    push подключается как подписчик камеры. Пока кадр в очереди, на его
+    буфер держится ссылка; get передает ее вызывающему, который должен
+    вызвать packet.release(). Переполнение вытесняет самый старый кадр
+    и учитывается в dropped только этого потребителя.
+    """
+
+    def __init__(self, maxlen: int = 1):
+        self.maxlen = maxlen
+        self.dropped = 0
+        self._queue = deque()
+        self._not_empty = threading.Condition()
+
+    def push(self, camera_number: int, packet: FramePacket):
+        """Постановка кадра; вызывается в потоке захвата"""
+        packet.retain()
+        with self._not_empty:
+            if len(self._queue) >= self.maxlen:
+                self._queue.popleft().release()
+                self.dropped += 1
+            self._queue.append(packet)
+            self._not_empty.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[FramePacket]:
+        """Самый старый кадр очереди; None по тайм-ауту"""
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._queue, timeout):
+                return None
+            return self._queue.popleft()
+
+    def clear(self):
+        """Освобождение всех кадров очереди"""
+        with self._not_empty:
+            while self._queue:
+                self._queue.popleft().release()
+
+
+class CaptureWorker:
+    """Поток, читающий кадры с одной камеры с её собственной частотой"""
+
+    # Кадры в slot - новые массивы, их можно хранить без копирования
+    zero_copy = False
+
+    def __init__(
+        self, cam: cv2.VideoCapture, camera_number: int, fps: float = 0
+    ):
+        self.cam = cam
+        self.camera_number = camera_number
+        # При fps=0 кадры публикуются с родной частотой камеры
+        self.pacer = FramePacer(fps)
+        self.slot = FrameSlot()
+        # Буферы, в которые камера декодирует кадры
+        self.pool = FramePool()
+        self.failed_reads = 0
+        # Кадры, перезаписанные до публикации (только захват в процессе)
+        self.stale_frames = 0
+        # Подписчики, получающие каждый кадр в потоке захвата
+        self._listeners: List[Callable[[int, FramePacket], None]] = []
+        self._listeners_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f'capture-{camera_number}', daemon=True
+        )
+
+    def start(self) -> bool:
+        """Запуск потока захвата"""
+        self._thread.start()
+        return True
+
+    def add_listener(self, callback: Callable[[int, FramePacket], None]):
+        """Подписка на каждый кадр; вызов идет в потоке захвата"""
+        with self._listeners_lock:
+            self._listeners = self._listeners + [callback]
+
+    def remove_listener(self, callback: Callable[[int, FramePacket], None]):
+        """Отмена подписки"""
+        with self._listeners_lock:
+            self._listeners = [c for c in self._listeners if c != callback]
+
+    def stop(self, timeout: float = 1.0):
+        """Остановка потока и освобождение камеры"""
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self.cam.release()
+
+    def _run(self):
+        """Цикл захвата"""
+        while not self._stop_event.is_set():
+            # Время фиксируется сразу после захвата, до декодирования,
+            # чтобы метки разных камер можно было сравнивать
+            start = STATS.start()
+            ret = self.cam.grab()
+            timestamp = time.monotonic()
+            frame = None
+            if ret and not self.pacer.due(timestamp):
+                # Кадр сверх целевой частоты: не тратим время на декодирование
+                continue
+            if ret:
+                ret, frame, buffer = self._retrieve()
+            if ret and frame is not None:
+                STATS.record(self.camera_number, 'read', start)
+                packet = self.slot.publish(frame, timestamp, buffer)
+                if self._listeners:
+                    self._notify(packet)
+            else:
+                self.failed_reads += 1
+                self._stop_event.wait(CAPTURE_RETRY_DELAY)
+
+    def _retrieve(self) -> tuple:
+        """Декодирование захваченного кадра в буфер пула"""
+        buffer = self.pool.checkout()
+        ret, frame = self.cam.retrieve(buffer.array if buffer else None)
+        if not ret or frame is None:
+            if buffer:
+                buffer.release()
+            return False, None, None
+        if buffer is None or frame is not buffer.array:
+            # Первый кадр или новый размер: источник выделил массив сам
+            if buffer:
+                buffer.release()
+            buffer = self.pool.adopt(frame)
+        return True, frame, buffer
+
+    def _notify(self, packet: FramePacket):
+        """Передача кадра подписчикам"""
+        for callback in self._listeners:
+            try:
+                callback(self.camera_number, packet)
+            except Exception as e:
+                print(f'Ошибка обработчика кадров: {e}')
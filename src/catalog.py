@@ -0,0 +1,213 @@
+"""Каталог снимков в папке сохранения
+
+Каждый записанный файл добавляется в SQLite-базу рядом со снимками,
+поэтому поиск по времени, камере или сеансу не требует обхода папки.
+Записи только добавляются и не изменяются.
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .config import DEFAULT_SAVE_FOLDER
+
+CATALOG_FILENAME = 'catalog.sqlite3'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL,
+    camera INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    capture_id TEXT NOT NULL,
+    group_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    session TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    size INTEGER,
+    encode_ms REAL
+);
+CREATE INDEX IF NOT EXISTS captures_timestamp ON captures (timestamp);
+CREATE INDEX IF NOT EXISTS captures_camera
+    ON captures (camera, timestamp);
+CREATE INDEX IF NOT EXISTS captures_session
+    ON captures (session, timestamp);
+CREATE INDEX IF NOT EXISTS captures_group ON captures (group_id);
+'''
+
+_COLUMNS = (
+    'filename',
+    'camera',
+    'timestamp',
+    'capture_id',
+    'group_id',
+    'tag',
+    'session',
+    'width',
+    'height',
+    'size',
+    'encode_ms',
+)
+
+
+class CaptureCatalog:
+    """Каталог снимков одной папки
+
+    Одно соединение на каталог, общее для потоков сохранения и
+    защищенное блокировкой. Журнал WAL позволяет читать каталог
+    из другого процесса во время съемки.
+    """
+
+    def __init__(self, folder: str):
+        self.path = os.path.join(folder, CATALOG_FILENAME)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(_SCHEMA)
+
+    def add(self, **record):
+        """Добавление записи о файле; поля - как в _COLUMNS"""
+        values = [record.get(column) for column in _COLUMNS]
+        with self._lock:
+            self._db.execute(
+                f'INSERT INTO captures ({", ".join(_COLUMNS)}) '
+                f'VALUES ({", ".join("?" * len(_COLUMNS))})',
+                values,
+            )
+            self._db.commit()
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        camera: Optional[int] = None,
+        session: Optional[str] = None,
+        group: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Записи по условиям, от старых к новым
+
+        start и end - границы времени (time.time()), end не включается.
+        """
+        conditions = []
+        params = []
+        for sql, value in (
+            ('timestamp >= ?', start),
+            ('timestamp < ?', end),
+            ('camera = ?', camera),
+            ('session = ?', session),
+            ('group_id = ?', group),
+        ):
+            if value is not None:
+                conditions.append(sql)
+                params.append(value)
+
+        sql = 'SELECT * FROM captures'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY timestamp, id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def sessions(self) -> List[dict]:
+        """Сеансы съемки: начало, конец и число файлов"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT session, MIN(timestamp) AS start, '
+                'MAX(timestamp) AS end, COUNT(*) AS files '
+                'FROM captures GROUP BY session ORDER BY start'
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        """Закрытие базы"""
+        with self._lock:
+            self._db.close()
+
+
+_catalogs: Dict[str, CaptureCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def catalog_for(folder: str) -> CaptureCatalog:
+    """Общий каталог папки; открывается при первом обращении"""
+    key = os.path.abspath(folder)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = CaptureCatalog(folder)
+        return catalog
+
+
+def add_catalog_arguments(parser: argparse.ArgumentParser):
+    """Аргументы команды catalog"""
+    parser.add_argument(
+        '--folder', default=DEFAULT_SAVE_FOLDER, help='папка со снимками'
+    )
+    parser.add_argument('--camera', type=int, help='номер камеры')
+    parser.add_argument('--session', help='идентификатор сеанса')
+    parser.add_argument('--group', help='снимок или серия')
+    parser.add_argument(
+        '--since',
+        type=datetime.fromisoformat,
+        help='начало периода, например 2024-05-01T10:00',
+    )
+    parser.add_argument(
+        '--until', type=datetime.fromisoformat, help='конец периода'
+    )
+    parser.add_argument('--limit', type=int, help='не больше N записей')
+    parser.add_argument(
+        '--sessions', action='store_true', help='только список сеансов'
+    )
+
+
+def run_catalog(args: argparse.Namespace) -> int:
+    """Вывод записей каталога, возвращает код завершения"""
+    if not os.path.exists(os.path.join(args.folder, CATALOG_FILENAME)):
+        print(f'В папке {args.folder} нет каталога снимков')
+        return 1
+
+    catalog = CaptureCatalog(args.folder)
+    try:
+        if args.sessions:
+            for row in catalog.sessions():
+                start = datetime.fromtimestamp(row['start'])
+                end = datetime.fromtimestamp(row['end'])
+                print(
+                    f'{row["session"]}  {start:%Y-%m-%d %H:%M:%S} - '
+                    f'{end:%H:%M:%S}  файлов: {row["files"]}'
+                )
+            return 0
+
+        rows = catalog.query(
+            start=args.since.timestamp() if args.since else None,
+            end=args.until.timestamp() if args.until else None,
+            camera=args.camera,
+            session=args.session,
+            group=args.group,
+            limit=args.limit,
+        )
+        for row in rows:
+            moment = datetime.fromtimestamp(row['timestamp'])
+            print(
+                f'{moment:%Y-%m-%d %H:%M:%S.%f}'[:-3]
+                + f'  камера {row["camera"]}  {row["filename"]}  '
+                f'{row["size"] / 1024:.0f} КиБ  '
+                f'{row["encode_ms"]:.1f} мс'
+            )
+        print(f'Записей: {len(rows)}')
+        return 0
+    finally:
+        catalog.close()
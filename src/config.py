@@ -6,11 +6,131 @@ import os
 DEFAULT_SAVE_FOLDER = 'C:\\PhotoBook'
 VIDEO_SIZE = 640
 VIDEO_CONTAINER_SIZE = 660
+# Интерполяция предпросмотра: 'area', 'linear', 'nearest' или 'lanczos'
+PREVIEW_INTERPOLATION = 'area'
+
+# Преобразования кадра для предпросмотра, снимков и видео, по порядку:
+# ('mirror',) - отражение, ('mirror', True) - по вертикали,
+# ('rotate', градусы против часовой стрелки),
+# ('crop', x, y, ширина, высота) в долях кадра,
+# ('resize', ширина, высота) - 0 вместо стороны сохраняет пропорции
+FRAME_TRANSFORMS = [('mirror',)]
+# Дополнительно для снимков и видео, например [('timestamp',)] или
+# [('resize', 1920, 0), ('timestamp', '%d.%m.%Y %H:%M')]
+SAVE_TRANSFORMS = []
+SAVE_INTERPOLATION = 'area'
 
 # Настройки камер
 CAMERA_WIDTH = 1280
 CAMERA_HEIGHT = 720
 FPS = 30
+# Частота предпросмотра; на слабых киосках можно снизить, не трогая захват
+PREVIEW_FPS = FPS
+DISPLAY_REFRESH_MS = 1000 // PREVIEW_FPS  # период таймера обновления окна
+# Целевая частота захвата по номерам камер; без записи - родная частота
+CAPTURE_FPS = {}
+# Число камер в окне; сетка предпросмотра строится по нему
+CAMERA_SLOTS = 2
+# Потоков отрисовки предпросмотра, общих для всех камер
+RENDER_WORKERS = min(4, os.cpu_count() or 1)
+
+# Обнаружение изменений по миниатюре кадра
+CHANGE_THUMBNAIL_WIDTH = 64  # точек миниатюры по ширине
+CHANGE_PIXEL_THRESHOLD = 20  # изменение яркости точки, 0-255
+# Доля изменившихся точек, при которой предпросмотр перерисовывается;
+# 0 - перерисовывать каждый новый кадр
+PREVIEW_CHANGE_AREA = 0.002
+# Съемка по движению: доля изменившихся точек, область интереса
+# (x, y, ширина, высота) в долях кадра или None, пауза между снимками, с
+MOTION_AREA = 0.01
+MOTION_ROI = None
+MOTION_COOLDOWN = 1.0
+
+# Потоки захвата
+# 'thread' - поток на камеру в процессе окна, 'process' - отдельный
+# процесс на камеру с передачей кадров через общую память
+CAPTURE_BACKEND = 'thread'
+CAPTURE_PROCESS_SLOTS = 8  # ячеек общей памяти на камеру
+CAPTURE_PROCESS_START_TIMEOUT = 10.0  # ожидание первого кадра, с
+CAPTURE_RETRY_DELAY = 0.05  # пауза после неудачного чтения, с
+CAMERA_STALL_TIMEOUT = 1.0  # камера считается зависшей без кадров, с
+SYNC_HISTORY_SIZE = 4  # кадров на камеру для подбора синхронной пары
+# Насколько кадр снимка может быть старше самого свежего кадра камер, с;
+# последний кадр каждой камеры подходит всегда
+SYNC_MAX_AGE = 0.02
+FRAME_POOL_SIZE = 12  # свободных буферов кадров, хранимых на камеру
+
+# Поиск камер
+CAMERA_PROBE_MAX_INDEX = 10
+CAMERA_PROBE_TIMEOUT = 3.0  # общее время ожидания опроса, с
+CAMERA_CACHE_FILE = os.path.join(
+    os.path.expanduser('~'), '.imagecapture_opencv', 'cameras.json'
+)
+
+# Фоновое сохранение снимков
+SAVE_WORKERS = 2  # потоков кодирования и записи
+SAVE_QUEUE_SIZE = 8  # кадров в очереди, дальше снимки отклоняются
+# Каталог снимков catalog.sqlite3 в папке сохранения
+CATALOG_ENABLED = True
+
+# Формат снимков: 'jpeg', 'png', 'webp' или 'npy' (кадр без сжатия)
+SAVE_FORMAT = 'jpeg'
+JPEG_QUALITY = 95  # 1-100
+JPEG_PROGRESSIVE = False
+JPEG_OPTIMIZE = False  # оптимальные таблицы Хаффмана: меньше и дольше
+PNG_COMPRESSION = 1  # 0-9: больше - меньше файл и дольше кодирование
+WEBP_QUALITY = 90  # 1-100, больше 100 - без потерь
+SAVE_WRITE_BUFFER = 1 << 20  # буфер записи файла, байт
+
+# Серийная съемка: кадров на камеру до и после нажатия
+BURST_PRE_FRAMES = 15
+BURST_POST_FRAMES = 15
+# Длительность до и после нажатия, с; если задана, заменяет число
+# кадров (оно считается по частоте FPS)
+BURST_PRE_SECONDS = None
+BURST_POST_SECONDS = None
+BURST_MAX_MEMORY_MB = 512  # общий предел для колец всех камер
+
+# Запись несжатых кадров в файлы на диске (spool) и их конвертация
+SPOOL_SEGMENT_MB = 1024  # место, выделяемое на камеру за раз
+SPOOL_CONVERT_WORKERS = os.cpu_count() or 1  # процессов конвертации
+SPOOL_CONVERT_CHUNK = 64  # кадров в одном задании конвертации
+
+# Пакетная обработка сохраненных снимков (команда batch)
+BATCH_WORKERS = os.cpu_count() or 1
+BATCH_PATTERN = '*_camera*'  # маска имен исходных файлов
+BATCH_MANIFEST = 'batch_manifest.json'  # в папке результата
+
+# Интервальная съемка (таймлапс)
+TIMELAPSE_INTERVAL = 60.0  # с между снимками
+# Опоздание, после которого срок считается пропущенным, с (не больше
+# половины интервала)
+TIMELAPSE_LATE_TOLERANCE = 1.0
+
+# Трансляция предпросмотра по HTTP (MJPEG) для других экранов:
+# http://STREAM_HOST:STREAM_PORT/
+STREAM_ENABLED = False  # запуск вместе с окном приложения
+STREAM_HOST = '127.0.0.1'  # '0.0.0.0' - доступ из локальной сети
+STREAM_PORT = 8081
+STREAM_FPS = 10  # кадров в секунду на камеру
+STREAM_WIDTH = 640  # ширина кадра трансляции, 0 - как у камеры
+STREAM_QUALITY = 80  # качество JPEG, 1-100
+STREAM_CLIENT_TIMEOUT = 10.0  # зрителя, не принимающего данные, - отключать
+
+# Запись видео
+RECORD_FPS = FPS
+RECORD_FOURCC = 'mp4v'
+RECORD_BUFFER_FRAMES = 16  # ячеек общей памяти на камеру
+# Очередь кадров записи до копирования в общую память; при захвате в
+# процессе кадр в ней - ячейка кольца, поэтому очередь короткая
+RECORD_SUBSCRIPTION_FRAMES = 2
+
+# Замеры задержек по этапам
+STATS_ENABLED = False
+STATS_OVERLAY = False  # показ показателей поверх видео (включает замеры)
+STATS_WINDOW = 10.0  # длина окна скользящей гистограммы, с
+STATS_DUMP_FILE = None  # путь к файлу .json или .prom для периодической записи
+STATS_DUMP_INTERVAL = 5.0  # с
 
 # Цвета интерфейса
 COLORS = {
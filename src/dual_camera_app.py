@@ -1,34 +1,157 @@
-"""Главное приложение двойной камеры"""
+"""Главное приложение двойной камеры
 
+Окно показывается до загрузки OpenCV, numpy и PIL: тяжелые модули
+импортируются в фоновом потоке, после чего создаются менеджер камер,
+очереди и отрисовка, а поиск камер идет асинхронно.
+"""
+
+import importlib
+import math
 import tkinter as tk
 from tkinter import messagebox, Entry, Label
 import threading
 import time
-from PIL import ImageTk
+from typing import Optional
 
 from .config import *
-from .camera_manager import CameraManager
-from .image_processor import ImageProcessor
-from .file_manager import FileManager
+from .stats import STATS, StatsDumper
 from .ui_components import CameraSelector, VideoDisplay, ControlPanel
 from .utils import resource_path
 
+# Модули, которые загружаются в фоне после показа окна
+BACKEND_MODULES = (
+    'cv2',
+    'numpy',
+    'PIL.Image',
+    '.camera_manager',
+    '.camera_discovery',
+    '.image_processor',
+    '.file_manager',
+    '.save_queue',
+    '.burst',
+    '.motion',
+    '.timelapse',
+    '.recorder',
+    '.preview_loop',
+)
+
 
 class DualCameraApp:
     """Главный класс приложения"""
 
-    def __init__(self):
-        self.camera_manager = CameraManager()
-        self.image_processor = ImageProcessor()
-        self.file_manager = FileManager()
+    def __init__(self, started_at: Optional[float] = None):
+        # Этапы запуска в секундах от started_at (time.perf_counter)
+        self.started_at = started_at or time.perf_counter()
+        self.startup_times = {}
+
+        # Создаются в setup_backend после загрузки модулей
+        self.backend_ready = False
+        self.camera_manager = None
+        self.save_queue = None
+        self.preview_loop = None
+
+        # Замеры по этапам: оверлей и запись в файл требуют сбора
+        if STATS_OVERLAY or STATS_DUMP_FILE:
+            STATS.enabled = True
+        self.stats_dumper = StatsDumper()
+        self.stats_dumper.start()
+        self.overlay_updated_at = 0.0
 
-        self.captured_frame1 = None
-        self.captured_frame2 = None
         self.is_running = False
-        self.update_thread = None
+        self.refresh_job = None
+        self.capture_status_job = None
+        # Отмена записи, которая еще запускается, см. toggle_recording
+        self.recording_start: Optional[threading.Event] = None
 
         self.setup_window()
         self.setup_ui()
+        self.window.bind('<Map>', self.on_window_mapped, add='+')
+
+    def mark_startup(self, stage: str):
+        """Отметка этапа запуска"""
+        if stage not in self.startup_times:
+            elapsed = time.perf_counter() - self.started_at
+            self.startup_times[stage] = elapsed
+            print(f'Запуск: {stage} через {elapsed:.2f} с')
+
+    def on_window_mapped(self, event):
+        """Окно показано: можно загружать остальное"""
+        if event.widget is not self.window or 'window' in self.startup_times:
+            return
+        self.mark_startup('window')
+        # Загрузка начинается после отрисовки окна, а не вместо нее
+        self.window.after_idle(self.load_backend_async)
+
+    def load_backend_async(self):
+        """Импорт тяжелых модулей в фоновом потоке"""
+
+        def load():
+            try:
+                for name in BACKEND_MODULES:
+                    importlib.import_module(name, __package__)
+            except Exception as e:
+                self.window.after(0, self.on_backend_failed, e)
+                return
+            self.window.after(0, self.setup_backend)
+
+        threading.Thread(target=load, name='backend-load', daemon=True).start()
+
+    def on_backend_failed(self, error: Exception):
+        """Модули не загрузились: работать без них нельзя"""
+        print(f'Ошибка загрузки модулей: {error}')
+        messagebox.showerror(
+            'Ошибка', f'Не удалось загрузить модули:\n{error}'
+        )
+
+    def setup_backend(self):
+        """Создание объектов захвата и сохранения в потоке окна"""
+        # Модули уже в sys.modules, импорт здесь ничего не стоит
+        from .burst import BurstCapture, burst_frames
+        from .camera_manager import CameraManager
+        from .file_manager import FileManager
+        from .image_processor import ImageProcessor, PreviewRenderer
+        from .motion import MotionCapture
+        from .preview_loop import PreviewLoop
+        from .recorder import VideoRecorder
+        from .save_queue import SaveQueue
+        from .timelapse import TimelapseCapture
+
+        self.camera_manager = CameraManager()
+        self.image_processor = ImageProcessor()
+        self.file_manager = FileManager()
+        self.save_queue = SaveQueue()
+        self.burst_capture = BurstCapture(
+            self.camera_manager,
+            self.save_queue,
+            burst_frames(BURST_PRE_FRAMES, BURST_PRE_SECONDS),
+            burst_frames(BURST_POST_FRAMES, BURST_POST_SECONDS),
+        )
+        self.video_recorder = VideoRecorder(self.camera_manager)
+        self.motion_capture = MotionCapture(
+            self.camera_manager, self.save_queue
+        )
+        self.timelapse = TimelapseCapture(
+            self.camera_manager, self.save_queue
+        )
+
+        # Отрисовка предпросмотра: свой холст и состояние для каждой камеры
+        self.renderers = {
+            n: PreviewRenderer(self.preview_size) for n in self.displays
+        }
+        self.preview_loop = PreviewLoop(self.camera_manager, self.renderers)
+        self.shown_seq = {n: 0 for n in self.displays}
+
+        # Трансляция по HTTP берет кадры у менеджера камер сама
+        self.preview_server = None
+        if STREAM_ENABLED:
+            from .stream_server import PreviewServer
+
+            self.preview_server = PreviewServer(self.camera_manager)
+            if not self.preview_server.start():
+                self.preview_server = None
+
+        self.backend_ready = True
+        self.mark_startup('backend')
         self.setup_cameras()
 
     def setup_window(self):
@@ -51,7 +174,11 @@ class DualCameraApp:
 
         tk.Label(
             info_frame,
-            text='Одновременный просмотр с двух камер',
+            text=(
+                'Одновременный просмотр с двух камер'
+                if CAMERA_SLOTS == 2
+                else 'Одновременный просмотр с нескольких камер'
+            ),
             font=('Arial', 14, 'bold'),
         ).pack()
 
@@ -63,16 +190,17 @@ class DualCameraApp:
         cameras_frame = tk.Frame(main_control_frame)
         cameras_frame.pack(side='left', padx=10)
 
-        # Селекторы камер
-        self.camera1_selector = CameraSelector(
-            cameras_frame, 'Камера 1', [], self.switch_camera1
-        )
-        self.camera1_selector.pack(side='left', padx=10, pady=5)
-
-        self.camera2_selector = CameraSelector(
-            cameras_frame, 'Камера 2', [], self.switch_camera2
-        )
-        self.camera2_selector.pack(side='left', padx=10, pady=5)
+        # Селекторы камер: по одному на каждое место в сетке
+        self.selectors = {}
+        for camera_number in range(1, CAMERA_SLOTS + 1):
+            selector = CameraSelector(
+                cameras_frame,
+                f'Камера {camera_number}',
+                [],
+                lambda n=camera_number: self.switch_camera(n),
+            )
+            selector.pack(side='left', padx=10, pady=5)
+            self.selectors[camera_number] = selector
 
         # Правая часть - управление
         self.control_panel = ControlPanel(
@@ -81,20 +209,33 @@ class DualCameraApp:
                 'start': self.start_streaming,
                 'stop': self.stop_streaming,
                 'capture': self.capture_and_save_images,
+                'burst': self.capture_burst,
+                'record': self.toggle_recording,
+                'motion': self.toggle_motion_capture,
+                'timelapse': self.toggle_timelapse,
                 'close': self.close_app,
             },
         )
         self.control_panel.pack(side='left', padx=20, pady=5)
 
-        # Панель видео
+        # Панель видео: почти квадратная сетка, при нескольких рядах
+        # предпросмотр уменьшается, чтобы окно помещалось на экран
         video_frame = tk.Frame(self.window)
         video_frame.pack(pady=15)
 
-        self.video1_display = VideoDisplay(video_frame, 'Камера 1')
-        self.video1_display.pack(side='left', padx=15)
+        columns = math.ceil(math.sqrt(CAMERA_SLOTS))
+        rows = math.ceil(CAMERA_SLOTS / columns)
+        self.preview_size = VIDEO_SIZE // rows
+        container_size = self.preview_size + VIDEO_CONTAINER_SIZE - VIDEO_SIZE
 
-        self.video2_display = VideoDisplay(video_frame, 'Камера 2')
-        self.video2_display.pack(side='left', padx=15)
+        self.displays = {}
+        for camera_number in range(1, CAMERA_SLOTS + 1):
+            display = VideoDisplay(
+                video_frame, f'Камера {camera_number}', container_size
+            )
+            row, column = divmod(camera_number - 1, columns)
+            display.grid(row=row, column=column, padx=15, pady=5)
+            self.displays[camera_number] = display
 
         # Панель сохранения
         save_frame = tk.Frame(self.window)
@@ -107,108 +248,166 @@ class DualCameraApp:
         self.directory_entry.insert(0, DEFAULT_SAVE_FOLDER)
         self.directory_entry.pack(pady=5)
 
+        # До загрузки модулей камеры выбрать нельзя
+        for selector in self.selectors.values():
+            selector.set_options(['Загрузка...'])
+            selector.set_value('Загрузка...')
+
     def setup_cameras(self):
-        """Настройка списка доступных камер"""
-        available_cameras = CameraManager.find_available_cameras()
+        """Настройка списка доступных камер без блокировки окна"""
+        from .camera_discovery import CameraDiscovery
+
+        discovery = CameraDiscovery()
+
+        # Сразу показываем камеры из прошлого запуска
+        self.available_cameras = discovery.load_cache()
+        self.camera_search_active = True
+        self.update_camera_options()
+
+        # Актуальный список дополняется по мере ответа камер
+        print('Поиск доступных камер...')
+        discovery.discover_async(
+            on_found=lambda index: self.window.after(
+                0, self.add_camera_option, index
+            ),
+            on_done=lambda cameras: self.window.after(
+                0, self.finish_camera_search, cameras
+            ),
+        )
+
+    def add_camera_option(self, camera_index: int):
+        """Добавление найденной камеры в списки выбора"""
+        if camera_index not in self.available_cameras:
+            self.available_cameras.append(camera_index)
+            self.available_cameras.sort()
+            self.update_camera_options()
+
+    def finish_camera_search(self, available_cameras: list):
+        """Завершение фонового поиска камер"""
+        print(f'Всего найдено камер: {len(available_cameras)}')
+        self.mark_startup('cameras')
+        self.available_cameras = list(available_cameras)
+        self.camera_search_active = False
+        self.update_camera_options()
+
+    def update_camera_options(self):
+        """Обновление списков камер и значений по умолчанию"""
+        available_cameras = self.available_cameras
         camera_options = [f'Камера {i}' for i in available_cameras]
 
         if not camera_options:
-            camera_options = ['Нет доступных камер']
-
-        self.camera1_selector.set_options(camera_options)
-        self.camera2_selector.set_options(camera_options)
-
-        # Устанавливаем значения по умолчанию
-        if len(available_cameras) >= 1:
-            self.camera1_selector.set_value(f'Камера {available_cameras[0]}')
-        if len(available_cameras) >= 2:
-            self.camera2_selector.set_value(f'Камера {available_cameras[1]}')
-        elif len(available_cameras) >= 1:
-            self.camera2_selector.set_value(f'Камера {available_cameras[0]}')
-
-    def switch_camera1(self):
-        """Подключение первой камеры"""
-        selected = self.camera1_selector.get_value()
-        if 'Камера' in selected:
-            camera_index = int(selected.split()[-1])
-
-            if self.camera_manager.connect_camera(1, camera_index):
-                self.camera1_selector.set_status('Подключена', 'green')
+            camera_options = [
+                'Поиск камер...'
+                if self.camera_search_active
+                else 'Нет доступных камер'
+            ]
+
+        for selector in self.selectors.values():
+            selector.set_options(camera_options)
+
+        # Устанавливаем значения по умолчанию, не трогая выбор пользователя
+        values = [s.get_value() for s in self.selectors.values()]
+        distinct = min(len(values), len(available_cameras))
+        if len(set(values)) >= distinct and all(
+            v in camera_options for v in values
+        ):
+            return
+        # Каждому месту - своя камера, пока их хватает; повтор устройства
+        # не открывает его второй раз (см. CameraManager.devices)
+        for i, selector in enumerate(self.selectors.values()):
+            if available_cameras:
+                index = available_cameras[i % len(available_cameras)]
+                selector.set_value(f'Камера {index}')
             else:
-                self.camera1_selector.set_status('Ошибка подключения', 'red')
+                selector.set_value(camera_options[0])
 
-    def switch_camera2(self):
-        """Подключение второй камеры"""
-        selected = self.camera2_selector.get_value()
+    def switch_camera(self, camera_number: int):
+        """Подключение выбранной камеры на место camera_number"""
+        selector = self.selectors[camera_number]
+        selected = selector.get_value()
         if 'Камера' in selected:
             camera_index = int(selected.split()[-1])
 
-            if self.camera_manager.connect_camera(2, camera_index):
-                self.camera2_selector.set_status('Подключена', 'green')
+            if self.camera_manager.connect_camera(camera_number, camera_index):
+                selector.set_status('Подключена', 'green')
             else:
-                self.camera2_selector.set_status('Ошибка подключения', 'red')
+                selector.set_status('Ошибка подключения', 'red')
 
-    def update_frames(self):
-        """Обновление кадров с обеих камер"""
-        while self.is_running:
-            try:
-                # Обновляем первую камеру
-                ret1, frame1 = self.camera_manager.read_frame(1)
-                if ret1 and frame1 is not None:
-                    processed_frame1 = self.image_processor.process_frame(
-                        frame1, VIDEO_SIZE
-                    )
-                    if processed_frame1:
-                        photo1 = ImageTk.PhotoImage(processed_frame1)
-                        self.window.after(
-                            0, lambda: self.video1_display.update_image(photo1)
-                        )
-                else:
-                    self.window.after(
-                        0,
-                        lambda: self.video1_display.set_text(
-                            'Камера 1\nне отвечает'
-                        ),
-                    )
-
-                # Обновляем вторую камеру
-                ret2, frame2 = self.camera_manager.read_frame(2)
-                if ret2 and frame2 is not None:
-                    processed_frame2 = self.image_processor.process_frame(
-                        frame2, VIDEO_SIZE
-                    )
-                    if processed_frame2:
-                        photo2 = ImageTk.PhotoImage(processed_frame2)
-                        self.window.after(
-                            0, lambda: self.video2_display.update_image(photo2)
+    def refresh_displays(self):
+        """Вывод последних готовых кадров, вызывается таймером Tk"""
+        if not self.is_running:
+            return
+
+        for camera_number, display in self.displays.items():
+            if self.preview_loop.camera_stalled[camera_number]:
+                display.set_text(f'Камера {camera_number}\nне отвечает')
+                continue
+
+            # Устаревшие кадры не копятся: берется только последний
+            renderer = self.renderers[camera_number]
+            with renderer.latest() as (image, seq):
+                if seq != self.shown_seq[camera_number]:
+                    start = STATS.start()
+                    if start:
+                        STATS.add(
+                            camera_number,
+                            'handoff',
+                            start - renderer.published_at,
                         )
-                else:
-                    self.window.after(
-                        0,
-                        lambda: self.video2_display.set_text(
-                            'Камера 2\nне отвечает'
-                        ),
-                    )
+                    display.show_image(image)
+                    STATS.record(camera_number, 'display', start)
+                    self.shown_seq[camera_number] = seq
+                    self.mark_startup('first_frame')
 
-                time.sleep(1.0 / FPS)
+        if STATS_OVERLAY:
+            self.update_overlays()
 
-            except Exception as e:
-                print(f'Ошибка в update_frames: {e}')
-                time.sleep(0.1)
+        self.refresh_job = self.window.after(
+            DISPLAY_REFRESH_MS, self.refresh_displays
+        )
+
+    def update_overlays(self):
+        """Вывод показателей поверх видео не чаще двух раз в секунду"""
+        now = time.monotonic()
+        if now - self.overlay_updated_at < 0.5:
+            return
+        self.overlay_updated_at = now
+
+        snapshot = STATS.snapshot()
+        preview = self.preview_loop.get_stats()
+        for camera_number, display in self.displays.items():
+            capture = self.camera_manager.get_capture_stats(camera_number)
+            lines = [
+                f'захват {capture.get("fps", 0):.1f} к/с, '
+                f'потеряно {capture.get("dropped", 0)}',
+                f'показ {preview["fps"]:.1f} к/с, '
+                f'пропущено сроков {preview["missed_deadlines"]}',
+                f'без изменений {self.preview_loop.skipped[camera_number]}',
+            ]
+            for stage, values in snapshot.get(camera_number, {}).items():
+                lines.append(
+                    f'{stage}: {values["p50_ms"]:.1f} / '
+                    f'{values["p99_ms"]:.1f} мс'
+                )
+            display.set_overlay('\n'.join(lines))
 
     def start_streaming(self):
         """Запуск трансляции"""
-        if not self.camera_manager.cam1 and not self.camera_manager.cam2:
+        if not self.backend_ready:
+            return
+        if not self.camera_manager.has_cameras():
             messagebox.showwarning(
                 'Предупреждение', 'Подключите хотя бы одну камеру!'
             )
             return
 
+        self.shown_seq = {n: 0 for n in self.displays}
         self.is_running = True
-        self.update_thread = threading.Thread(
-            target=self.update_frames, daemon=True
-        )
-        self.update_thread.start()
+        self.preview_loop.start()
+        self.refresh_displays()
+
+        # Кольцо серийной съемки копит кадры до нажатия
+        self.burst_capture.arm(tuple(self.displays))
 
         self.control_panel.set_streaming_state(True)
         print('Трансляция запущена')
@@ -216,79 +415,196 @@ class DualCameraApp:
     def stop_streaming(self):
         """Остановка трансляции"""
         self.is_running = False
-        if self.update_thread:
-            self.update_thread.join(timeout=1.0)
-
-        self.video1_display.set_text('Камера 1\nостановлена')
-        self.video2_display.set_text('Камера 2\nостановлена')
+        self.burst_capture.disarm()
+        if self.motion_capture.is_active:
+            self.motion_capture.stop()
+            self.control_panel.set_motion_state(False)
+        if self.timelapse.is_active:
+            self.timelapse.stop(wait=False)
+        if self.recording_start:
+            # Запись еще запускается: ее остановит поток запуска или
+            # on_recording_started
+            self.recording_start.set()
+            self.control_panel.set_recording_state('normal')
+        elif self.video_recorder.is_recording:
+            self.video_recorder.stop()
+            self.control_panel.set_recording_state('normal')
+        self.preview_loop.stop()
+        if self.refresh_job:
+            self.window.after_cancel(self.refresh_job)
+            self.refresh_job = None
+
+        for camera_number, display in self.displays.items():
+            display.set_text(f'Камера {camera_number}\nостановлена')
 
         self.control_panel.set_streaming_state(False)
         print('Трансляция остановлена')
 
     def capture_and_save_images(self):
-        """Захват и сохранение изображений"""
-        self.control_panel.set_capture_status('saving')
-
-        captured_any = False
-
-        # Захват с первой камеры
-        ret1, frame1 = self.camera_manager.read_frame(1)
-        if ret1 and frame1 is not None:
-            self.captured_frame1 = self.image_processor.prepare_for_save(
-                frame1
-            )
-            captured_any = True
-            print('Снимок с камеры 1 сделан')
-        else:
-            self.captured_frame1 = None
-
-        # Захват со второй камеры
-        ret2, frame2 = self.camera_manager.read_frame(2)
-        if ret2 and frame2 is not None:
-            self.captured_frame2 = self.image_processor.prepare_for_save(
-                frame2
-            )
-            captured_any = True
-            print('Снимок с камеры 2 сделан')
-        else:
-            self.captured_frame2 = None
-
-        if captured_any:
-            self.save_images()
-        else:
-            self.control_panel.set_capture_status('normal')
+        """Захват изображений и передача их в очередь сохранения"""
+        # Кадры всех камер подбираются по ближайшему времени захвата
+        snapshot = self.camera_manager.capture_synchronized(
+            tuple(self.displays)
+        )
+        if snapshot is None:
             print('Не удалось сделать снимки ни с одной камеры')
+            return
 
-    def save_images(self):
-        """Сохранение изображений"""
-        folder = self.directory_entry.get()
+        cameras = ', '.join(str(n) for n in snapshot.frames)
+        print(
+            f'Снимок с камер {cameras} сделан, '
+            f'расхождение {snapshot.skew * 1000:.1f} мс'
+        )
 
-        saved_files = self.file_manager.save_images(
-            self.captured_frame1, self.captured_frame2, folder
+        # Отражение, кодирование и запись выполняются в фоне
+        future = self.save_queue.submit(
+            snapshot.frames,
+            self.directory_entry.get(),
+            release=snapshot.release,
+            timestamps=snapshot.timestamps,
+        )
+        if future is None:
+            snapshot.release()
+            print('Очередь сохранения заполнена, снимок пропущен')
+            self.show_capture_status('busy')
+            return
+
+        self.control_panel.set_capture_status('saving')
+        future.add_done_callback(
+            lambda f: self.window.after(0, self.on_images_saved, f)
         )
 
+    def on_images_saved(self, future):
+        """Обработка результата фонового сохранения"""
+        saved_files = future.result()
         if saved_files:
-            self.control_panel.set_capture_status('success')
             print(f'Сохранены файлы: {", ".join(saved_files)}')
+            self.show_capture_status('success')
+        else:
+            self.show_capture_status('error')
+
+    def toggle_recording(self):
+        """Запуск или остановка записи видео со всех камер"""
+        if self.recording_start:
+            return
+        if self.video_recorder.is_recording:
+            self.video_recorder.stop()
+            self.control_panel.set_recording_state('normal')
+            return
 
-            # Возврат к нормальному состоянию через 2 секунды
+        # Процессы-кодировщики стартуют не мгновенно, окно не ждем
+        self.control_panel.set_recording_state('starting')
+        folder = self.directory_entry.get()
+        cancel = self.recording_start = threading.Event()
+
+        def start():
+            filenames = self.video_recorder.start(folder, tuple(self.displays))
+            if cancel.is_set():
+                # Трансляцию остановили во время запуска, а окно могли
+                # уже закрыть
+                self.video_recorder.stop()
+                self.recording_start = None
+                return
             self.window.after(
-                2000, lambda: self.control_panel.set_capture_status('normal')
+                0, self.on_recording_started, cancel, filenames
             )
-        else:
-            self.control_panel.set_capture_status('error')
-            self.window.after(
-                2000, lambda: self.control_panel.set_capture_status('normal')
+
+        threading.Thread(target=start, daemon=True).start()
+
+    def on_recording_started(self, cancel: threading.Event, filenames: list):
+        """Окончание запуска записи в потоке окна"""
+        if self.recording_start is cancel:
+            self.recording_start = None
+        if cancel.is_set() or not self.is_running:
+            self.video_recorder.stop()
+            return
+        self.control_panel.set_recording_state(
+            'recording' if filenames else 'normal'
+        )
+
+    def toggle_motion_capture(self):
+        """Включение или выключение снимков по движению в кадре"""
+        if self.motion_capture.is_active:
+            self.motion_capture.stop()
+            self.control_panel.set_motion_state(False)
+            print(
+                f'Съемка по движению выключена, '
+                f'снимков: {self.motion_capture.shots}'
             )
+            return
+
+        self.motion_capture.start(
+            self.directory_entry.get(),
+            tuple(self.displays),
+            on_saved=lambda f: self.window.after(
+                0, self.on_images_saved, f
+            ),
+        )
+        self.control_panel.set_motion_state(True)
+        print('Съемка по движению включена')
+
+    def toggle_timelapse(self):
+        """Включение или выключение интервальной съемки"""
+        if self.timelapse.is_active:
+            # Кнопку вернет on_finished из потока съемки
+            self.timelapse.stop(wait=False)
+            return
 
-        # Сброс захваченных кадров
-        self.captured_frame1 = None
-        self.captured_frame2 = None
+        started = self.timelapse.start(
+            self.directory_entry.get(),
+            tuple(self.displays),
+            on_saved=lambda f: self.window.after(
+                0, self.on_images_saved, f
+            ),
+            on_finished=lambda: self.window.after(
+                0, self.control_panel.set_timelapse_state, False
+            ),
+        )
+        if started:
+            self.control_panel.set_timelapse_state(True)
+
+    def capture_burst(self):
+        """Серийная съемка с кадрами до и после нажатия"""
+        started = self.burst_capture.trigger(
+            self.directory_entry.get(),
+            on_done=lambda files: self.window.after(
+                0, self.on_burst_saved, files
+            ),
+        )
+        if started:
+            self.control_panel.set_burst_status('recording')
+
+    def on_burst_saved(self, saved_files: list):
+        """Обработка результата серийной съемки"""
+        self.control_panel.set_burst_status(
+            'success' if saved_files else 'error'
+        )
+        # Пока показывался результат, трансляцию могли остановить
+        self.window.after(
+            2000,
+            lambda: self.control_panel.set_burst_status(
+                'normal' if self.is_running else 'disabled'
+            ),
+        )
+
+    def show_capture_status(self, status: str):
+        """Показ статуса снимка с возвратом к обычному через 2 секунды"""
+        self.control_panel.set_capture_status(status)
+        if self.capture_status_job:
+            self.window.after_cancel(self.capture_status_job)
+        self.capture_status_job = self.window.after(
+            2000, lambda: self.control_panel.set_capture_status('normal')
+        )
 
     def close_app(self):
         """Закрытие приложения"""
-        self.stop_streaming()
-        self.camera_manager.release_all()
+        if self.backend_ready:
+            self.stop_streaming()
+            if self.preview_server:
+                self.preview_server.stop()
+            self.camera_manager.release_all()
+            self.save_queue.shutdown()
+        self.stats_dumper.stop()
         self.window.destroy()
 
     def run(self):
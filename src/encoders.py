@@ -0,0 +1,135 @@
+"""Кодировщики снимков
+
+Кадр кодируется в память (cv2.imencode, для .npy - np.save в BytesIO),
+поэтому время кодирования замеряется отдельно от записи на диск.
+"""
+
+import argparse
+import io
+from dataclasses import dataclass
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from .config import (
+    JPEG_OPTIMIZE,
+    JPEG_PROGRESSIVE,
+    JPEG_QUALITY,
+    PNG_COMPRESSION,
+    SAVE_FORMAT,
+    WEBP_QUALITY,
+)
+
+FORMATS = ('jpeg', 'png', 'webp', 'npy')
+EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'webp': '.webp', 'npy': '.npy'}
+
+
+@dataclass(frozen=True)
+class ImageEncoder:
+    """Формат снимков и параметры сжатия
+
+    quality - качество JPEG и WebP (без него берется значение из
+    config), compression - уровень сжатия PNG. Параметры чужого
+    формата не используются.
+    """
+
+    format: str = SAVE_FORMAT
+    quality: Optional[int] = None
+    progressive: bool = JPEG_PROGRESSIVE
+    optimize: bool = JPEG_OPTIMIZE
+    compression: int = PNG_COMPRESSION
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(
+                f'Неизвестный формат {self.format!r}, '
+                f'доступны: {", ".join(FORMATS)}'
+            )
+
+    @property
+    def extension(self) -> str:
+        """Расширение файлов"""
+        return EXTENSIONS[self.format]
+
+    def params(self) -> List[int]:
+        """Параметры cv2.imencode"""
+        if self.format == 'jpeg':
+            return [
+                cv2.IMWRITE_JPEG_QUALITY,
+                self.quality or JPEG_QUALITY,
+                cv2.IMWRITE_JPEG_PROGRESSIVE,
+                int(self.progressive),
+                cv2.IMWRITE_JPEG_OPTIMIZE,
+                int(self.optimize),
+            ]
+        if self.format == 'png':
+            return [cv2.IMWRITE_PNG_COMPRESSION, self.compression]
+        if self.format == 'webp':
+            return [cv2.IMWRITE_WEBP_QUALITY, self.quality or WEBP_QUALITY]
+        return []
+
+    def encode(self, frame):
+        """Кодирование кадра в память
+
+        Возвращает объект с буферным протоколом (годится для записи в
+        файл как есть) или None, если кодирование не удалось.
+        """
+        if self.format == 'npy':
+            stream = io.BytesIO()
+            np.save(stream, frame, allow_pickle=False)
+            return stream.getbuffer()
+        ok, data = cv2.imencode(self.extension, frame, self.params())
+        return data if ok else None
+
+    def describe(self) -> str:
+        """Краткое описание для журналов и бенчмарков"""
+        if self.format == 'jpeg':
+            text = f'jpeg q{self.quality or JPEG_QUALITY}'
+            if self.progressive:
+                text += ' progressive'
+            if self.optimize:
+                text += ' optimize'
+            return text
+        if self.format == 'png':
+            return f'png c{self.compression}'
+        if self.format == 'webp':
+            return f'webp q{self.quality or WEBP_QUALITY}'
+        return 'npy'
+
+
+def add_encoder_arguments(parser: argparse.ArgumentParser):
+    """Аргументы выбора формата снимков"""
+    parser.add_argument(
+        '--format', choices=FORMATS, default=SAVE_FORMAT, help='формат файлов'
+    )
+    parser.add_argument(
+        '--quality', type=int, default=None, help='качество JPEG или WebP'
+    )
+    parser.add_argument(
+        '--progressive', action='store_true', help='прогрессивный JPEG'
+    )
+    parser.add_argument(
+        '--optimize',
+        action='store_true',
+        help='оптимизация таблиц Хаффмана JPEG',
+    )
+    parser.add_argument(
+        '--png-compression',
+        type=int,
+        choices=range(10),
+        default=PNG_COMPRESSION,
+        metavar='0-9',
+        help='уровень сжатия PNG',
+    )
+
+
+def encoder_from_args(args: argparse.Namespace) -> ImageEncoder:
+    """Кодировщик по аргументам add_encoder_arguments"""
+    return ImageEncoder(
+        args.format,
+        args.quality,
+        args.progressive or JPEG_PROGRESSIVE,
+        args.optimize or JPEG_OPTIMIZE,
+        args.png_compression,
+    )
@@ -1,14 +1,66 @@
 """Управление файлами и сохранением"""
 
 import os
-import cv2
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Union
+
+from .catalog import catalog_for
+from .config import CATALOG_ENABLED, SAVE_WRITE_BUFFER
+from .encoders import ImageEncoder
+from .stats import STATS
+
+# Сеанс съемки: все снимки одного запуска приложения
+SESSION_ID = f'{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}'
+
+
+@dataclass(frozen=True)
+class CaptureId:
+    """Общая часть имен файлов одного снимка со всех камер"""
+
+    timestamp: float  # time.time() момента снимка
+    seq: int  # номер снимка в сеансе
+
+    @property
+    def name(self) -> str:
+        """Метка для имени файла: время до миллисекунд и номер"""
+        moment = datetime.fromtimestamp(self.timestamp)
+        milliseconds = moment.microsecond // 1000
+        return f'{moment:%Y%m%d_%H%M%S}_{milliseconds:03d}_{self.seq:06d}'
 
 
 class FileManager:
     """Класс для работы с файлами"""
 
+    # Формат снимков сеанса; меняется через set_encoder
+    encoder = ImageEncoder()
+
+    _id_lock = threading.Lock()
+    _last_seq = 0
+    _last_timestamp = 0.0
+
+    @staticmethod
+    def new_capture_id() -> CaptureId:
+        """Новая метка снимка
+
+        Метки строго возрастают: номер растет всегда, а время не
+        уменьшается, даже если системные часы перевели назад. Поэтому
+        имена не совпадают, сколько бы снимков ни пришлось на секунду.
+        """
+        with FileManager._id_lock:
+            timestamp = max(time.time(), FileManager._last_timestamp)
+            FileManager._last_timestamp = timestamp
+            FileManager._last_seq += 1
+            return CaptureId(timestamp, FileManager._last_seq)
+
+    @staticmethod
+    def set_encoder(encoder: ImageEncoder):
+        """Выбор формата снимков до конца сеанса"""
+        FileManager.encoder = encoder
+        print(f'Формат снимков: {encoder.describe()}')
+
     @staticmethod
     def ensure_directory_exists(path: str) -> bool:
         """Создает директорию, если её нет"""
@@ -20,40 +72,126 @@ class FileManager:
             return False
 
     @staticmethod
-    def save_image(frame, folder: str, camera_number: int) -> Optional[str]:
-        """Сохранение изображения"""
+    def filename_for(
+        capture_id: CaptureId,
+        camera_number: int,
+        tag: str = '',
+        encoder: Optional[ImageEncoder] = None,
+    ) -> str:
+        """Имя файла снимка камеры"""
+        label = capture_id.name
+        if tag:
+            label = f'{label}_{tag}'
+        encoder = encoder or FileManager.encoder
+        return f'{label}_camera{camera_number}{encoder.extension}'
+
+    @staticmethod
+    def save_image(
+        frame,
+        folder: str,
+        camera_number: int,
+        tag: str = '',
+        capture_id: Optional[CaptureId] = None,
+        group: str = '',
+        encoder: Optional[ImageEncoder] = None,
+        session: str = '',
+    ) -> Optional[str]:
+        """Сохранение изображения
+
+        Кадры одного снимка с разных камер получают общий capture_id,
+        а имена файлов отличаются только номером камеры. group
+        объединяет несколько снимков (например, серию) в каталоге.
+        Без encoder используется формат сеанса FileManager.encoder,
+        без session - текущий сеанс.
+        """
         if frame is None:
             return None
 
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'{timestamp}_camera{camera_number}.jpg'
+        if capture_id is None:
+            capture_id = FileManager.new_capture_id()
+        encoder = encoder or FileManager.encoder
+        filename = FileManager.filename_for(
+            capture_id, camera_number, tag, encoder
+        )
         filepath = os.path.join(folder, filename)
 
         try:
-            cv2.imwrite(filepath, frame)
-            return filename
+            start = time.perf_counter()
+            data = encoder.encode(frame)
+            encode_seconds = time.perf_counter() - start
+            STATS.add(camera_number, 'encode', encode_seconds)
+            if data is None:
+                print(f'Ошибка кодирования кадра камеры {camera_number}')
+                return None
+
+            start = STATS.start()
+            FileManager.write_atomic(filepath, data)
+            STATS.record(camera_number, 'write', start)
         except Exception as e:
             print(f'Ошибка сохранения файла: {e}')
             return None
 
+        if CATALOG_ENABLED:
+            try:
+                catalog_for(folder).add(
+                    filename=filename,
+                    camera=camera_number,
+                    timestamp=capture_id.timestamp,
+                    capture_id=capture_id.name,
+                    group_id=group or capture_id.name,
+                    tag=tag,
+                    session=session or SESSION_ID,
+                    width=frame.shape[1],
+                    height=frame.shape[0],
+                    size=data.nbytes,
+                    encode_ms=encode_seconds * 1000,
+                )
+            except Exception as e:
+                # Файл уже записан; без записи в каталоге он не потерян
+                print(f'Ошибка записи в каталог: {e}')
+        return filename
+
     @staticmethod
-    def save_images(frame1, frame2, folder: str) -> List[str]:
-        """Сохранение изображений с обеих камер"""
+    def write_atomic(filepath: str, data) -> None:
+        """Запись во временный файл с последующим переименованием
+
+        Недописанный файл никогда не появляется под итоговым именем.
+        data - закодированный снимок в памяти; запись идет одним
+        вызовом через буфер SAVE_WRITE_BUFFER.
+        """
+        temp_path = f'{filepath}.tmp'
+        try:
+            with open(temp_path, 'wb', buffering=SAVE_WRITE_BUFFER) as f:
+                f.write(data)
+            os.replace(temp_path, filepath)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def save_images(
+        frames: Union[Dict[int, object], Sequence], folder: str
+    ) -> List[str]:
+        """Сохранение изображений со всех камер
+
+        frames - кадры по номерам камер или список кадров камер 1..N.
+        """
         saved_files = []
 
         if not FileManager.ensure_directory_exists(folder):
             return saved_files
 
-        # Сохраняем изображение с первой камеры
-        if frame1 is not None:
-            filename1 = FileManager.save_image(frame1, folder, 1)
-            if filename1:
-                saved_files.append(filename1)
-
-        # Сохраняем изображение со второй камеры
-        if frame2 is not None:
-            filename2 = FileManager.save_image(frame2, folder, 2)
-            if filename2:
-                saved_files.append(filename2)
+        if not isinstance(frames, dict):
+            frames = dict(enumerate(frames, start=1))
+
+        capture_id = FileManager.new_capture_id()
+        for camera_number, frame in sorted(frames.items()):
+            if frame is not None:
+                filename = FileManager.save_image(
+                    frame, folder, camera_number, capture_id=capture_id
+                )
+                if filename:
+                    saved_files.append(filename)
 
         return saved_files
@@ -0,0 +1,106 @@
+"""Пул заранее выделенных буферов кадров
+
+Поток захвата декодирует кадр прямо в буфер пула (форма read/retrieve
+с выходным массивом), а потребители - предпросмотр, снимок, запись -
+берут на буфер ссылку вместо копии. Когда последняя ссылка отпущена,
+буфер возвращается в пул и используется для следующего кадра.
+"""
+
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from .config import FRAME_POOL_SIZE
+
+
+class FrameBuffer:
+    """Буфер кадра со счетчиком ссылок"""
+
+    __slots__ = ('array', '_pool', '_refs')
+
+    def __init__(self, array: np.ndarray, pool: 'FramePool'):
+        self.array = array
+        self._pool = pool
+        self._refs = 1
+
+    def retain(self) -> 'FrameBuffer':
+        """Дополнительная ссылка на буфер"""
+        with self._pool._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        """Отпустить ссылку; последняя возвращает буфер в пул"""
+        self._pool._release(self)
+
+
+class FramePool:
+    """Пул буферов одной формы
+
+    checkout() выдает буфер с одной ссылкой. Если свободных нет,
+    выделяется новый: пул не блокирует захват, а вырастает до числа
+    одновременно занятых кадров. Сверх capacity буферы не хранятся.
+    При смене формы кадров свободные буферы старой формы отбрасываются.
+    """
+
+    def __init__(self, capacity: int = FRAME_POOL_SIZE):
+        self.capacity = capacity
+        self.shape: Optional[tuple] = None
+        self.dtype = np.uint8
+        self.allocated = 0
+        self._free: List[FrameBuffer] = []
+        self._lock = threading.Lock()
+
+    def _set_shape(self, shape: tuple, dtype):
+        """Смена формы буферов; вызывается под блокировкой"""
+        if shape != self.shape or dtype != self.dtype:
+            self.shape = shape
+            self.dtype = dtype
+            self._free.clear()
+
+    def checkout(self, shape: Optional[tuple] = None) -> Optional[FrameBuffer]:
+        """Свободный буфер; None, если форма еще неизвестна"""
+        with self._lock:
+            if shape is not None:
+                self._set_shape(shape, self.dtype)
+            if self.shape is None:
+                return None
+            if self._free:
+                buffer = self._free.pop()
+                buffer._refs = 1
+                return buffer
+            self.allocated += 1
+            shape, dtype = self.shape, self.dtype
+        return FrameBuffer(np.empty(shape, dtype), self)
+
+    def adopt(self, array: np.ndarray) -> FrameBuffer:
+        """Включение в пул массива, выделенного не пулом
+
+        Так пул узнает форму кадров от первого кадра источника.
+        """
+        with self._lock:
+            self._set_shape(array.shape, array.dtype)
+            self.allocated += 1
+        return FrameBuffer(array, self)
+
+    def free_count(self) -> int:
+        """Число свободных буферов"""
+        with self._lock:
+            return len(self._free)
+
+    def _release(self, buffer: FrameBuffer):
+        """Уменьшение счетчика ссылок"""
+        with self._lock:
+            if buffer._refs <= 0:
+                return  # повторный release
+            buffer._refs -= 1
+            if buffer._refs:
+                return
+            array = buffer.array
+            if (
+                array.shape == self.shape
+                and array.dtype == self.dtype
+                and len(self._free) < self.capacity
+            ):
+                self._free.append(buffer)
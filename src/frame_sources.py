@@ -0,0 +1,162 @@
+"""Источники кадров, заменяющие веб-камеры
+
+Классы повторяют нужную часть интерфейса cv2.VideoCapture, поэтому
+CameraManager работает с ними так же, как с настоящими камерами.
+"""
+
+import time
+from typing import Union
+
+import cv2
+import numpy as np
+
+
+class SyntheticSource:
+    """Генератор кадров заданного размера
+
+    Кадры готовятся заранее и выдаются по кругу, чтобы стоимость генерации
+    не искажала замеры. Если задан fps, выдача ограничивается этой
+    частотой, как у настоящей камеры.
+    """
+
+    def __init__(
+        self, width: int, height: int, fps: float = 0, frames: int = 8
+    ):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._frames = []
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 256, (height, width, 3), np.uint8)
+        for i in range(frames):
+            # Сдвиг делает кадры разными, как при движении в кадре
+            self._frames.append(np.roll(base, i * 8, axis=1))
+        self._index = 0
+        self._next_time = 0.0
+        self._opened = True
+
+    def isOpened(self) -> bool:
+        """Открыт ли источник"""
+        return self._opened
+
+    def grab(self) -> bool:
+        """Захват следующего кадра"""
+        if not self._opened:
+            return False
+        if self.fps:
+            now = time.monotonic()
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time) + 1.0 / self.fps
+        self._index = (self._index + 1) % len(self._frames)
+        return True
+
+    def retrieve(self, image=None) -> tuple:
+        """Выдача захваченного кадра"""
+        if not self._opened:
+            return False, None
+        frame = self._frames[self._index]
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame.copy()
+
+    def read(self, image=None) -> tuple:
+        """Захват и выдача кадра"""
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def set(self, prop_id: int, value: float) -> bool:
+        """Свойства источника не меняются"""
+        return False
+
+    def get(self, prop_id: int) -> float:
+        """Значение свойства источника"""
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def getBackendName(self) -> str:
+        """Имя источника для идентификации устройства"""
+        return 'SYNTHETIC'
+
+    def release(self):
+        """Закрытие источника"""
+        self._opened = False
+
+
+class VideoFileSource:
+    """Видеофайл в роли камеры, по окончании воспроизводится сначала"""
+
+    def __init__(self, path: str, fps: float = 0):
+        self.path = path
+        self.fps = fps
+        self._cap = cv2.VideoCapture(path)
+        self._next_time = 0.0
+
+    def isOpened(self) -> bool:
+        """Открыт ли источник"""
+        return self._cap.isOpened()
+
+    def grab(self) -> bool:
+        """Захват следующего кадра"""
+        if self.fps:
+            now = time.monotonic()
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time) + 1.0 / self.fps
+        if self._cap.grab():
+            return True
+        # Конец файла - начинаем заново
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self._cap.grab()
+
+    def retrieve(self, image=None) -> tuple:
+        """Выдача захваченного кадра"""
+        return self._cap.retrieve(image)
+
+    def read(self, image=None) -> tuple:
+        """Захват и выдача кадра"""
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def set(self, prop_id: int, value: float) -> bool:
+        """Свойства источника не меняются"""
+        return False
+
+    def get(self, prop_id: int) -> float:
+        """Значение свойства источника"""
+        return self._cap.get(prop_id)
+
+    def getBackendName(self) -> str:
+        """Имя источника для идентификации устройства"""
+        return 'FILE'
+
+    def release(self):
+        """Закрытие источника"""
+        self._cap.release()
+
+
+def open_source(source: Union[int, str]):
+    """Открытие источника кадров по описанию
+
+    Целое число - индекс камеры; 'synthetic:1280x720@30' - генератор
+    (частота необязательна); 'file:путь[@fps]' - видеофайл.
+    """
+    if isinstance(source, int) or str(source).isdigit():
+        return cv2.VideoCapture(int(source))
+
+    kind, _, spec = str(source).partition(':')
+    spec, _, fps = spec.rpartition('@') if '@' in spec else (spec, '', '0')
+    if kind == 'synthetic':
+        width, _, height = spec.partition('x')
+        return SyntheticSource(int(width), int(height), float(fps))
+    if kind == 'file':
+        return VideoFileSource(spec, float(fps))
+    raise ValueError(f'Неизвестный источник кадров: {source}')
@@ -0,0 +1,343 @@
+"""Съемка без окна для автоматических станций
+
+Модуль не загружает tkinter и PIL: кадры идут от потоков захвата
+прямо в очередь сохранения, без подготовки предпросмотра.
+"""
+
+import argparse
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+
+from .camera_manager import CameraManager
+from .config import (
+    CAMERA_STALL_TIMEOUT,
+    CAPTURE_BACKEND,
+    DEFAULT_SAVE_FOLDER,
+    STREAM_FPS,
+    STREAM_HOST,
+    STREAM_PORT,
+    STREAM_QUALITY,
+    STREAM_WIDTH,
+    TIMELAPSE_INTERVAL,
+)
+from .encoders import add_encoder_arguments, encoder_from_args
+from .file_manager import FileManager
+from .pacing import FramePacer
+from .save_queue import SaveQueue
+from .spool import RawSpool
+from .stream_server import PreviewServer
+from .timelapse import TimelapseCapture
+
+
+def parse_sources(value: str) -> List[Union[int, str]]:
+    """Список источников через запятую: индексы или описания"""
+    sources = []
+    for item in value.split(','):
+        item = item.strip()
+        if item:
+            sources.append(int(item) if item.isdigit() else item)
+    return sources
+
+
+def add_source_arguments(parser: argparse.ArgumentParser):
+    """Общие аргументы команд, открывающих камеры"""
+    parser.add_argument(
+        '--cameras',
+        type=parse_sources,
+        default=[0],
+        help='индексы камер или источники (file:путь, synthetic:WxH@fps) '
+        'через запятую',
+    )
+    parser.add_argument(
+        '--capture-fps',
+        type=float,
+        default=None,
+        help='ограничение частоты декодирования кадров камерой',
+    )
+    parser.add_argument(
+        '--backend',
+        choices=('thread', 'process'),
+        default=CAPTURE_BACKEND,
+        help='захват в потоках или в отдельных процессах',
+    )
+
+
+def add_capture_arguments(parser: argparse.ArgumentParser):
+    """Аргументы команды capture"""
+    add_source_arguments(parser)
+    parser.add_argument('--count', type=int, default=1, help='число снимков')
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=0.0,
+        help='период между снимками, с (0 - сразу подряд)',
+    )
+    parser.add_argument(
+        '--output', default=DEFAULT_SAVE_FOLDER, help='папка для снимков'
+    )
+    add_encoder_arguments(parser)
+
+
+def add_spool_arguments(parser: argparse.ArgumentParser):
+    """Аргументы команды spool"""
+    add_source_arguments(parser)
+    parser.add_argument(
+        '--duration', type=float, default=10.0, help='длительность записи, с'
+    )
+    parser.add_argument(
+        '--output', default=DEFAULT_SAVE_FOLDER, help='папка для записи'
+    )
+
+
+def add_serve_arguments(parser: argparse.ArgumentParser):
+    """Аргументы команды serve"""
+    add_source_arguments(parser)
+    parser.add_argument(
+        '--host',
+        default=STREAM_HOST,
+        help='адрес сервера, 0.0.0.0 - доступ из локальной сети',
+    )
+    parser.add_argument('--port', type=int, default=STREAM_PORT)
+    parser.add_argument(
+        '--fps', type=float, default=STREAM_FPS, help='частота трансляции'
+    )
+    parser.add_argument(
+        '--width',
+        type=int,
+        default=STREAM_WIDTH,
+        help='ширина кадра, 0 - как у камеры',
+    )
+    parser.add_argument(
+        '--quality', type=int, default=STREAM_QUALITY, help='качество JPEG'
+    )
+    parser.add_argument(
+        '--duration',
+        type=float,
+        default=0.0,
+        help='время работы, с (0 - до Ctrl+C)',
+    )
+
+
+def add_timelapse_arguments(parser: argparse.ArgumentParser):
+    """Аргументы команды timelapse"""
+    add_source_arguments(parser)
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=TIMELAPSE_INTERVAL,
+        help='период между снимками, с',
+    )
+    parser.add_argument(
+        '--start',
+        type=datetime.fromisoformat,
+        help='начало съемки, например 2024-05-01T06:00 (по умолчанию '
+        '- сразу)',
+    )
+    parser.add_argument(
+        '--end', type=datetime.fromisoformat, help='окончание съемки'
+    )
+    parser.add_argument(
+        '--count',
+        type=int,
+        default=0,
+        help='наибольшее число снимков, 0 - без ограничения',
+    )
+    parser.add_argument(
+        '--output', default=DEFAULT_SAVE_FOLDER, help='папка для снимков'
+    )
+    add_encoder_arguments(parser)
+
+
+def open_cameras(
+    args: argparse.Namespace,
+) -> Tuple[Optional[CameraManager], List[int]]:
+    """Подключение источников из add_source_arguments
+
+    Возвращает менеджер камер и номера открытых камер после их первых
+    кадров. Если не открылась ни одна, менеджер освобождается и
+    возвращается (None, []).
+    """
+    camera_manager = CameraManager(args.backend)
+    camera_numbers = []
+    for camera_number, source in enumerate(args.cameras, start=1):
+        if camera_manager.connect_camera(
+            camera_number, source, args.capture_fps
+        ):
+            camera_numbers.append(camera_number)
+        else:
+            print(f'Не удалось открыть источник {source}')
+
+    if not camera_numbers:
+        print('Нет ни одной камеры')
+        camera_manager.release_all()
+        return None, []
+
+    # Форма кадра и первый снимок берутся из первых кадров
+    for camera_number in camera_numbers:
+        camera_manager.wait_for_frame(camera_number, 0, CAMERA_STALL_TIMEOUT)
+    return camera_manager, camera_numbers
+
+
+def run_capture(args: argparse.Namespace) -> int:
+    """Серия снимков со всех камер, возвращает код завершения"""
+    FileManager.set_encoder(encoder_from_args(args))
+    camera_manager, camera_numbers = open_cameras(args)
+    if not camera_manager:
+        return 1
+    save_queue = SaveQueue()
+
+    pacer = FramePacer(1.0 / args.interval if args.interval > 0 else 0)
+    last_seq = {n: 0 for n in camera_numbers}
+    futures = []
+    started = time.monotonic()
+
+    try:
+        for shot in range(args.count):
+            pacer.wait()
+
+            # Ждем кадр новее прошлого снимка на каждой камере
+            for camera_number in camera_numbers:
+                camera_manager.wait_for_frame(
+                    camera_number,
+                    last_seq[camera_number],
+                    CAMERA_STALL_TIMEOUT,
+                )
+
+            # Снимок только из кадров новее прошлого, иначе - пропуск,
+            # а не повтор тех же кадров в новых файлах
+            snapshot = camera_manager.capture_synchronized(
+                camera_numbers, last_seq
+            )
+            if snapshot is None:
+                print(f'Снимок {shot + 1}: нет новых кадров')
+                continue
+            last_seq.update(snapshot.seqs)
+
+            future = save_queue.submit(
+                snapshot.frames,
+                args.output,
+                tag=f'{shot + 1:05d}',
+                block=True,
+                release=snapshot.release,
+                timestamps=snapshot.timestamps,
+            )
+            futures.append(future)
+            print(
+                f'Снимок {shot + 1}/{args.count}, '
+                f'расхождение {snapshot.skew * 1000:.1f} мс'
+            )
+    except KeyboardInterrupt:
+        print('Съемка прервана')
+    finally:
+        camera_manager.release_all()
+        save_queue.shutdown()
+
+    saved = sum(len(f.result()) for f in futures if f)
+    elapsed = time.monotonic() - started
+    print(
+        f'Сохранено файлов: {saved} за {elapsed:.1f} с, '
+        f'пропущено сроков: {pacer.missed}'
+    )
+    return 0 if saved else 1
+
+
+def run_spool(args: argparse.Namespace) -> int:
+    """Запись несжатых кадров всех камер, возвращает код завершения"""
+    camera_manager, camera_numbers = open_cameras(args)
+    if not camera_manager:
+        return 1
+
+    spool = RawSpool(camera_manager)
+    path = spool.start(args.output, camera_numbers)
+    if not path:
+        camera_manager.release_all()
+        return 1
+
+    started = time.monotonic()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        print('Запись прервана')
+    finally:
+        stats = spool.stop()
+        camera_manager.release_all()
+
+    elapsed = time.monotonic() - started
+    written = sum(s['written'] for s in stats.values())
+    megabytes = sum(s['bytes'] for s in stats.values()) / 1024 / 1024
+    print(
+        f'Записано кадров: {written} за {elapsed:.1f} с '
+        f'({megabytes / elapsed:.0f} МиБ/с). '
+        f'Конвертация: python main.py spool-convert {path}'
+    )
+    return 0 if written else 1
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    """Трансляция камер по HTTP без окна, возвращает код завершения"""
+    camera_manager, _ = open_cameras(args)
+    if not camera_manager:
+        return 1
+
+    server = PreviewServer(
+        camera_manager,
+        args.host,
+        args.port,
+        args.fps,
+        args.quality,
+        args.width,
+    )
+    if not server.start():
+        camera_manager.release_all()
+        return 1
+
+    try:
+        if args.duration > 0:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(1.0)
+    except KeyboardInterrupt:
+        print('Трансляция остановлена')
+    finally:
+        status = server.status()
+        server.stop()
+        camera_manager.release_all()
+
+    for camera_number, stats in status.items():
+        print(
+            f'Камера {camera_number}: кадров {stats["encoded"]}, '
+            f'пропущено медленными зрителями {stats["skipped"]}'
+        )
+    return 0
+
+
+def run_timelapse(args: argparse.Namespace) -> int:
+    """Интервальная съемка без окна, возвращает код завершения"""
+    if args.interval <= 0:
+        print('Интервал съемки должен быть больше нуля')
+        return 1
+    FileManager.set_encoder(encoder_from_args(args))
+    camera_manager, camera_numbers = open_cameras(args)
+    if not camera_manager:
+        return 1
+    save_queue = SaveQueue()
+
+    timelapse = TimelapseCapture(camera_manager, save_queue, args.interval)
+    started = timelapse.start(
+        args.output, camera_numbers, args.start, args.end, args.count
+    )
+    try:
+        # Короткие ожидания, чтобы Ctrl+C срабатывал и в Windows
+        while started and not timelapse.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        print('Съемка прервана')
+    finally:
+        timelapse.stop()
+        camera_manager.release_all()
+        save_queue.shutdown()
+
+    print(f'Сохранено файлов: {timelapse.saved}')
+    return 0 if timelapse.saved else 1
@@ -1,54 +1,112 @@
 """Обработка изображений с камер"""
 
-import cv2
-from PIL import Image
-from typing import Optional
+import threading
+import time
+import numpy as np
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Optional
 
+from .config import (
+    FRAME_TRANSFORMS,
+    PREVIEW_INTERPOLATION,
+    SAVE_INTERPOLATION,
+    SAVE_TRANSFORMS,
+)
+from .transforms import Color, Letterbox, Pipeline
 
-class ImageProcessor:
-    """Класс для обработки изображений"""
+if TYPE_CHECKING:
+    # PIL нужен только для предпросмотра; режим без окна его не загружает
+    from PIL import Image
 
-    @staticmethod
-    def process_frame(frame, size: int = 640) -> Optional[Image.Image]:
-        """Обработка кадра для отображения"""
+# Подготовка снимков и видео: общие преобразования и свои
+SAVE_PIPELINE = Pipeline(
+    list(FRAME_TRANSFORMS) + list(SAVE_TRANSFORMS), SAVE_INTERPOLATION, 'save'
+)
+
+
+class PreviewRenderer:
+    """Подготовка кадров одной камеры для предпросмотра
+
+    Конвейер FRAME_TRANSFORMS дополняется вписыванием в квадрат и
+    переводом в RGBA. Результат записывается в один из двух заранее
+    выделенных холстов, поэтому на кадр не выделяется новая память.
+    Пока поток отрисовки заполняет задний холст, передний можно читать
+    через latest().
+    """
+
+    def __init__(
+        self, size: int = 640, interpolation: str = PREVIEW_INTERPOLATION
+    ):
+        self.size = size
+        self.pipeline = Pipeline(
+            list(FRAME_TRANSFORMS) + [Letterbox(size, size), Color('rgba')],
+            interpolation,
+            'preview',
+        )
+
+        from PIL import Image
+
+        # Холсты RGBA: PIL может работать с ними без копирования
+        self._canvases = [
+            np.zeros((size, size, 4), np.uint8) for _ in range(2)
+        ]
+        self._images = [
+            Image.frombuffer('RGBA', (size, size), canvas, 'raw', 'RGBA', 0, 1)
+            for canvas in self._canvases
+        ]
+        self._back = 0
+        self._lock = threading.Lock()
+        self.seq = 0
+        self.published_at = 0.0
+
+    def render(
+        self, frame, camera_number: int = 0
+    ) -> Optional['Image.Image']:
+        """Преобразование кадра в задний холст и смена холстов"""
         if frame is None:
             return None
 
-        # Отражаем кадр горизонтально
-        frame = cv2.flip(frame, 1)
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # Изменяем размер с сохранением пропорций
-        h, w = frame_rgb.shape[:2]
-        aspect_ratio = w / h
-
-        if aspect_ratio > 1:  # Широкий формат
-            new_width = size
-            new_height = int(size / aspect_ratio)
-        else:  # Высокий формат
-            new_height = size
-            new_width = int(size * aspect_ratio)
-
-        resized_frame = cv2.resize(
-            frame_rgb,
-            (new_width, new_height),
-            interpolation=cv2.INTER_LANCZOS4,
-        )
+        self.pipeline.apply(frame, self._canvases[self._back], camera_number)
+
+        # Меняем холсты местами, дождавшись окончания чтения переднего
+        with self._lock:
+            front = self._back
+            self._back = 1 - front
+            self.seq += 1
+            self.published_at = time.perf_counter()
+        return self._images[front]
 
-        # Создаем изображение фиксированного размера с черными полосами
-        final_image = Image.new('RGB', (size, size), (0, 0, 0))
-        pil_frame = Image.fromarray(resized_frame)
+    @contextmanager
+    def latest(self):
+        """Последний готовый кадр и его номер
 
-        # Центрируем изображение
-        x = (size - new_width) // 2
-        y = (size - new_height) // 2
-        final_image.paste(pil_frame, (x, y))
+        Пока блок with открыт, холст не будет перезаписан.
+        """
+        with self._lock:
+            yield self._images[1 - self._back], self.seq
 
-        return final_image
+
+class ImageProcessor:
+    """Класс для обработки изображений
+
+    Кадры предпросмотра готовит PreviewRenderer: он держит холсты
+    между кадрами, поэтому отдельной разовой обработки нет.
+    """
 
     @staticmethod
-    def prepare_for_save(frame) -> Optional[any]:
-        """Подготовка кадра для сохранения"""
+    def prepare_for_save(
+        frame, dst=None, camera_number: int = 0, wall_time=None
+    ):
+        """Подготовка кадра для сохранения по конвейеру SAVE_PIPELINE
+
+        dst - заранее выделенный массив формы save_shape() для
+        результата, wall_time - время для метки на кадре.
+        """
         if frame is None:
             return None
-        return cv2.flip(frame, 1)
+        return SAVE_PIPELINE.apply(frame, dst, camera_number, wall_time)
+
+    @staticmethod
+    def save_shape(shape: tuple) -> tuple:
+        """Форма подготовленного для сохранения кадра"""
+        return SAVE_PIPELINE.output_shape(shape)
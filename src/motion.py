@@ -0,0 +1,204 @@
+"""Обнаружение изменений в кадре и съемка по движению"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .camera_manager import CameraManager
+from .capture_worker import FramePacket
+from .config import (
+    CHANGE_PIXEL_THRESHOLD,
+    CHANGE_THUMBNAIL_WIDTH,
+    MOTION_AREA,
+    MOTION_COOLDOWN,
+    MOTION_ROI,
+)
+from .save_queue import SaveQueue
+
+# Область кадра (x, y, ширина, высота) в долях от размеров кадра
+Roi = Tuple[float, float, float, float]
+
+
+class ChangeDetector:
+    """Сравнение кадров по крошечной миниатюре
+
+    Миниатюра - прореженный срез кадра (каждая step-я точка) без
+    копирования полного кадра, поэтому проверка стоит доли миллисекунды
+    даже для 1080p. Точка считается изменившейся, если сумма каналов
+    отличается больше чем на 3 * pixel_threshold; кадр - если таких
+    точек больше доли area.
+
+    С update_always=False опорная миниатюра обновляется только при
+    изменении: медленный дрейф накапливается и тоже будет замечен.
+    С update_always=True сравниваются соседние кадры (движение).
+    """
+
+    def __init__(
+        self,
+        area: float,
+        roi: Optional[Roi] = None,
+        pixel_threshold: int = CHANGE_PIXEL_THRESHOLD,
+        width: int = CHANGE_THUMBNAIL_WIDTH,
+        update_always: bool = False,
+    ):
+        self.area = area
+        self.roi = roi
+        self.pixel_threshold = pixel_threshold
+        self.width = width
+        self.update_always = update_always
+        self.last_score = 0.0
+        self._reference: Optional[np.ndarray] = None
+        self._shape = None
+        self._window = (slice(None), slice(None))
+
+    def _update_window(self, shape: tuple):
+        """Срез области интереса с прореживанием под размер кадра"""
+        if shape == self._shape:
+            return
+        height, width = shape[:2]
+        x, y, w, h = self.roi or (0.0, 0.0, 1.0, 1.0)
+        left, top = int(x * width), int(y * height)
+        right = max(left + 1, int((x + w) * width))
+        bottom = max(top + 1, int((y + h) * height))
+        step = max(1, (right - left) // self.width)
+        self._window = (slice(top, bottom, step), slice(left, right, step))
+        self._shape = shape
+        self._reference = None
+
+    def thumbnail(self, frame) -> np.ndarray:
+        """Миниатюра: сумма каналов прореженной области"""
+        self._update_window(frame.shape)
+        view = frame[self._window]
+        if view.ndim == 3:
+            return view.sum(axis=2, dtype=np.int16)
+        return view.astype(np.int16)
+
+    def score(self, frame) -> float:
+        """Доля изменившихся точек относительно опорной миниатюры"""
+        thumbnail = self.thumbnail(frame)
+        reference = self._reference
+        if reference is None:
+            self._reference = thumbnail
+            return 1.0
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        changed = np.abs(thumbnail - reference) > (
+            self.pixel_threshold * channels
+        )
+        score = float(np.count_nonzero(changed)) / changed.size
+        if self.update_always or score > self.area:
+            self._reference = thumbnail
+        return score
+
+    def changed(self, frame) -> bool:
+        """Заметно ли изменился кадр; первый кадр всегда изменен"""
+        self.last_score = self.score(frame)
+        return self.last_score > self.area
+
+    def reset(self):
+        """Сброс опорной миниатюры"""
+        self._reference = None
+
+
+class MotionCapture:
+    """Снимки со всех камер при движении в кадре любой из них
+
+    Детектор работает в потоках захвата на каждом кадре. При движении
+    делается синхронный снимок и передается в очередь сохранения;
+    следующий снимок - не раньше чем через cooldown секунд.
+    """
+
+    def __init__(
+        self,
+        camera_manager: CameraManager,
+        save_queue: SaveQueue,
+        area: float = MOTION_AREA,
+        roi: Optional[Roi] = MOTION_ROI,
+        cooldown: float = MOTION_COOLDOWN,
+    ):
+        self.camera_manager = camera_manager
+        self.save_queue = save_queue
+        self.area = area
+        self.roi = roi
+        self.cooldown = cooldown
+        self.is_active = False
+        self.shots = 0
+        self._lock = threading.Lock()
+        self._detectors: Dict[int, ChangeDetector] = {}
+        self._camera_numbers: Sequence[int] = ()
+        self._folder = ''
+        self._last_shot = 0.0
+        self._on_saved: Optional[Callable[[Future], None]] = None
+
+    def start(
+        self,
+        folder: str,
+        camera_numbers: Sequence[int],
+        on_saved: Optional[Callable[[Future], None]] = None,
+    ):
+        """Включение съемки по движению
+
+        on_saved получает Future каждого снимка со списком файлов.
+        """
+        if self.is_active:
+            return
+        self._folder = folder
+        self._on_saved = on_saved
+        self._camera_numbers = tuple(camera_numbers)
+        self._detectors = {
+            n: ChangeDetector(self.area, self.roi, update_always=True)
+            for n in self._camera_numbers
+        }
+        # Первое сравнение не считается движением
+        self._last_shot = time.monotonic()
+        self.is_active = True
+        for camera_number in self._camera_numbers:
+            self.camera_manager.add_frame_listener(
+                camera_number, self._on_frame
+            )
+
+    def stop(self):
+        """Выключение съемки по движению"""
+        self.is_active = False
+        for camera_number in self._camera_numbers:
+            self.camera_manager.remove_frame_listener(
+                camera_number, self._on_frame
+            )
+
+    def _on_frame(self, camera_number: int, packet: FramePacket):
+        """Проверка кадра, вызывается в потоке захвата"""
+        detector = self._detectors.get(camera_number)
+        if detector is None or not detector.changed(packet.frame):
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if not self.is_active or now - self._last_shot < self.cooldown:
+                return
+            self._last_shot = now
+            self.shots += 1
+            shot = self.shots
+
+        snapshot = self.camera_manager.capture_synchronized(
+            self._camera_numbers
+        )
+        if snapshot is None:
+            return
+        print(
+            f'Движение на камере {camera_number} '
+            f'({detector.last_score:.1%} кадра), снимок {shot}'
+        )
+        future = self.save_queue.submit(
+            snapshot.frames,
+            self._folder,
+            tag=f'motion{shot:04d}',
+            release=snapshot.release,
+            timestamps=snapshot.timestamps,
+        )
+        if future is None:
+            snapshot.release()
+            print('Очередь сохранения заполнена, снимок пропущен')
+        elif self._on_saved:
+            future.add_done_callback(self._on_saved)
@@ -0,0 +1,80 @@
+"""Планирование кадров по абсолютным срокам"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class FramePacer:
+    """Выдерживание частоты кадров без накопления отставания
+
+    Сроки отсчитываются от начала работы, а не от конца предыдущего
+    кадра, поэтому время обработки не снижает частоту. Если цикл
+    отстал на целые периоды, пропущенные сроки не догоняются, а
+    учитываются в missed.
+    """
+
+    def __init__(self, fps: float, window: int = 60):
+        self.period = 1.0 / fps if fps else 0.0
+        self.missed = 0
+        self._next: Optional[float] = None
+        self._ticks = deque(maxlen=window)
+
+    def _advance(self, now: float) -> float:
+        """Переход к следующему сроку, возвращает время до него"""
+        if self._next is None:
+            self._next = now
+            return 0.0
+
+        self._next += self.period
+        if now - self._next >= self.period:
+            # Отстали: пропускаем сроки, которые уже не успеть
+            skipped = int((now - self._next) // self.period)
+            self.missed += skipped
+            self._next += skipped * self.period
+        return self._next - now
+
+    def wait(self, stop_event: Optional[threading.Event] = None):
+        """Ожидание следующего срока"""
+        if not self.period:
+            self._ticks.append(time.monotonic())
+            return
+
+        delay = self._advance(time.monotonic())
+        if delay > 0:
+            if stop_event:
+                stop_event.wait(delay)
+            else:
+                time.sleep(delay)
+        self._ticks.append(time.monotonic())
+
+    def due(self, now: Optional[float] = None) -> bool:
+        """Наступил ли срок кадра; без ожидания
+
+        Для циклов, которые сами задают темп (например, чтение камеры):
+        лишние кадры между сроками пропускаются.
+        """
+        if now is None:
+            now = time.monotonic()
+        if self.period and self._next is not None:
+            if now < self._next + self.period:
+                return False
+        if self.period:
+            self._advance(now)
+        self._ticks.append(now)
+        return True
+
+    @property
+    def achieved_fps(self) -> float:
+        """Фактическая частота по последним кадрам"""
+        if len(self._ticks) < 2:
+            return 0.0
+        elapsed = self._ticks[-1] - self._ticks[0]
+        return (len(self._ticks) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def reset(self):
+        """Сброс расписания"""
+        self.missed = 0
+        self._next = None
+        self._ticks.clear()
@@ -0,0 +1,161 @@
+"""Цикл подготовки кадров предпросмотра"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from .camera_manager import CameraManager
+from .capture_worker import FramePacket
+from .config import (
+    CAMERA_STALL_TIMEOUT,
+    PREVIEW_CHANGE_AREA,
+    PREVIEW_FPS,
+    RENDER_WORKERS,
+)
+from .image_processor import PreviewRenderer
+from .motion import ChangeDetector
+from .pacing import FramePacer
+from .stats import STATS
+
+
+class PreviewLoop:
+    """Фоновая отрисовка последних кадров камер в их холсты
+
+    Не зависит от Tk: окно только забирает готовые кадры из рендереров,
+    поэтому цикл можно запускать и замерять без дисплея. Кадры разных
+    камер отрисовываются параллельно в общем пуле из workers потоков:
+    resize и cvtColor в OpenCV отпускают GIL. Кадры, почти не
+    отличающиеся от последнего отрисованного, не перерисовываются
+    (см. PREVIEW_CHANGE_AREA).
+    """
+
+    def __init__(
+        self,
+        camera_manager: CameraManager,
+        renderers: Dict[int, PreviewRenderer],
+        fps: float = PREVIEW_FPS,
+        workers: int = RENDER_WORKERS,
+        change_area: float = PREVIEW_CHANGE_AREA,
+    ):
+        self.camera_manager = camera_manager
+        self.renderers = renderers
+        self.workers = max(1, min(workers, len(renderers)))
+        self.pacer = FramePacer(fps)
+        self.is_running = False
+        self._stop_event = threading.Event()
+        self.camera_stalled = {n: False for n in renderers}
+        self._last_seq = {n: 0 for n in renderers}
+        self.detectors = {
+            n: ChangeDetector(change_area) for n in renderers if change_area
+        }
+        self.skipped = {n: 0 for n in renderers}
+        self._pool = None
+        self._thread = None
+
+    def render_cycle(self) -> int:
+        """Один проход по камерам, возвращает число отрисованных кадров"""
+        due = []
+        now = time.monotonic()
+        for camera_number, renderer in self.renderers.items():
+            # Берем последний кадр из потока захвата без ожидания
+            # Ссылка на буфер держится до конца отрисовки
+            packet = self.camera_manager.read_latest(
+                camera_number, retain=True
+            )
+            stalled = (
+                packet is None
+                or now - packet.timestamp > CAMERA_STALL_TIMEOUT
+            )
+            self.camera_stalled[camera_number] = stalled
+            detector = self.detectors.get(camera_number)
+            if stalled and detector:
+                # После зависания кадр рисуется заново в любом случае
+                detector.reset()
+
+            # Новых кадров с камеры не было
+            if stalled or packet.seq == self._last_seq[camera_number]:
+                if packet:
+                    packet.release()
+                continue
+            self._last_seq[camera_number] = packet.seq
+
+            # Сцена не изменилась: на экране уже такой же кадр
+            if detector and not detector.changed(packet.frame):
+                self.skipped[camera_number] += 1
+                packet.release()
+                continue
+            due.append((camera_number, renderer, packet))
+
+        pool = self._pool
+        if pool and len(due) > 1:
+            # Цикл ждет все кадры, чтобы камеры не обгоняли друг друга
+            for future in [pool.submit(self._render, *d) for d in due]:
+                future.result()
+        else:
+            for item in due:
+                self._render(*item)
+        return len(due)
+
+    @staticmethod
+    def _render(
+        camera_number: int, renderer: PreviewRenderer, packet: FramePacket
+    ):
+        """Отрисовка одного кадра с замером"""
+        try:
+            start = STATS.start()
+            renderer.render(packet.frame, camera_number)
+            STATS.record(camera_number, 'render', start)
+        finally:
+            packet.release()
+
+    def start(self):
+        """Запуск цикла в фоновом потоке"""
+        self.camera_stalled = {n: False for n in self.renderers}
+        self._last_seq = {n: 0 for n in self.renderers}
+        self.skipped = {n: 0 for n in self.renderers}
+        for detector in self.detectors.values():
+            detector.reset()
+        self.pacer.reset()
+        self._stop_event.clear()
+        self.is_running = True
+        if self.workers > 1:
+            self._pool = ThreadPoolExecutor(
+                self.workers, thread_name_prefix='render'
+            )
+        self._thread = threading.Thread(
+            target=self.update_frames, name='preview', daemon=True
+        )
+        self._thread.start()
+
+    def update_frames(self):
+        """Цикл отрисовки, работает до вызова stop"""
+        while self.is_running:
+            try:
+                # Ждем абсолютный срок кадра: время отрисовки уже учтено
+                self.pacer.wait(self._stop_event)
+                if self.is_running:
+                    self.render_cycle()
+
+            except Exception as e:
+                print(f'Ошибка в update_frames: {e}')
+                time.sleep(0.1)
+
+    def get_stats(self) -> dict:
+        """Фактическая частота цикла, пропуски сроков и неизменные кадры"""
+        return {
+            'fps': self.pacer.achieved_fps,
+            'missed_deadlines': self.pacer.missed,
+            'unchanged': sum(self.skipped.values()),
+        }
+
+    def stop(self, timeout: float = 1.0):
+        """Остановка цикла"""
+        self.is_running = False
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._pool:
+            self._pool.shutdown(wait=False)
+            self._pool = None
@@ -0,0 +1,287 @@
+"""Запись видео с камер в отдельных процессах"""
+
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from .camera_manager import CameraManager
+from .capture_worker import FramePacket, FrameSubscription
+from .config import (
+    RECORD_BUFFER_FRAMES,
+    RECORD_FOURCC,
+    RECORD_FPS,
+    RECORD_SUBSCRIPTION_FRAMES,
+)
+from .file_manager import FileManager
+from .image_processor import ImageProcessor
+
+
+def _encode_stream(
+    shm_name: str,
+    slots: int,
+    shape: tuple,
+    video_path: str,
+    sidecar_path: str,
+    fps: float,
+    work_queue,
+    free_queue,
+    ready,
+):
+    """Процесс-кодировщик: читает кадры из общей памяти и пишет видео
+
+    Преобразования SAVE_PIPELINE выполняются здесь, а не в потоке
+    захвата, который только копирует кадр в ячейку.
+
+    Камера отдает кадры со своей частотой, а файл размечен частотой
+    fps. Место кадра в видео считается по его метке времени: если
+    камера медленнее, кадр повторяется до следующего, если быстрее -
+    лишние кадры отбрасываются. Так длительность видео совпадает с
+    реальной.
+    """
+    shm = SharedMemory(name=shm_name)
+    frames = np.ndarray((slots,) + shape, np.uint8, buffer=shm.buf)
+    save_shape = ImageProcessor.save_shape(shape)
+    # pending - подготовленный кадр, ждущий следующего для своего места
+    pending = np.empty(save_shape, np.uint8)
+    prepared = np.empty(save_shape, np.uint8)
+    height, width = save_shape[:2]
+    # Метки кадров - time.monotonic, для надписи нужно время часов
+    clock_offset = time.time() - time.monotonic()
+    fourcc = cv2.VideoWriter_fourcc(*RECORD_FOURCC)
+    writer = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
+    if writer.isOpened():
+        ready.set()
+
+    try:
+        with open(sidecar_path, 'w', encoding='utf-8') as sidecar:
+            sidecar.write('frame,seq,timestamp\n')
+            frame_index = 0
+            first_timestamp = None
+            pending_info = None
+            while True:
+                item = work_queue.get()
+                if item is None:
+                    break
+                slot, seq, timestamp = item
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                position = round((timestamp - first_timestamp) * fps)
+
+                ImageProcessor.prepare_for_save(
+                    frames[slot], prepared, wall_time=timestamp + clock_offset
+                )
+                free_queue.put(slot)
+
+                # Ожидающий кадр занимает места до места нового кадра;
+                # если новый пришелся на то же место, старый не пишется
+                while pending_info and frame_index < position:
+                    writer.write(pending)
+                    sidecar.write(f'{frame_index},{pending_info}\n')
+                    frame_index += 1
+                pending, prepared = prepared, pending
+                pending_info = f'{seq},{timestamp:.6f}'
+
+            if pending_info:
+                writer.write(pending)
+                sidecar.write(f'{frame_index},{pending_info}\n')
+    finally:
+        writer.release()
+        del frames
+        shm.close()
+
+
+class StreamRecorder:
+    """Запись одной камеры через кольцо кадров в общей памяти
+
+    Поток подачи берет кадры из своей подписки на камеру, копирует
+    кадр в свободную ячейку и передает ее номер процессу-кодировщику.
+    Если подача отстает, подписка вытесняет старые кадры; если нет
+    свободных ячеек, кадр отбрасывается. Оба случая учитываются в
+    dropped.
+    """
+
+    def __init__(
+        self,
+        shape: tuple,
+        video_path: str,
+        fps: float = RECORD_FPS,
+        slots: int = RECORD_BUFFER_FRAMES,
+    ):
+        self.shape = shape
+        self.video_path = video_path
+        self.sidecar_path = os.path.splitext(video_path)[0] + '.csv'
+        self.fps = fps
+        self.slots = slots
+        self.written = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._subscription: Optional[FrameSubscription] = None
+        self._feeder: Optional[threading.Thread] = None
+
+        frame_bytes = int(np.prod(shape))
+        self._shm = SharedMemory(create=True, size=frame_bytes * slots)
+        self._frames = np.ndarray(
+            (slots,) + shape, np.uint8, buffer=self._shm.buf
+        )
+
+        ctx = mp.get_context('spawn')
+        self._work_queue = ctx.Queue()
+        self._free_queue = ctx.Queue()
+        for slot in range(slots):
+            self._free_queue.put(slot)
+        self._ready = ctx.Event()
+
+        self._process = ctx.Process(
+            target=_encode_stream,
+            args=(
+                self._shm.name,
+                slots,
+                shape,
+                video_path,
+                self.sidecar_path,
+                fps,
+                self._work_queue,
+                self._free_queue,
+                self._ready,
+            ),
+            daemon=True,
+        )
+
+    def start(self, timeout: float = 10.0) -> bool:
+        """Запуск процесса-кодировщика и ожидание его готовности"""
+        self._process.start()
+        return self._ready.wait(timeout)
+
+    def feed(self, subscription: FrameSubscription):
+        """Подача кадров подписки кодировщику в отдельном потоке"""
+        self._subscription = subscription
+        self._feeder = threading.Thread(
+            target=self._feed, name='record-feed', daemon=True
+        )
+        self._feeder.start()
+
+    @property
+    def dropped(self) -> int:
+        """Кадры, не попавшие в запись"""
+        lost = self._subscription.dropped if self._subscription else 0
+        return self._dropped + lost
+
+    def _feed(self):
+        """Поток подачи: кадр подписки -> свободная ячейка"""
+        while not self._closed:
+            packet = self._subscription.get(timeout=0.1)
+            if packet is None:
+                continue
+            try:
+                self.push(packet)
+            finally:
+                packet.release()
+
+    def push(self, packet: FramePacket):
+        """Передача кадра кодировщику без ожидания"""
+        with self._lock:
+            if self._closed:
+                return
+            if packet.frame.shape != self.shape:
+                self._dropped += 1
+                return
+            try:
+                slot = self._free_queue.get_nowait()
+            except queue.Empty:
+                self._dropped += 1
+                return
+
+            # Преобразования выполнит процесс-кодировщик
+            np.copyto(self._frames[slot], packet.frame)
+            self._work_queue.put((slot, packet.seq, packet.timestamp))
+            self.written += 1
+
+    def stop(self, timeout: float = 10.0):
+        """Дописывание очереди и остановка процесса"""
+        with self._lock:
+            self._closed = True
+        if self._feeder:
+            self._feeder.join(timeout=timeout)
+        self._work_queue.put(None)
+        self._process.join(timeout=timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        del self._frames
+        self._shm.close()
+        self._shm.unlink()
+
+
+class VideoRecorder:
+    """Одновременная запись нескольких камер"""
+
+    def __init__(self, camera_manager: CameraManager):
+        self.camera_manager = camera_manager
+        self.streams: Dict[int, StreamRecorder] = {}
+        self.subscriptions: Dict[int, FrameSubscription] = {}
+
+    @property
+    def is_recording(self) -> bool:
+        """Идет ли запись"""
+        return bool(self.streams)
+
+    def start(self, folder: str, camera_numbers: Sequence[int]) -> List[str]:
+        """Начало записи, возвращает имена видеофайлов"""
+        if self.streams or not FileManager.ensure_directory_exists(folder):
+            return []
+
+        # Общая метка для файлов всех камер, как у снимков
+        capture_id = FileManager.new_capture_id()
+        filenames = []
+        for camera_number in camera_numbers:
+            # Размер кадра берем из потока: камера могла не принять
+            # запрошенное разрешение
+            packet = self.camera_manager.read_latest(camera_number)
+            if packet is None:
+                continue
+
+            filename = f'{capture_id.name}_camera{camera_number}.mp4'
+            stream = StreamRecorder(
+                packet.frame.shape, os.path.join(folder, filename)
+            )
+            if not stream.start():
+                print(f'Не удалось начать запись камеры {camera_number}')
+                stream.stop()
+                continue
+            self.streams[camera_number] = stream
+            # Свою очередь кадров читает поток подачи записи: поток
+            # захвата не копирует кадры и не ждет запись
+            subscription = self.camera_manager.subscribe(
+                camera_number, RECORD_SUBSCRIPTION_FRAMES
+            )
+            self.subscriptions[camera_number] = subscription
+            stream.feed(subscription)
+            filenames.append(filename)
+            print(f'Запись камеры {camera_number}: {filename}')
+        return filenames
+
+    def stop(self) -> Dict[int, dict]:
+        """Остановка записи, возвращает статистику по камерам"""
+        stats = {}
+        streams, self.streams = self.streams, {}
+        for camera_number, stream in streams.items():
+            self.camera_manager.unsubscribe(
+                camera_number, self.subscriptions.pop(camera_number)
+            )
+            stream.stop()
+            stats[camera_number] = {
+                'written': stream.written,
+                'dropped': stream.dropped,
+            }
+            print(
+                f'Запись камеры {camera_number} остановлена: '
+                f'{stream.written} кадров, пропущено {stream.dropped}'
+            )
+        return stats
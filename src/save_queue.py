@@ -0,0 +1,187 @@
+"""Фоновое кодирование и запись снимков"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+from .config import SAVE_QUEUE_SIZE, SAVE_WORKERS
+from .file_manager import CaptureId, FileManager
+from .frame_pool import FramePool
+from .image_processor import ImageProcessor
+
+
+class _SaveBatch:
+    """Группа кадров одного снимка, результат которой отдается разом"""
+
+    def __init__(
+        self,
+        count: int,
+        capture_id: CaptureId,
+        group: str = '',
+        release: Optional[Callable] = None,
+    ):
+        self.future: Future = Future()
+        self.capture_id = capture_id
+        self.group = group
+        self._lock = threading.Lock()
+        self._remaining = count
+        self._saved: Dict[int, str] = {}
+        self._release = release
+
+    def frame_done(self, camera_number: int, filename: Optional[str]):
+        """Отметка о записи одного кадра"""
+        with self._lock:
+            if filename:
+                self._saved[camera_number] = filename
+            self._remaining -= 1
+            if self._remaining:
+                return
+            saved_files = [self._saved[n] for n in sorted(self._saved)]
+        if self._release:
+            self._release()
+        self.future.set_result(saved_files)
+
+
+class SaveQueue:
+    """Ограниченная очередь сохранения с пулом потоков-кодировщиков
+
+    Кодирование снимков в OpenCV отпускает GIL, поэтому потоки работают
+    параллельно. Если очередь заполнена, submit сразу возвращает None.
+    """
+
+    def __init__(
+        self, workers: int = SAVE_WORKERS, max_pending: int = SAVE_QUEUE_SIZE
+    ):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._submit_lock = threading.Lock()
+        # Буферы для подготовленных кадров по их форме
+        self._pools: Dict[tuple, FramePool] = {}
+        self._pools_lock = threading.Lock()
+        self._workers = [
+            threading.Thread(
+                target=self._run, name=f'save-{i}', daemon=True
+            )
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        frames: Dict[int, object],
+        folder: str,
+        prepare: bool = True,
+        tag: str = '',
+        group: str = '',
+        block: bool = False,
+        release: Optional[Callable[[], None]] = None,
+        timestamps: Optional[Dict[int, float]] = None,
+    ) -> Optional[Future]:
+        """Постановка кадров в очередь сохранения
+
+        frames - кадры по номерам камер, tag добавляется к именам файлов,
+        group объединяет снимки в каталоге (по умолчанию - сам снимок).
+        Возвращает Future со списком сохраненных файлов или None, если
+        кадров нет или очередь заполнена. С block=True вызов ждет места
+        в очереди; так поступают фоновые источники вроде серийной съемки.
+        release вызывается, когда все кадры записаны (например,
+        SyncSnapshot.release); если снимок не принят, кадры остаются
+        у вызывающего. timestamps - время захвата кадров по
+        time.monotonic (FramePacket.timestamp): метка времени на кадре
+        ставится по нему, а не по времени записи.
+        """
+        frames = {n: f for n, f in frames.items() if f is not None}
+        if not frames:
+            return None
+
+        # Метки захвата переводятся в часы сразу, как в spool.json
+        wall_times = {}
+        if timestamps:
+            clock_offset = time.time() - time.monotonic()
+            wall_times = {
+                n: t + clock_offset for n, t in timestamps.items()
+            }
+
+        if len(frames) > self._queue.maxsize:
+            return None
+
+        batch = _SaveBatch(
+            len(frames), FileManager.new_capture_id(), group, release
+        )
+        while True:
+            with self._submit_lock:
+                # Снимок ставится в очередь целиком или не ставится вовсе
+                if self._queue.maxsize - self._queue.qsize() >= len(frames):
+                    for camera_number, frame in frames.items():
+                        self._queue.put_nowait(
+                            (
+                                batch,
+                                frame,
+                                folder,
+                                camera_number,
+                                prepare,
+                                tag,
+                                wall_times.get(camera_number),
+                            )
+                        )
+                    return batch.future
+            if not block:
+                return None
+            time.sleep(0.01)
+
+    def pending(self) -> int:
+        """Количество кадров, ожидающих записи"""
+        return self._queue.qsize()
+
+    def shutdown(self):
+        """Дописывание очереди и остановка потоков"""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def _run(self):
+        """Цикл потока-кодировщика"""
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+
+            batch, frame, folder, camera_number, prepare, tag, wall_time = (
+                task
+            )
+            filename = None
+            buffer = None
+            try:
+                if prepare:
+                    # Преобразуем в буфер пула, а не в новый массив
+                    shape = ImageProcessor.save_shape(frame.shape)
+                    buffer = self._pool_for(shape).checkout(shape)
+                    frame = ImageProcessor.prepare_for_save(
+                        frame, buffer.array, camera_number, wall_time
+                    )
+                if FileManager.ensure_directory_exists(folder):
+                    filename = FileManager.save_image(
+                        frame,
+                        folder,
+                        camera_number,
+                        tag,
+                        batch.capture_id,
+                        batch.group,
+                    )
+            except Exception as e:
+                print(f'Ошибка в очереди сохранения: {e}')
+            finally:
+                if buffer:
+                    buffer.release()
+            batch.frame_done(camera_number, filename)
+
+    def _pool_for(self, shape: tuple) -> FramePool:
+        """Пул буферов под форму подготовленного кадра"""
+        with self._pools_lock:
+            pool = self._pools.get(shape)
+            if pool is None:
+                pool = self._pools[shape] = FramePool(len(self._workers))
+            return pool
@@ -0,0 +1,542 @@
+"""Запись несжатых кадров на диск и их отложенная конвертация
+
+Во время съемки кадры копируются как есть (BGR) в заранее выделенные
+файлы, отображенные в память, по файлу на камеру. Кодирования нет,
+запись на диск выполняет система, поэтому цена кадра близка к memcpy.
+
+Папка записи spool_<метка>:
+    spool.json   - сеанс, формы кадров, сдвиг монотонных часов
+    cameraN.raw  - кадры камеры N подряд
+    cameraN.idx  - по записи INDEX_DTYPE на кадр: смещение, номер, время
+
+Конвертация в снимки или видео выполняется позже в пуле процессов.
+Прерванную конвертацию можно запустить снова: готовые файлы
+пропускаются.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .camera_manager import CameraManager
+from .capture_worker import FramePacket
+from .config import (
+    RECORD_FOURCC,
+    RECORD_FPS,
+    SPOOL_CONVERT_CHUNK,
+    SPOOL_CONVERT_WORKERS,
+    SPOOL_SEGMENT_MB,
+)
+from .encoders import ImageEncoder, add_encoder_arguments, encoder_from_args
+from .file_manager import SESSION_ID, CaptureId, FileManager
+from .image_processor import ImageProcessor
+
+META_FILENAME = 'spool.json'
+INDEX_DTYPE = np.dtype(
+    [('offset', '<u8'), ('seq', '<u8'), ('timestamp', '<f8')]
+)
+
+
+class SpoolStream:
+    """Запись кадров одной камеры в файл, отображенный в память
+
+    Место выделяется сегментами по segment_mb. Следующий сегмент
+    выделяется и отображается в фоновом потоке, когда текущий заполнен
+    наполовину, поэтому поток захвата на границе сегмента только
+    переключается на готовое отображение. При закрытии файл обрезается
+    до записанных кадров. Кадры другой формы отбрасываются.
+    """
+
+    def __init__(
+        self,
+        raw_path: str,
+        index_path: str,
+        shape: tuple,
+        segment_mb: int = SPOOL_SEGMENT_MB,
+    ):
+        self.shape = shape
+        self.frame_bytes = int(np.prod(shape))
+        self.segment_frames = max(
+            1, segment_mb * 1024 * 1024 // self.frame_bytes
+        )
+        self.written = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._record = np.zeros(1, INDEX_DTYPE)
+        self._file = open(raw_path, 'w+b')
+        self._index = open(index_path, 'wb')
+        self._segment = self._map_segment(0)
+        self._segment_start = 0  # номер первого кадра сегмента
+        # Следующий сегмент, выделяемый в фоне, и ошибка его выделения
+        self._next_segment = None
+        self._grow_error: Optional[OSError] = None
+        self._grower: Optional[threading.Thread] = None
+
+    def _map_segment(self, start: int) -> np.memmap:
+        """Выделение места под сегмент с кадра start и его отображение"""
+        offset = start * self.frame_bytes
+        size = self.segment_frames * self.frame_bytes
+        if hasattr(os, 'posix_fallocate'):
+            # Место выделяется сразу, а не при первой записи в страницу
+            os.posix_fallocate(self._file.fileno(), offset, size)
+        else:
+            self._file.truncate(offset + size)
+        return np.memmap(
+            self._file,
+            np.uint8,
+            'r+',
+            offset,
+            (self.segment_frames,) + self.shape,
+        )
+
+    def _grow_ahead(self, start: int):
+        """Фоновое выделение следующего сегмента"""
+        try:
+            self._next_segment = self._map_segment(start)
+        except OSError as e:
+            self._grow_error = e
+
+    def _switch_segment(self):
+        """Переход на следующий сегмент; обычно он уже готов"""
+        if self._grower is None:
+            self._start_grower()
+        self._grower.join()
+        self._grower = None
+        if self._grow_error:
+            error, self._grow_error = self._grow_error, None
+            raise error
+
+        # Заполненный сегмент не сбрасывается: mmap.flush держит GIL на
+        # все время msync, а грязные страницы система запишет сама.
+        # Сброс на диск - при закрытии
+        self._segment, self._next_segment = self._next_segment, None
+        self._segment_start = self.written
+
+    def _start_grower(self):
+        """Запуск выделения сегмента, следующего за текущим"""
+        self._grower = threading.Thread(
+            target=self._grow_ahead,
+            args=(self._segment_start + self.segment_frames,),
+            name='spool-grow',
+            daemon=True,
+        )
+        self._grower.start()
+
+    def push(self, packet: FramePacket):
+        """Копирование кадра в файл и запись в индекс"""
+        with self._lock:
+            if self._closed:
+                return
+            if packet.frame.shape != self.shape:
+                self.dropped += 1
+                return
+            index = self.written - self._segment_start
+            if index == self.segment_frames:
+                self._switch_segment()
+                index = 0
+            if self._grower is None and index >= self.segment_frames // 2:
+                self._start_grower()
+            np.copyto(self._segment[index], packet.frame)
+
+            record = self._record
+            record['offset'] = self.written * self.frame_bytes
+            record['seq'] = packet.seq
+            record['timestamp'] = packet.timestamp
+            self._index.write(record.tobytes())
+            self.written += 1
+
+    def close(self):
+        """Сброс на диск и обрезка файла до записанных кадров"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._grower:
+                self._grower.join()
+                self._grower = None
+            # Отображения закрываются вместе с последней ссылкой
+            self._segment = self._next_segment = None
+            self._file.truncate(self.written * self.frame_bytes)
+            # fsync записывает и страницы всех отображений, не держа GIL
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._index.close()
+
+
+class RawSpool:
+    """Запись несжатых кадров нескольких камер в папку на диске"""
+
+    def __init__(self, camera_manager: CameraManager):
+        self.camera_manager = camera_manager
+        self.streams: Dict[int, SpoolStream] = {}
+        self.path = ''
+
+    @property
+    def is_active(self) -> bool:
+        """Идет ли запись"""
+        return bool(self.streams)
+
+    def start(
+        self, folder: str, camera_numbers: Sequence[int]
+    ) -> Optional[str]:
+        """Начало записи, возвращает путь к папке записи"""
+        if self.streams or not FileManager.ensure_directory_exists(folder):
+            return None
+
+        name = f'spool_{FileManager.new_capture_id().name}'
+        path = os.path.join(folder, name)
+        os.makedirs(path, exist_ok=True)
+
+        cameras = {}
+        for camera_number in camera_numbers:
+            # Форму кадра берем из потока, как и при записи видео
+            packet = self.camera_manager.read_latest(camera_number)
+            if packet is None:
+                continue
+            shape = packet.frame.shape
+            files = {
+                'raw': f'camera{camera_number}.raw',
+                'index': f'camera{camera_number}.idx',
+            }
+            try:
+                stream = SpoolStream(
+                    os.path.join(path, files['raw']),
+                    os.path.join(path, files['index']),
+                    shape,
+                )
+            except OSError as e:
+                print(f'Не удалось начать запись камеры {camera_number}: {e}')
+                continue
+            self.streams[camera_number] = stream
+            cameras[str(camera_number)] = dict(shape=list(shape), **files)
+
+        if not self.streams:
+            return None
+
+        meta = {
+            'session': SESSION_ID,
+            # Перевод меток времени кадров (time.monotonic) в time.time
+            'clock_offset': time.time() - time.monotonic(),
+            'cameras': cameras,
+        }
+        FileManager.write_atomic(
+            os.path.join(path, META_FILENAME),
+            json.dumps(meta, indent=2).encode('utf-8'),
+        )
+        for camera_number in self.streams:
+            self.camera_manager.add_frame_listener(
+                camera_number, self._on_frame
+            )
+        self.path = path
+        print(f'Запись кадров на диск: {path}')
+        return path
+
+    def stop(self) -> Dict[int, dict]:
+        """Остановка записи, возвращает статистику по камерам"""
+        stats = {}
+        streams, self.streams = self.streams, {}
+        for camera_number, stream in streams.items():
+            self.camera_manager.remove_frame_listener(
+                camera_number, self._on_frame
+            )
+            stream.close()
+            stats[camera_number] = {
+                'written': stream.written,
+                'dropped': stream.dropped,
+                'bytes': stream.written * stream.frame_bytes,
+            }
+            print(
+                f'Запись камеры {camera_number} на диск остановлена: '
+                f'{stream.written} кадров, пропущено {stream.dropped}'
+            )
+        return stats
+
+    def _on_frame(self, camera_number: int, packet: FramePacket):
+        """Запись кадра, вызывается в потоке захвата"""
+        stream: Optional[SpoolStream] = self.streams.get(camera_number)
+        if stream:
+            stream.push(packet)
+
+
+class SpoolReader:
+    """Чтение записанных кадров в любом порядке
+
+    Кадр - представление отображенного файла, поэтому чтение одного
+    кадра не затрагивает остальные. После сбоя записи индекс может
+    оборваться на середине записи; такой хвост не читается.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILENAME), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.session = self.meta['session']
+        self.clock_offset = self.meta['clock_offset']
+        self._shapes: Dict[int, tuple] = {}
+        self._indexes: Dict[int, np.ndarray] = {}
+        self._raw: Dict[int, np.ndarray] = {}
+
+        for key, info in self.meta['cameras'].items():
+            camera_number = int(key)
+            shape = tuple(info['shape'])
+            raw_path = os.path.join(path, info['raw'])
+            with open(os.path.join(path, info['index']), 'rb') as f:
+                data = f.read()
+            count = len(data) // INDEX_DTYPE.itemsize
+            index = np.frombuffer(data, INDEX_DTYPE, count)
+            size = os.path.getsize(raw_path)
+            frame_bytes = int(np.prod(shape))
+            index = index[index['offset'] + frame_bytes <= size]
+
+            self._shapes[camera_number] = shape
+            self._indexes[camera_number] = index
+            self._raw[camera_number] = (
+                np.memmap(raw_path, np.uint8, 'r')
+                if size
+                else np.zeros(0, np.uint8)
+            )
+
+    def camera_numbers(self) -> List[int]:
+        """Номера записанных камер"""
+        return sorted(self._shapes)
+
+    def count(self, camera_number: int) -> int:
+        """Число кадров камеры"""
+        return len(self._indexes[camera_number])
+
+    def timestamps(self, camera_number: int) -> np.ndarray:
+        """Метки времени кадров (time.monotonic записи)"""
+        return self._indexes[camera_number]['timestamp']
+
+    def seqs(self, camera_number: int) -> np.ndarray:
+        """Номера кадров камеры в потоке захвата"""
+        return self._indexes[camera_number]['seq']
+
+    def wall_time(self, camera_number: int, index: int) -> float:
+        """Время кадра по системным часам"""
+        timestamp = self._indexes[camera_number]['timestamp'][index]
+        return float(timestamp) + self.clock_offset
+
+    def frame(self, camera_number: int, index: int) -> np.ndarray:
+        """Кадр по порядковому номеру, без копирования"""
+        shape = self._shapes[camera_number]
+        offset = int(self._indexes[camera_number]['offset'][index])
+        end = offset + int(np.prod(shape))
+        return self._raw[camera_number][offset:end].reshape(shape)
+
+    def close(self):
+        """Закрытие отображений файлов"""
+        self._raw.clear()
+
+
+def _convert_frames(
+    path: str,
+    camera_number: int,
+    start: int,
+    stop: int,
+    output: str,
+    encoder: ImageEncoder,
+) -> Tuple[int, int]:
+    """Задание пула: кадры start..stop в снимки
+
+    Возвращает число сконвертированных и пропущенных (готовых) кадров.
+    """
+    reader = SpoolReader(path)
+    group = os.path.basename(path)
+    converted = skipped = 0
+    buffer = None
+    for index in range(start, stop):
+        capture_id = CaptureId(
+            reader.wall_time(camera_number, index), index + 1
+        )
+        filename = FileManager.filename_for(
+            capture_id, camera_number, 'spool', encoder
+        )
+        if os.path.exists(os.path.join(output, filename)):
+            skipped += 1
+            continue
+
+        # Снимки преобразуются так же, как при обычном сохранении
+        frame = reader.frame(camera_number, index)
+        if buffer is None:
+            shape = ImageProcessor.save_shape(frame.shape)
+            buffer = np.empty(shape, np.uint8)
+        wall_time = capture_id.timestamp
+        ImageProcessor.prepare_for_save(
+            frame, buffer, camera_number, wall_time
+        )
+        if FileManager.save_image(
+            buffer,
+            output,
+            camera_number,
+            'spool',
+            capture_id,
+            group,
+            encoder,
+            reader.session,
+        ):
+            converted += 1
+    reader.close()
+    return converted, skipped
+
+
+def _convert_video(
+    path: str, camera_number: int, output: str
+) -> Tuple[int, int]:
+    """Задание пула: все кадры камеры в один видеофайл"""
+    reader = SpoolReader(path)
+    count = reader.count(camera_number)
+    stem = f'{os.path.basename(path)}_camera{camera_number}'
+    video_path = os.path.join(output, f'{stem}.mp4')
+    if os.path.exists(video_path):
+        reader.close()
+        return 0, count
+    if not count:
+        reader.close()
+        return 0, 0
+
+    # Частота - по меткам времени, а не по настройке камеры
+    timestamps = reader.timestamps(camera_number)
+    span = float(timestamps[-1] - timestamps[0])
+    fps = (count - 1) / span if count > 1 and span > 0 else RECORD_FPS
+
+    first = reader.frame(camera_number, 0)
+    buffer = np.empty(ImageProcessor.save_shape(first.shape), np.uint8)
+    height, width = buffer.shape[:2]
+    # OpenCV выбирает контейнер по расширению, поэтому .tmp - перед ним
+    temp_path = os.path.join(output, f'{stem}.tmp.mp4')
+    fourcc = cv2.VideoWriter_fourcc(*RECORD_FOURCC)
+    writer = cv2.VideoWriter(temp_path, fourcc, fps, (width, height))
+    if not writer.isOpened():
+        print(f'Не удалось создать видео {video_path}')
+        reader.close()
+        return 0, 0
+
+    try:
+        with open(
+            os.path.join(output, f'{stem}.csv'), 'w', encoding='utf-8'
+        ) as sidecar:
+            sidecar.write('frame,seq,timestamp\n')
+            seqs = reader.seqs(camera_number)
+            for index in range(count):
+                ImageProcessor.prepare_for_save(
+                    reader.frame(camera_number, index),
+                    buffer,
+                    camera_number,
+                    reader.wall_time(camera_number, index),
+                )
+                writer.write(buffer)
+                sidecar.write(
+                    f'{index},{seqs[index]},{timestamps[index]:.6f}\n'
+                )
+    finally:
+        writer.release()
+        reader.close()
+    os.replace(temp_path, video_path)
+    return count, 0
+
+
+def convert_spool(
+    path: str,
+    output: Optional[str] = None,
+    encoder: Optional[ImageEncoder] = None,
+    video: bool = False,
+    workers: int = SPOOL_CONVERT_WORKERS,
+) -> Tuple[int, int]:
+    """Конвертация папки записи в снимки или видео
+
+    По умолчанию файлы кладутся рядом с папкой записи. Возвращает
+    число сконвертированных и пропущенных (уже готовых) кадров.
+    """
+    output = output or os.path.dirname(os.path.abspath(path))
+    if not FileManager.ensure_directory_exists(output):
+        return 0, 0
+    encoder = encoder or FileManager.encoder
+
+    reader = SpoolReader(path)
+    tasks = []
+    total = 0
+    for camera_number in reader.camera_numbers():
+        count = reader.count(camera_number)
+        total += count
+        if video:
+            tasks.append((_convert_video, path, camera_number, output))
+            continue
+        for start in range(0, count, SPOOL_CONVERT_CHUNK):
+            stop = min(count, start + SPOOL_CONVERT_CHUNK)
+            tasks.append(
+                (
+                    _convert_frames,
+                    path,
+                    camera_number,
+                    start,
+                    stop,
+                    output,
+                    encoder,
+                )
+            )
+    reader.close()
+
+    converted = skipped = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(*task) for task in tasks]
+        for future in as_completed(futures):
+            try:
+                done, passed = future.result()
+            except Exception as e:
+                print(f'Ошибка конвертации: {e}')
+                continue
+            converted += done
+            skipped += passed
+
+    elapsed = time.perf_counter() - started
+    rate = converted / elapsed if elapsed else 0.0
+    print(
+        f'Кадров: {total}, сконвертировано {converted} '
+        f'({rate:.1f} кадр/с), готовых пропущено {skipped}'
+    )
+    return converted, skipped
+
+
+def add_convert_arguments(parser: argparse.ArgumentParser):
+    """Аргументы команды spool-convert"""
+    parser.add_argument('path', help='папка записи spool_...')
+    parser.add_argument(
+        '--output',
+        default=None,
+        help='папка для файлов (по умолчанию - рядом с папкой записи)',
+    )
+    parser.add_argument(
+        '--video', action='store_true', help='видео вместо снимков'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=SPOOL_CONVERT_WORKERS,
+        help='число процессов конвертации',
+    )
+    add_encoder_arguments(parser)
+
+
+def run_convert(args: argparse.Namespace) -> int:
+    """Конвертация записи, возвращает код завершения"""
+    if not os.path.exists(os.path.join(args.path, META_FILENAME)):
+        print(f'{args.path} - не папка записи кадров')
+        return 1
+    convert_spool(
+        args.path,
+        args.output,
+        encoder_from_args(args),
+        args.video,
+        args.workers,
+    )
+    return 0
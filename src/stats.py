@@ -0,0 +1,235 @@
+"""Замеры задержек по этапам обработки кадров
+
+Пример использования в горячем пути:
+
+    start = STATS.start()
+    ...
+    STATS.record(camera_number, 'render', start)
+
+Если сбор отключен, start() возвращает 0 и record() сразу выходит.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .config import (
+    STATS_DUMP_FILE,
+    STATS_DUMP_INTERVAL,
+    STATS_ENABLED,
+    STATS_WINDOW,
+)
+
+# Границы корзин гистограммы: от 20 мкс до ~20 с с шагом sqrt(2)
+BUCKET_BOUNDS = [20e-6 * 2 ** (i / 2) for i in range(40)]
+
+
+class LatencyHistogram:
+    """Скользящая гистограмма задержек
+
+    Хранит два окна по window секунд: текущее и предыдущее, поэтому
+    перцентили отражают последние window..2*window секунд работы.
+    Кроме окон ведутся счетчики корзин, числа и суммы замеров за все
+    время - они только растут, как требует Prometheus.
+    """
+
+    def __init__(self, window: float = STATS_WINDOW):
+        self.window = window
+        self._current = [0] * (len(BUCKET_BOUNDS) + 1)
+        self._previous = [0] * (len(BUCKET_BOUNDS) + 1)
+        self._window_start = time.monotonic()
+        self._previous_start = self._window_start
+        self.total_counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total_count = 0
+        self.total_sum = 0.0
+
+    def record(self, seconds: float, now: float):
+        """Добавление замера"""
+        if now - self._window_start >= self.window:
+            self._previous = self._current
+            self._current = [0] * (len(BUCKET_BOUNDS) + 1)
+            self._previous_start = self._window_start
+            self._window_start = now
+        index = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        self._current[index] += 1
+        self.total_counts[index] += 1
+        self.total_count += 1
+        self.total_sum += seconds
+
+    def counts(self) -> List[int]:
+        """Число замеров по корзинам за оба окна"""
+        return [a + b for a, b in zip(self._previous, self._current)]
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля по верхней границе корзины, с"""
+        counts = self.counts()
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return BUCKET_BOUNDS[min(i, len(BUCKET_BOUNDS) - 1)]
+        return BUCKET_BOUNDS[-1]
+
+    def rate(self, now: float) -> float:
+        """Частота замеров в секунду за оба окна"""
+        elapsed = now - self._previous_start
+        return sum(self.counts()) / elapsed if elapsed > 0 else 0.0
+
+
+class StageStats:
+    """Реестр гистограмм по камерам и этапам"""
+
+    def __init__(self, enabled: bool = STATS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[int, str], LatencyHistogram] = {}
+
+    def start(self) -> float:
+        """Начало замера; 0, если сбор отключен"""
+        return time.perf_counter() if self.enabled else 0.0
+
+    def record(self, camera_number: int, stage: str, start: float):
+        """Окончание замера, начатого через start()"""
+        if not start:
+            return
+        self.add(camera_number, stage, time.perf_counter() - start)
+
+    def add(self, camera_number: int, stage: str, seconds: float):
+        """Добавление готовой длительности"""
+        if not self.enabled:
+            return
+        key = (camera_number, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(seconds, time.monotonic())
+
+    def snapshot(self) -> Dict[int, Dict[str, dict]]:
+        """Текущие показатели: камера -> этап -> p50/p99/частота"""
+        now = time.monotonic()
+        result: Dict[int, Dict[str, dict]] = {}
+        with self._lock:
+            for (camera_number, stage), histogram in self._histograms.items():
+                result.setdefault(camera_number, {})[stage] = {
+                    'p50_ms': histogram.percentile(0.50) * 1000,
+                    'p99_ms': histogram.percentile(0.99) * 1000,
+                    'rate': histogram.rate(now),
+                    'count': histogram.total_count,
+                    'mean_ms': (
+                        histogram.total_sum / histogram.total_count * 1000
+                    ),
+                }
+        return result
+
+    def to_json(self) -> str:
+        """Показатели в JSON"""
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Показатели в текстовом формате Prometheus
+
+        Корзины, сумма и число - счетчики за все время, а не скользящее
+        окно: иначе корзины уменьшались бы между опросами, и Prometheus
+        принимал бы это за сброс счетчика.
+        """
+        lines = [
+            '# TYPE imagecapture_stage_seconds histogram',
+        ]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for (camera_number, stage), histogram in items:
+                labels = f'camera="{camera_number}",stage="{stage}"'
+                cumulative = 0
+                counts = histogram.total_counts
+                for bound, count in zip(BUCKET_BOUNDS, counts):
+                    cumulative += count
+                    lines.append(
+                        f'imagecapture_stage_seconds_bucket'
+                        f'{{{labels},le="{bound:.6f}"}} {cumulative}'
+                    )
+                cumulative += counts[-1]
+                lines.append(
+                    f'imagecapture_stage_seconds_bucket'
+                    f'{{{labels},le="+Inf"}} {cumulative}'
+                )
+                lines.append(
+                    f'imagecapture_stage_seconds_sum{{{labels}}} '
+                    f'{histogram.total_sum:.6f}'
+                )
+                lines.append(
+                    f'imagecapture_stage_seconds_count{{{labels}}} '
+                    f'{histogram.total_count}'
+                )
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Удаление всех замеров"""
+        with self._lock:
+            self._histograms.clear()
+
+
+# Общий реестр приложения
+STATS = StageStats()
+
+
+class StatsDumper:
+    """Периодическая запись показателей в файл
+
+    Формат выбирается по расширению: .prom - Prometheus, иначе JSON.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = STATS_DUMP_FILE,
+        interval: float = STATS_DUMP_INTERVAL,
+        stats: StageStats = STATS,
+    ):
+        self.path = path
+        self.interval = interval
+        self.stats = stats
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запуск фоновой записи, если файл задан"""
+        if not self.path or self._thread:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name='stats-dump', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Остановка с финальной записью"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def dump(self):
+        """Однократная запись показателей"""
+        if self.path.endswith('.prom'):
+            text = self.stats.to_prometheus()
+        else:
+            text = self.stats.to_json()
+        try:
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f'Ошибка записи статистики: {e}')
+
+    def _run(self):
+        """Цикл записи"""
+        while not self._stop_event.wait(self.interval):
+            self.dump()
+        self.dump()
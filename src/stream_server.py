@@ -0,0 +1,393 @@
+"""Трансляция предпросмотра камер по HTTP
+
+Каждая камера доступна как поток MJPEG (/camera/N.mjpg) и как
+последний снимок (/camera/N.jpg); страница / показывает все камеры.
+Кадр кодируется в JPEG один раз в потоке камеры, и готовые байты
+получают все зрители. Зритель всегда берет самый свежий кадр: если он
+не успевает, промежуточные кадры для него пропускаются, а не копятся
+в очереди.
+
+Поток кодирования читает свою подписку на кадры камеры
+(CameraManager.subscribe) из одного кадра: поток захвата только кладет
+в нее кадр, поэтому на предпросмотр в окне трансляция не влияет. Пока
+зрителей нет, подписки нет и кадры не кодируются.
+"""
+
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .camera_manager import CameraManager
+from .capture_worker import FramePacket
+from .config import (
+    CAMERA_STALL_TIMEOUT,
+    FRAME_TRANSFORMS,
+    PREVIEW_INTERPOLATION,
+    STREAM_CLIENT_TIMEOUT,
+    STREAM_FPS,
+    STREAM_HOST,
+    STREAM_PORT,
+    STREAM_QUALITY,
+    STREAM_WIDTH,
+)
+from .encoders import ImageEncoder
+from .pacing import FramePacer
+from .transforms import Pipeline, Resize
+
+BOUNDARY = 'frame'
+_CAMERA_PATH = re.compile(r'^/camera/(\d+)\.(mjpg|jpg)$')
+
+_INDEX_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Камеры</title>
+<style>body{{background:#222;color:#ddd;font-family:sans-serif}}
+figure{{display:inline-block;margin:8px}}
+img{{max-width:100%;background:#000}}</style></head>
+<body>{cameras}</body></html>
+'''
+_INDEX_CAMERA = (
+    '<figure><img src="/camera/{n}.mjpg" alt="Камера {n}">'
+    '<figcaption>Камера {n}</figcaption></figure>'
+)
+
+
+class StreamSource:
+    """Кадры одной камеры в JPEG, общие для всех зрителей
+
+    Поток кодирования работает, пока есть хотя бы один зритель. Номер
+    seq растет с каждым закодированным кадром; зритель ждет номер
+    больше уже показанного и получает последний кадр.
+    """
+
+    def __init__(
+        self,
+        camera_manager: CameraManager,
+        camera_number: int,
+        pipeline: Pipeline,
+        encoder: ImageEncoder,
+        fps: float = STREAM_FPS,
+    ):
+        self.camera_manager = camera_manager
+        self.camera_number = camera_number
+        self.pipeline = pipeline
+        self.encoder = encoder
+        self.fps = fps
+        self.seq = 0
+        self.jpeg: Optional[bytes] = None
+        self.encoded_at = 0.0
+        self.clients = 0
+        self.skipped = 0  # кадров, пропущенных медленными зрителями
+        self._buffer: Optional[np.ndarray] = None
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f'stream-{camera_number}', daemon=True
+        )
+        self._thread.start()
+
+    @contextmanager
+    def watch(self):
+        """Учет зрителя: пока он подключен, кадры кодируются"""
+        with self._changed:
+            self.clients += 1
+            self._changed.notify_all()
+        try:
+            yield self
+        finally:
+            with self._changed:
+                self.clients -= 1
+
+    def next_frame(
+        self, after_seq: int, timeout: float = CAMERA_STALL_TIMEOUT
+    ) -> Optional[Tuple[int, bytes]]:
+        """Кадр новее after_seq: (seq, jpeg) или None по тайм-ауту"""
+        with self._changed:
+            ready = self._changed.wait_for(
+                lambda: self.seq > after_seq or self._stop.is_set(), timeout
+            )
+            if not ready or self._stop.is_set():
+                return None
+            if after_seq:
+                self.skipped += self.seq - after_seq - 1
+            return self.seq, self.jpeg
+
+    def still(
+        self, timeout: float = CAMERA_STALL_TIMEOUT
+    ) -> Optional[bytes]:
+        """Последний кадр; если он устарел - кодируется новый"""
+        with self._changed:
+            if time.monotonic() - self.encoded_at < 1.0 / self.fps:
+                return self.jpeg
+            seq = self.seq
+        with self.watch():
+            result = self.next_frame(seq, timeout)
+        return result[1] if result else None
+
+    @property
+    def is_stopped(self) -> bool:
+        """Источник остановлен вместе с сервером"""
+        return self._stop.is_set()
+
+    def stop(self):
+        """Остановка потока; ожидающие зрители получают None"""
+        self._stop.set()
+        with self._changed:
+            self._changed.notify_all()
+        self._thread.join(timeout=2.0)
+
+    def _run(self):
+        """Поток кодирования: кадр камеры -> преобразования -> JPEG"""
+        pacer = FramePacer(self.fps)
+        subscription = None
+        try:
+            while not self._stop.is_set():
+                with self._changed:
+                    if not self.clients and subscription:
+                        # Зрители ушли: поток захвата больше не кормит
+                        # подписку
+                        self.camera_manager.unsubscribe(
+                            self.camera_number, subscription
+                        )
+                        subscription = None
+                    self._changed.wait_for(
+                        lambda: self.clients or self._stop.is_set()
+                    )
+                if self._stop.is_set():
+                    break
+                if subscription is None:
+                    subscription = self.camera_manager.subscribe(
+                        self.camera_number
+                    )
+                pacer.wait(self._stop)
+
+                # В подписке из одного кадра всегда самый свежий
+                packet = subscription.get(CAMERA_STALL_TIMEOUT)
+                if packet is not None:
+                    self._encode(packet)
+        finally:
+            if subscription:
+                self.camera_manager.unsubscribe(
+                    self.camera_number, subscription
+                )
+
+    def _encode(self, packet: FramePacket):
+        """Преобразование и кодирование кадра, публикация для зрителей"""
+        try:
+            shape = self.pipeline.output_shape(packet.frame.shape)
+            if self._buffer is None or self._buffer.shape != shape:
+                self._buffer = np.empty(shape, np.uint8)
+            self.pipeline.apply(packet.frame, self._buffer, self.camera_number)
+        finally:
+            # Буфер кадра возвращается камере до кодирования
+            packet.release()
+
+        data = self.encoder.encode(self._buffer)
+        if data is None:
+            return
+        jpeg = data.tobytes()
+        with self._changed:
+            self.jpeg = jpeg
+            self.seq += 1
+            self.encoded_at = time.monotonic()
+            self._changed.notify_all()
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    """Запросы зрителей; каждый обрабатывается в своем потоке"""
+
+    server_version = 'CameraStream/1.0'
+    timeout = STREAM_CLIENT_TIMEOUT
+
+    def do_GET(self):
+        preview = self.server.preview
+        path = self.path.split('?', 1)[0]
+        if path == '/':
+            self._send_index(preview)
+            return
+        if path == '/status.json':
+            self._send(
+                'application/json',
+                json.dumps(preview.status()).encode('utf-8'),
+            )
+            return
+
+        match = _CAMERA_PATH.match(path)
+        source = preview.source(int(match.group(1))) if match else None
+        if source is None:
+            self.send_error(404)
+            return
+        if match.group(2) == 'jpg':
+            jpeg = source.still()
+            if jpeg is None:
+                self.send_error(503)
+                return
+            self._send('image/jpeg', jpeg)
+            return
+        self._send_stream(source)
+
+    def _send(self, content_type: str, body: bytes):
+        """Ответ целиком"""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_index(self, preview: 'PreviewServer'):
+        """Страница со всеми камерами"""
+        cameras = ''.join(
+            _INDEX_CAMERA.format(n=n)
+            for n in preview.camera_manager.camera_numbers()
+        )
+        page = _INDEX_PAGE.format(cameras=cameras or 'Нет камер')
+        self._send('text/html; charset=utf-8', page.encode('utf-8'))
+
+    def _send_stream(self, source: StreamSource):
+        """Поток MJPEG до отключения зрителя или остановки сервера"""
+        self.send_response(200)
+        self.send_header(
+            'Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}'
+        )
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+
+        seq = 0
+        with source.watch():
+            while True:
+                result = source.next_frame(seq)
+                if result is None:
+                    if source.is_stopped:
+                        break
+                    # Камера зависла: повторяем последний кадр, иначе
+                    # отключение зрителя не заметить до ее восстановления
+                    jpeg = source.jpeg
+                else:
+                    seq, jpeg = result
+                if not self._write_part(jpeg):
+                    break
+
+    def _write_part(self, jpeg: Optional[bytes]) -> bool:
+        """Часть потока MJPEG; False, если зритель отключился"""
+        try:
+            if jpeg is None:
+                # Кадров еще не было: пустая строка между частями
+                self.wfile.write(b'\r\n')
+                return True
+            header = (
+                f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                f'Content-Length: {len(jpeg)}\r\n\r\n'
+            ).encode('ascii')
+            self.wfile.write(header)
+            self.wfile.write(jpeg)
+            self.wfile.write(b'\r\n')
+            return True
+        except OSError:
+            # Зритель отключился или не принимает данные
+            return False
+
+    def log_message(self, format, *args):
+        """Журнал каждого запроса не нужен"""
+
+
+class PreviewServer:
+    """HTTP-сервер трансляции камер
+
+    Кадры берутся у camera_manager и проходят FRAME_TRANSFORMS, как в
+    окне, с уменьшением до STREAM_WIDTH. Источник камеры создается при
+    первом запросе к ней.
+    """
+
+    def __init__(
+        self,
+        camera_manager: CameraManager,
+        host: str = STREAM_HOST,
+        port: int = STREAM_PORT,
+        fps: float = STREAM_FPS,
+        quality: int = STREAM_QUALITY,
+        width: int = STREAM_WIDTH,
+    ):
+        self.camera_manager = camera_manager
+        self.host = host
+        self.port = port
+        self.fps = fps
+        stages = list(FRAME_TRANSFORMS)
+        if width:
+            stages.append(Resize(width, 0))
+        self.pipeline = Pipeline(stages, PREVIEW_INTERPOLATION, 'stream')
+        self.encoder = ImageEncoder('jpeg', quality)
+        self.sources: Dict[int, StreamSource] = {}
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Адрес страницы с камерами"""
+        return f'http://{self.host}:{self.port}/'
+
+    def start(self) -> bool:
+        """Запуск сервера в фоновом потоке"""
+        try:
+            self._httpd = ThreadingHTTPServer(
+                (self.host, self.port), _StreamHandler
+            )
+        except OSError as e:
+            print(f'Не удалось запустить трансляцию на порту {self.port}: {e}')
+            return False
+        self._httpd.daemon_threads = True
+        self._httpd.preview = self
+        # Порт 0 - свободный порт, выбранный системой
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name='stream-http', daemon=True
+        )
+        self._thread.start()
+        print(f'Трансляция камер: {self.url}')
+        return True
+
+    def stop(self):
+        """Остановка сервера и потоков кодирования"""
+        with self._lock:
+            sources, self.sources = self.sources, {}
+        for source in sources.values():
+            source.stop()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def source(self, camera_number: int) -> Optional[StreamSource]:
+        """Источник камеры; None, если камера не подключена"""
+        if camera_number not in self.camera_manager.camera_numbers():
+            return None
+        with self._lock:
+            source = self.sources.get(camera_number)
+            if source is None:
+                source = StreamSource(
+                    self.camera_manager,
+                    camera_number,
+                    self.pipeline,
+                    self.encoder,
+                    self.fps,
+                )
+                self.sources[camera_number] = source
+            return source
+
+    def status(self) -> dict:
+        """Зрители, кадры и пропуски по камерам"""
+        with self._lock:
+            sources = dict(self.sources)
+        return {
+            str(n): {
+                'clients': source.clients,
+                'encoded': source.seq,
+                'skipped': source.skipped,
+            }
+            for n, source in sources.items()
+        }
@@ -0,0 +1,241 @@
+"""Интервальная съемка (таймлапс) по расписанию
+
+Сроки снимков абсолютные: срок k - начало + k * интервал по
+time.monotonic, поэтому задержки отдельных снимков не накапливаются
+даже за дни съемки. Снимок берется из последних кадров камер без
+ожидания нового кадра, а кодирование и запись идут в очереди
+сохранения. Срок, к которому поток опоздал больше допуска, не
+догоняется, а записывается в журнал с величиной опоздания.
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+
+from .camera_manager import CameraManager
+from .config import (
+    CAMERA_STALL_TIMEOUT,
+    TIMELAPSE_INTERVAL,
+    TIMELAPSE_LATE_TOLERANCE,
+)
+from .save_queue import SaveQueue
+
+
+def _monotonic_at(moment: Optional[datetime]) -> Optional[float]:
+    """Время по time.monotonic, соответствующее моменту часов"""
+    if moment is None:
+        return None
+    # Дальше сроки не зависят от перевода часов
+    return time.monotonic() + (moment - datetime.now()).total_seconds()
+
+
+class TimelapseCapture:
+    """Снимки со всех камер через равные промежутки времени
+
+    Съемка идет в своем потоке от start_at (по умолчанию - сразу) до
+    end_at или до max_shots снимков; если start_at уже прошло, первый
+    снимок делается в ближайший после запуска срок по сетке от
+    start_at. В журнал пишутся пропущенные сроки, их число - в missed,
+    наибольшее опоздание сделанного снимка - в max_lateness, число
+    записанных файлов - в saved.
+    """
+
+    def __init__(
+        self,
+        camera_manager: CameraManager,
+        save_queue: SaveQueue,
+        interval: float = TIMELAPSE_INTERVAL,
+        late_tolerance: float = TIMELAPSE_LATE_TOLERANCE,
+    ):
+        if interval <= 0:
+            raise ValueError('Интервал съемки должен быть больше нуля')
+        self.camera_manager = camera_manager
+        self.save_queue = save_queue
+        self.interval = interval
+        # Больше половины интервала снимок уже ближе к следующему сроку
+        self.late_tolerance = min(late_tolerance, interval / 2)
+        self.shots = 0
+        self.missed = 0
+        self.max_lateness = 0.0
+        self.saved = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_active(self) -> bool:
+        """Идет ли съемка"""
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(
+        self,
+        folder: str,
+        camera_numbers: Sequence[int],
+        start_at: Optional[datetime] = None,
+        end_at: Optional[datetime] = None,
+        max_shots: int = 0,
+        on_saved: Optional[Callable[[Future], None]] = None,
+        on_finished: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """Запуск съемки; max_shots=0 - без ограничения числа снимков
+
+        on_saved получает Future каждого снимка со списком файлов,
+        on_finished вызывается в потоке съемки по ее окончании.
+        """
+        if self.is_active:
+            return False
+        if end_at and end_at <= (start_at or datetime.now()):
+            print('Окончание съемки раньше ее начала')
+            return False
+
+        self.shots = 0
+        self.missed = 0
+        self.max_lateness = 0.0
+        self.saved = 0
+        self._stop.clear()
+        now = time.monotonic()
+        origin = _monotonic_at(start_at) if start_at else now
+        if origin < now:
+            # Начало в прошлом: сетка сроков сохраняется, но съемка идет
+            # с ближайшего срока, и сроки до запуска не считаются
+            # пропущенными
+            origin += math.ceil((now - origin) / self.interval) * self.interval
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(
+                folder,
+                tuple(camera_numbers),
+                origin,
+                _monotonic_at(end_at),
+                max_shots,
+                on_saved,
+                on_finished,
+            ),
+            name='timelapse',
+            daemon=True,
+        )
+        self._thread.start()
+        when = start_at.strftime('%d.%m.%Y %H:%M:%S') if start_at else 'сразу'
+        print(
+            f'Интервальная съемка каждые {self.interval:g} с, '
+            f'начало: {when}'
+        )
+        return True
+
+    def stop(self, wait: bool = True):
+        """Остановка съемки; уже поставленные снимки будут записаны
+
+        Окно вызывает stop(wait=False): on_finished обращается к окну,
+        и ожидание потока в потоке окна привело бы к взаимной блокировке.
+        """
+        self._stop.set()
+        if wait and self._thread:
+            self._thread.join()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание конца съемки; False, если она еще идет"""
+        if self._thread:
+            self._thread.join(timeout)
+        return not self.is_active
+
+    def _run(
+        self,
+        folder: str,
+        camera_numbers: tuple,
+        origin: float,
+        end: Optional[float],
+        max_shots: int,
+        on_saved: Optional[Callable[[Future], None]],
+        on_finished: Optional[Callable[[], None]],
+    ):
+        """Поток съемки: ожидание срока, снимок, передача в очередь"""
+        slot = 0
+        try:
+            while not max_shots or self.shots < max_shots:
+                deadline = origin + slot * self.interval
+                if end is not None and deadline > end:
+                    break
+                if self._stop.wait(max(0.0, deadline - time.monotonic())):
+                    break
+
+                lateness = time.monotonic() - deadline
+                if lateness > self.late_tolerance:
+                    slot = self._skip_missed(origin, slot, lateness)
+                    continue
+
+                self.max_lateness = max(self.max_lateness, lateness)
+                self._shoot(folder, camera_numbers, slot, on_saved)
+                slot += 1
+        finally:
+            print(
+                f'Интервальная съемка окончена: снимков {self.shots}, '
+                f'пропущено сроков {self.missed}, наибольшее опоздание '
+                f'{self.max_lateness * 1000:.0f} мс'
+            )
+            if on_finished:
+                on_finished()
+
+    def _skip_missed(self, origin: float, slot: int, lateness: float) -> int:
+        """Учет сроков, к которым опоздали; возвращает следующий срок"""
+        # Первый срок, который еще можно успеть
+        elapsed = time.monotonic() - origin - self.late_tolerance
+        next_slot = max(slot + 1, int(elapsed // self.interval) + 1)
+        skipped = next_slot - slot
+        self.missed += skipped
+        if skipped == 1:
+            print(
+                f'Пропущен срок снимка {slot + 1}: '
+                f'опоздание {lateness:.2f} с'
+            )
+        else:
+            print(
+                f'Пропущены сроки снимков {slot + 1}-{next_slot}: '
+                f'опоздание {lateness:.2f} с'
+            )
+        return next_slot
+
+    def _shoot(
+        self,
+        folder: str,
+        camera_numbers: tuple,
+        slot: int,
+        on_saved: Optional[Callable[[Future], None]],
+    ):
+        """Снимок из последних кадров камер и передача его в очередь"""
+        snapshot = self.camera_manager.capture_synchronized(camera_numbers)
+        if snapshot is None:
+            self.missed += 1
+            print(f'Срок снимка {slot + 1}: нет кадров')
+            return
+
+        # Кадр не ждем, но зависшую камеру стоит заметить
+        age = time.monotonic() - min(snapshot.timestamps.values())
+        if age > CAMERA_STALL_TIMEOUT:
+            print(f'Срок снимка {slot + 1}: кадрам уже {age:.1f} с')
+
+        # Номер срока в имени: по пропускам в нумерации видны пропуски
+        future = self.save_queue.submit(
+            snapshot.frames,
+            folder,
+            tag=f'tl{slot + 1:06d}',
+            release=snapshot.release,
+            timestamps=snapshot.timestamps,
+        )
+        if future is None:
+            snapshot.release()
+            self.missed += 1
+            print(f'Срок снимка {slot + 1}: очередь сохранения заполнена')
+            return
+
+        self.shots += 1
+        future.add_done_callback(self._count_saved)
+        if on_saved:
+            future.add_done_callback(on_saved)
+
+    def _count_saved(self, future: Future):
+        """Учет записанных файлов, вызывается потоком сохранения"""
+        with self._lock:
+            self.saved += len(future.result())
@@ -0,0 +1,496 @@
+"""Конвейер преобразований кадра
+
+Конвейер описывает, как кадр камеры превращается в кадр предпросмотра
+или снимка: отражение, поворот, вырезка, масштаб, вписывание в холст,
+перевод цвета и метка времени. Предпросмотр и сохранение строят свои
+конвейеры из общего списка FRAME_TRANSFORMS.
+
+Геометрические этапы сливаются в одно аффинное преобразование и
+выполняются одной операцией без промежуточных массивов:
+- без поворота - вырезка как срез кадра, cv2.resize сразу в итоговый
+  массив и отражение на месте (в несколько раз быстрее warpAffine и
+  допускает усреднение INTER_AREA);
+- поворот на 90 градусов без масштаба - cv2.rotate;
+- остальное - один cv2.warpAffine.
+Цвет переводится после геометрии, на уменьшенном кадре, а метка
+времени наносится последней, чтобы не попасть под отражение.
+"""
+
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .stats import STATS
+
+# Режимы интерполяции масштабирования
+INTERPOLATION_MODES = {
+    'nearest': cv2.INTER_NEAREST,
+    'linear': cv2.INTER_LINEAR,
+    'area': cv2.INTER_AREA,
+    'lanczos': cv2.INTER_LANCZOS4,
+}
+
+# Перевод цвета из BGR: код OpenCV и число каналов результата
+COLOR_CODES = {
+    'rgb': (cv2.COLOR_BGR2RGB, 3),
+    'rgba': (cv2.COLOR_BGR2RGBA, 4),
+    'gray': (cv2.COLOR_BGR2GRAY, 1),
+}
+
+
+@dataclass(frozen=True)
+class Mirror:
+    """Отражение по горизонтали, с vertical=True - по вертикали"""
+
+    vertical: bool = False
+
+
+@dataclass(frozen=True)
+class Rotate:
+    """Поворот против часовой стрелки; холст расширяется под кадр"""
+
+    degrees: float
+
+
+@dataclass(frozen=True)
+class Crop:
+    """Вырезка (x, y, ширина, высота) в долях кадра или в точках"""
+
+    x: float
+    y: float
+    width: float
+    height: float
+    pixels: bool = False
+
+
+@dataclass(frozen=True)
+class Resize:
+    """Масштаб до (ширина, высота); нулевая сторона - по пропорциям"""
+
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class Letterbox:
+    """Вписывание с сохранением пропорций в холст с черными полями"""
+
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class Color:
+    """Перевод цвета из BGR: 'rgb', 'rgba' или 'gray'"""
+
+    mode: str
+
+
+@dataclass(frozen=True)
+class Timestamp:
+    """Метка времени в левом нижнем углу изображения"""
+
+    format: str = '%Y-%m-%d %H:%M:%S'
+
+
+STAGES = {
+    'mirror': Mirror,
+    'rotate': Rotate,
+    'crop': Crop,
+    'resize': Resize,
+    'letterbox': Letterbox,
+    'color': Color,
+    'timestamp': Timestamp,
+}
+
+
+def parse_stage(spec):
+    """Этап из записи config, например ('crop', 0, 0, 0.5, 1)"""
+    if not isinstance(spec, (tuple, list)):
+        return spec
+    name, *args = spec
+    if name not in STAGES:
+        raise ValueError(f'Неизвестное преобразование {name!r}')
+    return STAGES[name](*args)
+
+
+def _translate(dx: float, dy: float) -> np.ndarray:
+    """Матрица сдвига"""
+    return np.array([[1.0, 0.0, dx], [0.0, 1.0, dy], [0.0, 0.0, 1.0]])
+
+
+def _scale(sx: float, sy: float) -> np.ndarray:
+    """Матрица масштаба для центров точек (как в cv2.resize)"""
+    return np.array(
+        [
+            [sx, 0.0, 0.5 * sx - 0.5],
+            [0.0, sy, 0.5 * sy - 0.5],
+            [0.0, 0.0, 1.0],
+        ]
+    )
+
+
+class _Plan:
+    """Конвейер, разобранный для одной формы входного кадра
+
+    matrix переводит координаты входного кадра в координаты результата.
+    content - область результата с изображением (без полей).
+    """
+
+    def __init__(self, shape: tuple, stages: Sequence, interpolation: int):
+        height, width = shape[:2]
+        channels = shape[2] if len(shape) == 3 else 1
+        matrix = np.eye(3)
+        content = None
+        color = overlay = None
+        steps = []
+
+        for stage in stages:
+            if isinstance(stage, Color):
+                color = stage
+                continue
+            if isinstance(stage, Timestamp):
+                overlay = stage
+                continue
+            steps.append(type(stage).__name__.lower())
+            content = None
+
+            if isinstance(stage, Mirror):
+                flip = np.eye(3)
+                if stage.vertical:
+                    flip[1, 1], flip[1, 2] = -1.0, height - 1.0
+                else:
+                    flip[0, 0], flip[0, 2] = -1.0, width - 1.0
+                matrix = flip @ matrix
+            elif isinstance(stage, Rotate):
+                matrix, width, height = self._rotate(
+                    matrix, width, height, stage.degrees
+                )
+            elif isinstance(stage, Crop):
+                x, y, w, h = stage.x, stage.y, stage.width, stage.height
+                if not stage.pixels:
+                    x, y = round(x * width), round(y * height)
+                    w, h = round(w * width), round(h * height)
+                x = min(max(0, int(x)), width - 1)
+                y = min(max(0, int(y)), height - 1)
+                w = min(max(1, int(w)), width - x)
+                h = min(max(1, int(h)), height - y)
+                matrix = _translate(-x, -y) @ matrix
+                width, height = w, h
+            elif isinstance(stage, Resize):
+                new_width, new_height = stage.width, stage.height
+                if not new_width:
+                    new_width = max(1, round(width * new_height / height))
+                if not new_height:
+                    new_height = max(1, round(height * new_width / width))
+                matrix = (
+                    _scale(new_width / width, new_height / height) @ matrix
+                )
+                width, height = new_width, new_height
+            elif isinstance(stage, Letterbox):
+                if width * stage.height > height * stage.width:
+                    new_width = stage.width
+                    new_height = max(1, stage.width * height // width)
+                else:
+                    new_height = stage.height
+                    new_width = max(1, stage.height * width // height)
+                x = (stage.width - new_width) // 2
+                y = (stage.height - new_height) // 2
+                matrix = (
+                    _translate(x, y)
+                    @ _scale(new_width / width, new_height / height)
+                    @ matrix
+                )
+                width, height = stage.width, stage.height
+                content = (x, y, new_width, new_height)
+
+        self.name = '+'.join(steps) or 'copy'
+        self.size = (width, height)
+        self.content = content or (0, 0, width, height)
+        self.matrix = matrix[:2]
+        self.overlay = overlay
+        self.color_code = None
+        if color:
+            self.color_code, channels = COLOR_CODES[color.mode]
+        self.channels = channels
+        self.shape = (height, width) + ((channels,) if channels > 1 else ())
+        self.border = (0, 0, 0, 255)[:channels] if channels > 1 else 0
+        # Массивы результата, поля которых уже закрашены: id -> ссылка
+        self.prepared: Dict[int, weakref.ref] = {}
+
+        self.interpolation = interpolation
+        self.source = None
+        self.flip_code = None
+        self.rotate_code = None
+        self._choose_mode(shape)
+
+    @staticmethod
+    def _rotate(matrix, width: int, height: int, degrees: float):
+        """Поворот вокруг центра с расширением холста"""
+        angle = np.deg2rad(degrees)
+        cos, sin = np.cos(angle), np.sin(angle)
+        if degrees % 90 == 0:
+            # Точные значения: без них поворот на 90 не распознать
+            cos, sin = round(cos), round(sin)
+        new_width = int(round(abs(width * cos) + abs(height * sin)))
+        new_height = int(round(abs(width * sin) + abs(height * cos)))
+        # Как cv2.getRotationMatrix2D: ось y направлена вниз
+        rotation = np.array(
+            [[cos, sin, 0.0], [-sin, cos, 0.0], [0.0, 0.0, 1.0]]
+        )
+        matrix = (
+            _translate((new_width - 1) / 2, (new_height - 1) / 2)
+            @ rotation
+            @ _translate(-(width - 1) / 2, -(height - 1) / 2)
+            @ matrix
+        )
+        return matrix, new_width, new_height
+
+    def _choose_mode(self, shape: tuple):
+        """Выбор одной операции OpenCV для всей геометрии"""
+        a = self.matrix
+        height, width = shape[:2]
+        x, y, w, h = self.content
+        eps = 1e-6
+
+        if abs(a[0, 1]) < eps and abs(a[1, 0]) < eps:
+            # Без поворота: область входного кадра по краям точек
+            inverse = cv2.invertAffineTransform(a)
+            xs = inverse[0, 0] * np.array([x, x + w]) - 0.5 * inverse[0, 0]
+            ys = inverse[1, 1] * np.array([y, y + h]) - 0.5 * inverse[1, 1]
+            xs += inverse[0, 2]
+            ys += inverse[1, 2]
+            left = max(0, int(round(xs.min() + 0.5)))
+            right = min(width, int(round(xs.max() + 0.5)))
+            top = max(0, int(round(ys.min() + 0.5)))
+            bottom = min(height, int(round(ys.max() + 0.5)))
+            self.source = (slice(top, bottom), slice(left, right))
+
+            flip_x, flip_y = a[0, 0] < 0, a[1, 1] < 0
+            if flip_x and flip_y:
+                self.flip_code = -1
+            elif flip_x:
+                self.flip_code = 1
+            elif flip_y:
+                self.flip_code = 0
+
+            whole = (top, bottom, left, right) == (0, height, 0, width)
+            same = self.size == (width, height) and self.content == (
+                0,
+                0,
+                width,
+                height,
+            )
+            if whole and same and self.flip_code is None:
+                self.mode = 'copy'
+            else:
+                self.mode = 'resize'
+            return
+
+        # Поворот всего кадра на 90 градусов без масштаба
+        rotations = {
+            cv2.ROTATE_90_CLOCKWISE: [[0, -1, height - 1], [1, 0, 0]],
+            cv2.ROTATE_90_COUNTERCLOCKWISE: [[0, 1, 0], [-1, 0, width - 1]],
+        }
+        if self.content == (0, 0, height, width):
+            for code, expected in rotations.items():
+                if np.allclose(a, expected, atol=eps):
+                    self.mode = 'rotate'
+                    self.rotate_code = code
+                    return
+
+        self.mode = 'warp'
+        if self.interpolation == cv2.INTER_AREA:
+            # warpAffine не поддерживает усреднение
+            self.interpolation = cv2.INTER_LINEAR
+
+
+class Pipeline:
+    """Конвейер преобразований кадра
+
+    stages - этапы (Mirror, Crop, ...) или записи config вида
+    ('mirror',). Разбор конвейера кэшируется по форме входного кадра.
+    apply() можно вызывать из нескольких потоков одновременно.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence = (),
+        interpolation: str = 'area',
+        name: str = 'transform',
+    ):
+        self.stages = tuple(parse_stage(stage) for stage in stages)
+        self.interpolation = INTERPOLATION_MODES[interpolation]
+        self.name = name
+        self._plans: Dict[tuple, _Plan] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _plan_for(self, shape: tuple) -> _Plan:
+        """Разбор конвейера для формы кадра"""
+        plan = self._plans.get(shape)
+        if plan is None:
+            plan = _Plan(shape, self.stages, self.interpolation)
+            with self._lock:
+                self._plans[shape] = plan
+        return plan
+
+    def output_shape(self, shape: tuple) -> tuple:
+        """Форма результата для входного кадра формы shape"""
+        return self._plan_for(shape).shape
+
+    def content_rect(self, shape: tuple) -> Tuple[int, int, int, int]:
+        """Область результата с изображением, без полей вписывания"""
+        return self._plan_for(shape).content
+
+    def describe(self, shape: tuple) -> str:
+        """Операции, которыми будет выполнен конвейер"""
+        plan = self._plan_for(shape)
+        text = f'{plan.name} ({plan.mode})'
+        if plan.color_code is not None:
+            text += ' + color'
+        if plan.overlay:
+            text += ' + timestamp'
+        return text
+
+    def _scratch(self, shape: tuple) -> np.ndarray:
+        """Промежуточный массив потока для геометрии перед цветом"""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        buffer = buffers.get(shape)
+        if buffer is None:
+            buffer = buffers[shape] = np.empty(shape, np.uint8)
+        return buffer
+
+    def apply(
+        self,
+        frame,
+        dst: Optional[np.ndarray] = None,
+        camera_number: int = 0,
+        wall_time: Optional[float] = None,
+    ) -> np.ndarray:
+        """Преобразование кадра
+
+        dst - массив формы output_shape() для результата; без него
+        выделяется новый, а если преобразовывать нечего, возвращается
+        сам кадр. wall_time - время для метки (по умолчанию - текущее).
+        Длительность шагов попадает в STATS как <name>_geometry,
+        <name>_color и <name>_overlay.
+        """
+        plan = self._plan_for(frame.shape)
+        if dst is None:
+            if (
+                plan.mode == 'copy'
+                and plan.color_code is None
+                and not plan.overlay
+            ):
+                return frame
+            dst = np.empty(plan.shape, np.uint8)
+
+        x, y, w, h = plan.content
+        whole_output = plan.mode in ('rotate', 'warp')
+        region = dst if whole_output else dst[y : y + h, x : x + w]
+
+        start = STATS.start()
+        if plan.color_code is None:
+            self._geometry(plan, frame, region)
+            image = region
+        elif plan.mode == 'copy':
+            image = frame
+        else:
+            in_shape = region.shape[:2] + frame.shape[2:]
+            image = self._geometry(plan, frame, self._scratch(in_shape))
+        STATS.record(camera_number, f'{self.name}_geometry', start)
+
+        if plan.color_code is not None:
+            start = STATS.start()
+            cv2.cvtColor(image, plan.color_code, dst=region)
+            STATS.record(camera_number, f'{self.name}_color', start)
+
+        if not whole_output and (w, h) != plan.size:
+            self._fill_borders(plan, dst)
+
+        if plan.overlay:
+            start = STATS.start()
+            self._draw_timestamp(plan, dst, wall_time)
+            STATS.record(camera_number, f'{self.name}_overlay', start)
+        return dst
+
+    @staticmethod
+    def _geometry(plan: _Plan, frame, target: np.ndarray) -> np.ndarray:
+        """Вся геометрия одной операцией в target"""
+        if plan.mode == 'copy':
+            np.copyto(target, frame)
+        elif plan.mode == 'resize':
+            source = frame[plan.source]
+            if source.shape[:2] == target.shape[:2]:
+                if plan.flip_code is None:
+                    np.copyto(target, source)
+                else:
+                    cv2.flip(source, plan.flip_code, dst=target)
+                return target
+            # Сначала масштаб, затем отражение уже меньшего кадра
+            cv2.resize(
+                source,
+                (target.shape[1], target.shape[0]),
+                dst=target,
+                interpolation=plan.interpolation,
+            )
+            if plan.flip_code is not None:
+                cv2.flip(target, plan.flip_code, dst=target)
+        elif plan.mode == 'rotate':
+            cv2.rotate(frame, plan.rotate_code, dst=target)
+        else:
+            cv2.warpAffine(
+                frame,
+                plan.matrix,
+                plan.size,
+                dst=target,
+                flags=plan.interpolation,
+                borderMode=cv2.BORDER_CONSTANT,
+                borderValue=0,
+            )
+        return target
+
+    @staticmethod
+    def _fill_borders(plan: _Plan, dst: np.ndarray):
+        """Закраска полей вписывания, однажды для каждого массива"""
+        ref = plan.prepared.get(id(dst))
+        if ref is not None and ref() is dst:
+            return
+        x, y, w, h = plan.content
+        dst[:y] = plan.border
+        dst[y + h :] = plan.border
+        dst[y : y + h, :x] = plan.border
+        dst[y : y + h, x + w :] = plan.border
+        if len(plan.prepared) >= 64:
+            # Каждый вызов со своим представлением: запоминать нечего
+            plan.prepared.clear()
+        plan.prepared[id(dst)] = weakref.ref(dst)
+
+    @staticmethod
+    def _draw_timestamp(plan: _Plan, dst: np.ndarray, wall_time):
+        """Метка времени внутри изображения (не на полях)"""
+        x, y, w, h = plan.content
+        text = time.strftime(
+            plan.overlay.format, time.localtime(wall_time or time.time())
+        )
+        scale = max(0.4, h / 720)
+        thickness = max(1, round(scale * 2))
+        origin = (x + round(10 * scale), y + h - round(12 * scale))
+        white = (255, 255, 255, 255)[: plan.channels]
+        black = (0, 0, 0, 255)[: plan.channels]
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        # Обводка делает метку читаемой на любом фоне
+        cv2.putText(
+            dst, text, origin, font, scale, black, thickness * 3, cv2.LINE_AA
+        )
+        cv2.putText(
+            dst, text, origin, font, scale, white, thickness, cv2.LINE_AA
+        )
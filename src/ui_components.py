@@ -78,13 +78,15 @@ class CameraSelector:
 class VideoDisplay:
     """Виджет для отображения видео"""
 
-    def __init__(self, parent, camera_name: str):
+    def __init__(
+        self, parent, camera_name: str, size: int = VIDEO_CONTAINER_SIZE
+    ):
         self.container = tk.Frame(
             parent,
             relief='sunken',
             bd=3,
-            width=VIDEO_CONTAINER_SIZE,
-            height=VIDEO_CONTAINER_SIZE,
+            width=size,
+            height=size,
         )
         self.container.pack_propagate(False)
 
@@ -103,22 +105,63 @@ class VideoDisplay:
         )
         self.video_label.pack(expand=True)
 
-    def update_image(self, photo):
-        """Обновление изображения"""
+        # Один PhotoImage на все время показа, кадры копируются в него
+        self.photo = None
+        self.text = f'{camera_name}\nне активна'
+        self.overlay_label = None
+
+    def show_image(self, image):
+        """Вывод кадра с обновлением PhotoImage на месте"""
         try:
-            self.video_label.photo = photo
-            self.video_label.config(image=photo, text='')
+            photo = self.photo
+            if photo and (photo.width(), photo.height()) == image.size:
+                photo.paste(image)
+            else:
+                # PIL.ImageTk грузится только к первому кадру
+                from PIL import ImageTk
+
+                self.photo = ImageTk.PhotoImage(image)
+                self.text = ''
+
+            if self.text is not None:
+                self.video_label.config(image=self.photo, text='')
+                self.text = None
         except:
             pass
 
     def set_text(self, text: str):
         """Установка текста"""
-        self.video_label.config(text=text, image='')
+        if text != self.text:
+            self.video_label.config(text=text, image='')
+            self.text = text
+
+    def set_overlay(self, text: str):
+        """Текст поверх видео; пустая строка скрывает его"""
+        if self.overlay_label is None:
+            if not text:
+                return
+            self.overlay_label = tk.Label(
+                self.container,
+                bg='black',
+                fg='#00FF00',
+                font=('Consolas', 9),
+                justify='left',
+                anchor='nw',
+            )
+        if text:
+            self.overlay_label.config(text=text)
+            self.overlay_label.place(x=8, y=32)
+        else:
+            self.overlay_label.place_forget()
 
     def pack(self, **kwargs):
         """Упаковка виджета"""
         self.container.pack(**kwargs)
 
+    def grid(self, **kwargs):
+        """Размещение виджета в сетке"""
+        self.container.grid(**kwargs)
+
 
 class ControlPanel:
     """Панель управления"""
@@ -163,6 +206,18 @@ class ControlPanel:
         )
         self.stop_button.pack(side='left', padx=2)
 
+        self.record_button = tk.Button(
+            row1,
+            text='⏺ Запись',
+            command=callbacks['record'],
+            relief='raised',
+            bg=COLORS['connect'],
+            font=('Arial', 9, 'bold'),
+            width=12,
+            height=1,
+        )
+        self.record_button.pack(side='left', padx=2)
+
         # Вторая строка - снимок
         row2 = tk.Frame(buttons_grid)
         row2.pack(pady=2)
@@ -174,10 +229,46 @@ class ControlPanel:
             relief='raised',
             bg=COLORS['warning'],
             font=('Arial', 9, 'bold'),
-            width=25,
+            width=12,
+            height=1,
+        )
+        self.capture_button.pack(side='left', padx=2)
+
+        self.burst_button = tk.Button(
+            row2,
+            text='🎞 Серия',
+            command=callbacks['burst'],
+            relief='raised',
+            bg=COLORS['warning'],
+            font=('Arial', 9, 'bold'),
+            width=12,
+            height=1,
+        )
+        self.burst_button.pack(side='left', padx=2)
+
+        self.motion_button = tk.Button(
+            row2,
+            text='👁 Движение',
+            command=callbacks['motion'],
+            relief='raised',
+            bg=COLORS['warning'],
+            font=('Arial', 9, 'bold'),
+            width=12,
             height=1,
         )
-        self.capture_button.pack()
+        self.motion_button.pack(side='left', padx=2)
+
+        self.timelapse_button = tk.Button(
+            row2,
+            text='⏱ Интервал',
+            command=callbacks['timelapse'],
+            relief='raised',
+            bg=COLORS['warning'],
+            font=('Arial', 9, 'bold'),
+            width=12,
+            height=1,
+        )
+        self.timelapse_button.pack(side='left', padx=2)
 
         # Третья строка - закрыть
         row3 = tk.Frame(buttons_grid)
@@ -198,6 +289,10 @@ class ControlPanel:
         # Начальное состояние
         self.stop_button.config(state='disabled')
         self.capture_button.config(state='disabled')
+        self.burst_button.config(state='disabled')
+        self.motion_button.config(state='disabled')
+        self.timelapse_button.config(state='disabled')
+        self.record_button.config(state='disabled')
 
     def set_streaming_state(self, is_streaming: bool):
         """Установка состояния трансляции"""
@@ -205,28 +300,89 @@ class ControlPanel:
             self.start_button.config(state='disabled')
             self.stop_button.config(state='normal')
             self.capture_button.config(state='normal')
+            self.burst_button.config(state='normal')
+            self.motion_button.config(state='normal')
+            self.timelapse_button.config(state='normal')
+            self.record_button.config(state='normal')
         else:
             self.start_button.config(state='normal')
             self.stop_button.config(state='disabled')
             self.capture_button.config(state='disabled')
+            self.burst_button.config(state='disabled')
+            self.motion_button.config(state='disabled')
+            self.timelapse_button.config(state='disabled')
+            self.record_button.config(state='disabled')
+
+    def set_recording_state(self, status: str):
+        """Установка состояния записи видео"""
+        if status == 'starting':
+            self.record_button.config(text='⏺ Запуск...', state='disabled')
+        elif status == 'recording':
+            self.record_button.config(
+                text='⏹ Стоп записи', bg=COLORS['stop'], state='normal'
+            )
+        elif status == 'normal':
+            self.record_button.config(
+                text='⏺ Запись', bg=COLORS['connect'], state='normal'
+            )
 
     def set_capture_status(self, status: str):
         """Установка статуса захвата"""
         if status == 'saving':
-            self.capture_button.config(
-                text='📸 Сохраняем...', state='disabled'
-            )
+            # Кнопка остается доступной: снимки сохраняются в фоне
+            self.capture_button.config(text='📸 Сохраняем...')
         elif status == 'success':
             self.capture_button.config(
                 text='✅ Сохранено!', bg=COLORS['success']
             )
         elif status == 'error':
             self.capture_button.config(text='❌ Ошибка', bg=COLORS['error'])
+        elif status == 'busy':
+            self.capture_button.config(
+                text='⏳ Очередь заполнена', bg=COLORS['stop']
+            )
         elif status == 'normal':
             self.capture_button.config(
                 text='📸 Снимок', bg=COLORS['warning'], state='normal'
             )
 
+    def set_burst_status(self, status: str):
+        """Установка статуса серийной съемки"""
+        if status == 'recording':
+            self.burst_button.config(text='🎞 Запись...', state='disabled')
+        elif status == 'success':
+            self.burst_button.config(
+                text='✅ Серия сохранена', bg=COLORS['success']
+            )
+        elif status == 'error':
+            self.burst_button.config(text='❌ Ошибка', bg=COLORS['error'])
+        elif status in ('normal', 'disabled'):
+            self.burst_button.config(
+                text='🎞 Серия', bg=COLORS['warning'], state=status
+            )
+
+    def set_motion_state(self, is_active: bool):
+        """Установка состояния съемки по движению"""
+        if is_active:
+            self.motion_button.config(
+                text='👁 Ждем движения', bg=COLORS['info']
+            )
+        else:
+            self.motion_button.config(
+                text='👁 Движение', bg=COLORS['warning']
+            )
+
+    def set_timelapse_state(self, is_active: bool):
+        """Установка состояния интервальной съемки"""
+        if is_active:
+            self.timelapse_button.config(
+                text='⏱ Стоп интервала', bg=COLORS['info']
+            )
+        else:
+            self.timelapse_button.config(
+                text='⏱ Интервал', bg=COLORS['warning']
+            )
+
     def pack(self, **kwargs):
         """Упаковка виджета"""
         self.frame.pack(**kwargs)